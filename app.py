@@ -1,20 +1,45 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, current_app, abort, make_response
+from flask.globals import request_ctx
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user, user_logged_in
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_mail import Mail
-from datetime import datetime, timezone, timedelta
+from sqlalchemy.engine import Engine
+from flask.cli import AppGroup
+import click
+from datetime import date, datetime, timezone, timedelta
 import os
 import json
 import logging
 import re
+import sqlite3
 from logging.handlers import RotatingFileHandler
 import google.generativeai as genai
 
+import entry_fields
+import keywords
+import sentiment
+import similarity
+from fragment_cache import FragmentCache
+from refdata import ReferenceDataCache
+import streaks
+import writing_calendar
+import year_review
+from profiling import init_profiling
+from assets import init_assets, assets_bp, asset_url
+from compression import init_compression
+import conditional
+from conditional import conditional_get
+import sync
+import db_maintenance
+import db_routing
+from db_routing import read_snapshot
+from scheduler import Scheduler, every, cron
+
 # Load environment variables from .env file
 from dotenv import load_dotenv
 
@@ -36,8 +61,58 @@ else:
 app = Flask(__name__)
 # Generate a secure SECRET_KEY if not provided in environment
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///diary.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///diary.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+# Rendered entry cards kept per worker process (see the entry_card template global)
+app.config['FRAGMENT_CACHE_SIZE'] = int(os.environ.get('FRAGMENT_CACHE_SIZE', 5000))
+
+# Rate limiting can be switched off for load testing (see benchmarks/loadtest.py)
+app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+
+# AI backend: 'gemini' (default) or 'stub' for offline/load-test runs
+app.config['AI_BOT_BACKEND'] = os.environ.get('AI_BOT_BACKEND', 'gemini').lower()
+app.config['AI_STUB_LATENCY_MS'] = int(os.environ.get('AI_STUB_LATENCY_MS', 0))
+# Upper bound on a Gemini call; gunicorn.conf.py sizes its timeouts from it
+app.config['AI_REQUEST_TIMEOUT'] = int(os.environ.get('AI_REQUEST_TIMEOUT', 30))
+
+# On-demand request profiling (see profiling.py); requests must carry X-Profile-Secret
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', 'false').lower() in ['true', 'on', '1']
+app.config['PROFILING_SECRET'] = os.environ.get('PROFILING_SECRET')
+app.config['PROFILING_DIR'] = os.environ.get('PROFILING_DIR', os.path.join('logs', 'profiles'))
+
+# Serve CSS/JS straight from static/src instead of the built bundles (see assets.py)
+app.config['ASSETS_DEBUG'] = os.environ.get('ASSETS_DEBUG', 'false').lower() in ['true', 'on', '1']
+
+# gzip/brotli for HTML, JSON and text responses (see compression.py)
+app.config['COMPRESS_ENABLED'] = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ['true', 'on', '1']
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+
+# Background jobs (see scheduler.py): run them inside the web workers (one
+# elected worker executes) instead of a separate `flask jobs run` process
+app.config['SCHEDULER_ENABLED'] = os.environ.get('SCHEDULER_ENABLED', 'false').lower() in ['true', 'on', '1']
+app.config['SCHEDULER_POLL_SECONDS'] = int(os.environ.get('SCHEDULER_POLL_SECONDS', 30))
+app.config['JOB_HISTORY_DAYS'] = int(os.environ.get('JOB_HISTORY_DAYS', 30))
+# Stats rollups are precomputed for users seen within this many days
+app.config['STATS_ROLLUP_ACTIVE_DAYS'] = int(os.environ.get('STATS_ROLLUP_ACTIVE_DAYS', 30))
+
+# Per-user SQLite shards for entries, categories, templates and stats (see
+# db_routing.py); run `flask shards split` before turning this on
+app.config['SHARDING_ENABLED'] = os.environ.get('SHARDING_ENABLED', 'false').lower() in ['true', 'on', '1']
+app.config['SHARD_DIR'] = os.environ.get('SHARD_DIR', 'shards')  # relative to the instance folder
+app.config['SHARD_ENGINE_CACHE'] = int(os.environ.get('SHARD_ENGINE_CACHE', 256))  # open shard engines per process
+# Heavy read routes (@read_snapshot) read from read-only WAL snapshot connections
+app.config['READ_SNAPSHOTS_ENABLED'] = os.environ.get('READ_SNAPSHOTS_ENABLED', 'true').lower() in ['true', 'on', '1']
+
+# Related entries and near-duplicate warnings (see similarity.py); similarities
+# are estimated Jaccard overlaps of the entries' word sets
+app.config['RELATED_ENTRIES_LIMIT'] = int(os.environ.get('RELATED_ENTRIES_LIMIT', 5))
+app.config['RELATED_MIN_SIMILARITY'] = float(os.environ.get('RELATED_MIN_SIMILARITY', 0.2))
+app.config['NEAR_DUPLICATE_SIMILARITY'] = float(os.environ.get('NEAR_DUPLICATE_SIMILARITY', 0.8))
+
+# Writing calendar (see writing_calendar.py): cached (user, year) day totals per process
+app.config['CALENDAR_CACHE_SIZE'] = int(os.environ.get('CALENDAR_CACHE_SIZE', 1000))
 
 # Email configuration
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -94,10 +169,23 @@ app.logger.addHandler(console_handler)
 if not app.debug and not file_logging_enabled:
     console_handler.setLevel(logging.WARNING)  # Reduce noise when file logging fails
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': db_routing.RoutingSession})
 migrate = Migrate(app, db)
 csrf = CSRFProtect(app)
 
+@db.event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the writer; NORMAL sync fsyncs at checkpoints only"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        if not getattr(dbapi_connection, 'read_only', False):  # snapshot connections (db_routing.py)
+            # Only takes effect on a new database (or after VACUUM); lets maintenance free pages incrementally
+            cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT_MS']}")
+        cursor.close()
+
 # Rate limiting for security
 limiter = Limiter(
     app=app,
@@ -105,11 +193,48 @@ limiter = Limiter(
     default_limits=["200 per day", "50 per hour"]
 )
 
+# Buckets shared by a route and the /api/batch operation doing the same thing,
+# so batching does not multiply what a client may do per hour
+OPERATION_LIMITS = {
+    'toggle_favorite': "50 per hour",
+    'edit_category': "30 per hour",
+    'delete_category': "10 per hour",
+    'category_entries': "200 per day;50 per hour",
+}
+
+class StubGenerativeModel:
+    """Offline stand-in for a Gemini model, used when AI_BOT_BACKEND=stub.
+
+    Sleeps for AI_STUB_LATENCY_MS to mimic the network round trip, so load
+    tests exercise the bot routes without calling Google.
+    """
+
+    class _Response:
+        def __init__(self, text):
+            self.text = text
+
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+
+    def generate_content(self, prompt, request_options=None):
+        if self.latency_ms:
+            import time
+            time.sleep(self.latency_ms / 1000.0)
+        return self._Response(
+            "1. What made you smile today?\n"
+            "2. What challenged you, and what did you learn?\n"
+            "3. What are you grateful for right now?"
+        )
+
 # Initialize Gemini AI
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 gemini_model = None  # Initialize globally
 
-if GEMINI_API_KEY:
+if app.config['AI_BOT_BACKEND'] == 'stub':
+    gemini_model = StubGenerativeModel(latency_ms=app.config['AI_STUB_LATENCY_MS'])
+    ai_bot_enabled = True
+    print("ℹ️ AI bot running with the stub backend (no Gemini calls).")
+elif GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
     try:
         # Try to find available models dynamically
@@ -169,6 +294,19 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Opt-in per-request CPU/memory profiling
+init_profiling(app)
+
+# Fingerprinted CSS/JS bundles; a page load fetches several, so keep them out of the rate limits
+init_assets(app)
+limiter.exempt(assets_bp)
+
+# Compress HTML/JSON/text responses; wraps the profiler so profiles measure the app itself
+init_compression(app)
+
+# ETag/Last-Modified for per-user pages, keyed on User.data_version (see conditional.py)
+conditional.init_conditional(app)
+
 # ------------------ MODELS ------------------
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -185,6 +323,13 @@ class User(db.Model, UserMixin):
     reset_token = db.Column(db.String(100), nullable=True)
     reset_token_expires = db.Column(db.DateTime, nullable=True)
     theme_preference = db.Column(db.String(10), default='light')  # 'light', 'dark', or 'system'
+    timezone_name = db.Column(db.String(50), default='UTC')  # IANA name; streak days are local days
+    # Bumped whenever categories/templates change; keys the reference-data cache
+    categories_version = db.Column(db.Integer, default=0, nullable=False)
+    templates_version = db.Column(db.Integer, default=0, nullable=False)
+    # Bumped on any change to the user's data; drives ETags (see conditional.py)
+    data_version = db.Column(db.Integer, default=0, nullable=False)
+    data_updated_at = db.Column(db.DateTime, nullable=True)
     
     # Relationships
     entries = db.relationship('DiaryEntry', backref='author', lazy=True, cascade='all, delete-orphan')
@@ -197,12 +342,13 @@ class User(db.Model, UserMixin):
             
         Returns:
             str: The generated token
+
+        The caller is responsible for committing the session.
         """
         from itsdangerous import URLSafeTimedSerializer
         s = URLSafeTimedSerializer(current_app.config['SECRET_KEY'])
         self.reset_token = s.dumps(self.email, salt='password-reset-salt')
         self.reset_token_expires = datetime.now(timezone.utc) + timedelta(seconds=expires_sec)
-        db.session.commit()
         return self.reset_token
     
     @staticmethod
@@ -229,39 +375,54 @@ class User(db.Model, UserMixin):
             return user
         return None
 
-    def update_streak(self):
-        """Update user's writing streak"""
-        today = datetime.now(timezone.utc).date()
+    def _streak_state(self):
+        return streaks.StreakState(current=self.current_streak or 0, longest=self.longest_streak or 0,
+                                   start=streaks.from_column(self.streak_start_date),
+                                   last=streaks.from_column(self.last_entry_date))
 
-        if not self.last_entry_date:
-            # First entry ever
-            self.current_streak = 1
-            self.longest_streak = 1
-            self.streak_start_date = today
+    def _set_streak_state(self, state):
+        self.current_streak = state.current
+        self.longest_streak = state.longest
+        self.streak_start_date = streaks.to_column(state.start)
+        self.last_entry_date = streaks.to_column(state.last)
+
+    def update_streak(self, entry_time=None):
+        """Advance the writing streak for a new entry (joins the caller's transaction; does not commit)
+
+        O(1) for the normal case of writing today; back-dated entries or a
+        missing streak state fall back to recompute_streak().
+        """
+        zone = streaks.get_zone(self.timezone_name)
+        day = streaks.local_day(entry_time or datetime.now(timezone.utc), zone)
+        state = self._streak_state()
+        new_state = streaks.advance(state, day) if state.last else None
+        if new_state is None:
+            self.recompute_streak()
         else:
-            last_entry_date = self.last_entry_date.date()
-
-            if today == last_entry_date:
-                # Same day entry, don't change streak
-                pass
-            elif today == last_entry_date + timedelta(days=1):
-                # Consecutive day
-                self.current_streak += 1
-                if self.current_streak > self.longest_streak:
-                    self.longest_streak = self.current_streak
-                if self.current_streak == 1:
-                    self.streak_start_date = today
-            else:
-                # Streak broken, start new one
-                self.current_streak = 1
-                self.streak_start_date = today
+            self._set_streak_state(new_state)
 
-        self.last_entry_date = today
-        db.session.commit()
+    def recompute_streak(self):
+        """Rebuild streak fields from entry history in one pass over idx_user_timestamp
+
+        Used after deletes, restores and timezone changes; does not commit.
+        """
+        timestamps = db.session.query(DiaryEntry.timestamp)\
+            .filter(DiaryEntry.user_id == self.id)\
+            .order_by(DiaryEntry.timestamp)\
+            .yield_per(1000)
+        self._set_streak_state(streaks.compute((ts for (ts,) in timestamps), streaks.get_zone(self.timezone_name)))
+
+    def bump_categories_version(self):
+        """Invalidate cached categories (atomic SQL increment, applied on commit)"""
+        self.categories_version = User.categories_version + 1
+
+    def bump_templates_version(self):
+        """Invalidate cached templates (atomic SQL increment, applied on commit)"""
+        self.templates_version = User.templates_version + 1
 
     def get_streak_info(self):
         """Get streak information for display"""
-        today = datetime.now(timezone.utc).date()
+        today = streaks.today_in(streaks.get_zone(self.timezone_name))
 
         if not self.last_entry_date:
             return {
@@ -302,6 +463,11 @@ class Category(db.Model):
     color = db.Column(db.String(7), default='#667eea')  # Hex color
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sync_version = db.Column(db.Integer, default=0, nullable=False)  # stamped by sync.register
+
+    __table_args__ = (
+        db.Index('idx_category_user_sync', 'user_id', 'sync_version'),
+    )
     
 class EntryTemplate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -315,6 +481,11 @@ class EntryTemplate(db.Model):
     tags = db.Column(db.Text, nullable=True)  # JSON string of tags
     is_default = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sync_version = db.Column(db.Integer, default=0, nullable=False)  # stamped by sync.register
+
+    __table_args__ = (
+        db.Index('idx_template_user_sync', 'user_id', 'sync_version'),
+    )
     
     # Relationships
     user = db.relationship('User', backref='templates')
@@ -338,21 +509,34 @@ class DiaryEntry(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
     title = db.Column(db.String(200), nullable=True)  # Optional title
-    content = db.Column(db.Text, nullable=False)
+    # Deferred: list views render the stored excerpt, so the full text is only
+    # loaded when a route explicitly undefers it (view, edit, export, backup)
+    content = db.deferred(db.Column(db.Text, nullable=False))
     mood = db.Column(db.String(20), nullable=True)  # happy, sad, excited, etc.
     weather = db.Column(db.String(50), nullable=True)  # sunny, rainy, etc.
     location = db.Column(db.String(100), nullable=True)
     tags = db.Column(db.Text, nullable=True)  # JSON string of tags
     is_private = db.Column(db.Boolean, default=True)
     is_favorite = db.Column(db.Boolean, default=False)  # Pin/favorite entries
+    # Derived from content by entry_fields; never set these by hand
     word_count = db.Column(db.Integer, default=0)
+    char_count = db.Column(db.Integer, default=0)
+    reading_time = db.Column(db.Integer, default=1)  # minutes
+    excerpt = db.Column(db.String(200), nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)
+    sentiment = db.Column(db.Float, nullable=True)  # -1..1, lexicon score (sentiment.py)
+    month_day = db.Column(db.Integer, nullable=True)  # MMDD of the UTC timestamp ("on this day")
     timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    sync_version = db.Column(db.Integer, default=0, nullable=False)  # stamped by sync.register
     
     # Indexes for better query performance
     __table_args__ = (
         db.Index('idx_user_timestamp', 'user_id', 'timestamp'),
         db.Index('idx_user_category', 'user_id', 'category_id'),
+        db.Index('idx_entry_user_sync', 'user_id', 'sync_version'),
+        db.Index('idx_user_month_day', 'user_id', 'month_day', 'timestamp'),
+        db.Index('idx_user_timestamp_words', 'user_id', 'timestamp', 'word_count'),  # covers calendar scans
     )
     
     def get_tags_list(self):
@@ -368,9 +552,137 @@ class DiaryEntry(db.Model):
         """Convert tags list to JSON string"""
         self.tags = json.dumps(tags_list) if tags_list else None
 
+# Keep word_count, excerpt, etc. in sync with content on every insert/update
+entry_fields.register(DiaryEntry)
+
+class SyncTombstone(db.Model):
+    """Records a deleted entry/category/template so /api/sync can report it"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # 'entry', 'category' or 'template'
+    object_id = db.Column(db.Integer, nullable=False)
+    sync_version = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.Index('idx_tombstone_user_sync', 'user_id', 'sync_version'),
+    )
+
+class StatsRollup(db.Model):
+    """Precomputed /stats payload, valid while data_version and computed_on match"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    data_version = db.Column(db.Integer, nullable=False)
+    computed_on = db.Column(db.Date, nullable=False)  # UTC day; the mood trend window moves daily
+    computed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    payload = db.Column(db.Text, nullable=False)  # JSON
+
+class EntryTerm(db.Model):
+    """Term count of one entry: a non-zero of the user's sparse entry/term matrix (keywords.py)"""
+    entry_id = db.Column(db.Integer, db.ForeignKey('diary_entry.id'), primary_key=True)
+    term = db.Column(db.String(40), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_entry_term_user', 'user_id', 'entry_id'),
+    )
+
+class UserTerm(db.Model):
+    """Number of a user's entries containing a term (TF-IDF document frequency)"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    term = db.Column(db.String(40), primary_key=True)
+    doc_freq = db.Column(db.Integer, nullable=False)
+
+# Update term vectors and document frequencies in the same flush as each entry write
+keywords.register(DiaryEntry, EntryTerm.__table__, UserTerm.__table__)
+
+class EntrySignature(db.Model):
+    """MinHash signature of an entry's content (similarity.py)"""
+    entry_id = db.Column(db.Integer, db.ForeignKey('diary_entry.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    signature = db.Column(db.LargeBinary, nullable=False)  # NUM_PERM little-endian uint32
+
+class EntryBucket(db.Model):
+    """LSH bucket of one band of an entry's signature; shared buckets mark candidate matches"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('diary_entry.id'), primary_key=True)
+
+# Maintain signatures and buckets in the same flush as each entry write
+similarity.register(DiaryEntry, EntrySignature.__table__, EntryBucket.__table__)
+
+class YearReview(db.Model):
+    """Stored "year in review" report of one user and local year (year_review.py)"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    # Bumped by every write to an entry of the year; the report is current while built_from matches
+    entries_version = db.Column(db.Integer, default=1, nullable=False)
+    built_from = db.Column(db.Integer, default=0, nullable=False)
+    report_version = db.Column(db.Integer, nullable=True)  # year_review.REPORT_VERSION of the payload
+    timezone_name = db.Column(db.String(64), nullable=True)  # User.timezone_name it was built for
+    generated_at = db.Column(db.DateTime, nullable=True)
+    payload = db.Column(db.Text, nullable=True)  # JSON; NULL until first generated
+
+# Bump a year's entries_version in the same flush as each write to one of its entries
+year_review.register(DiaryEntry, YearReview.__table__)
+
+class JobRun(db.Model):
+    """One run of a scheduled job (see scheduler.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # 'running', 'success' or 'failed'
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_ms = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    owner = db.Column(db.String(200), nullable=True)  # host:pid
+
+    __table_args__ = (
+        db.Index('idx_job_run_name_started', 'job_name', 'started_at'),
+    )
+
+class JobLock(db.Model):
+    """Named lease: keeps a job (or the scheduler itself) to one process at a time"""
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(200), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+# Bump User.data_version, stamp sync_version and write tombstones in the same
+# flush as any change to the user's data (drives /api/sync and page ETags)
+SYNCED_MODELS = {'entry': DiaryEntry, 'category': Category, 'template': EntryTemplate}
+sync.register(db, User, SyncTombstone, SYNCED_MODELS)
+
+# Columns rendered by the entry cards in list views (dashboard, category, search)
+ENTRY_CARD_COLUMNS = (
+    DiaryEntry.id, DiaryEntry.title, DiaryEntry.excerpt, DiaryEntry.char_count,
+    DiaryEntry.word_count, DiaryEntry.reading_time, DiaryEntry.mood, DiaryEntry.weather,
+    DiaryEntry.is_favorite, DiaryEntry.timestamp, DiaryEntry.updated_at,
+)
+
+# ------------------ SHARD ROUTING ------------------
+# With SHARDING_ENABLED these tables live in one SQLite file per user; the
+# logged-in user's shard is selected for each request (see db_routing.py).
+# Listed parents first: split copies in this order and deletes in reverse.
+shards = db_routing.ShardRouter(app, [Category.__table__, EntryTemplate.__table__, DiaryEntry.__table__,
+                                      EntryTerm.__table__, UserTerm.__table__, EntrySignature.__table__,
+                                      EntryBucket.__table__, SyncTombstone.__table__, StatsRollup.__table__,
+                                      YearReview.__table__])
+
+@user_logged_in.connect_via(app)
+def select_shard_on_login(sender, user, **extra):
+    shards.select(user.id)
+
+@app.teardown_request
+def reset_shard(exc):
+    shards.reset()
+
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    user = db.session.get(User, int(user_id))
+    if user is not None:
+        shards.select(user.id)
+    return user
 
 # ------------------ UTILITY FUNCTIONS ------------------
 def validate_password(password):
@@ -393,11 +705,90 @@ def validate_username(username):
         return False, "Username can only contain letters, numbers, and underscores"
     return True, "Username is valid"
 
+# ------------------ FRAGMENT CACHE ------------------
+card_cache = FragmentCache(max_entries=app.config['FRAGMENT_CACHE_SIZE'])
+
+ENTRY_CARD_TEMPLATES = {
+    'dashboard': 'partials/dashboard_entry_card.html',
+    'category': 'partials/category_entry_card.html',
+}
+# The animation delay depends on the card's position on the page, not on the
+# entry, so it is substituted into the cached HTML at assembly time
+CARD_DELAY_PLACEHOLDER = '__AOS_DELAY__'
+
+@app.template_global()
+def entry_card(entry, variant, index):
+    """Return the rendered card for `entry`, rendering it only on a cache miss"""
+    theme = current_user.theme_preference if current_user.is_authenticated else 'light'
+    # Entry ids are only unique per shard when SHARDING_ENABLED
+    key = (variant, current_user.get_id(), entry.id, entry.updated_at, theme)
+    html = card_cache.get_or_render(
+        key, lambda: render_template(ENTRY_CARD_TEMPLATES[variant], entry=entry, aos_delay=CARD_DELAY_PLACEHOLDER))
+    return html.replace(CARD_DELAY_PLACEHOLDER, str(index * 100))
+
+# ------------------ REFERENCE DATA ------------------
+refdata_cache = ReferenceDataCache()
+
+def get_user_categories(user):
+    """User's categories as plain dicts, served from cache while categories_version is unchanged"""
+    return refdata_cache.get('categories', user.id, user.categories_version or 0, lambda: [
+        {'id': c.id, 'name': c.name, 'color': c.color}
+        for c in Category.query.filter_by(user_id=user.id).order_by(Category.id)
+    ])
+
+def get_user_templates(user):
+    """User's entry templates as plain dicts, served from cache while templates_version is unchanged"""
+    return refdata_cache.get('templates', user.id, user.templates_version or 0, lambda: [
+        {'id': t.id, 'name': t.name, 'content': t.content, 'category_id': t.category_id,
+         'mood': t.mood, 'weather': t.weather, 'location': t.location,
+         'tags': t.get_tags_list(), 'is_default': t.is_default}
+        for t in EntryTemplate.query.filter_by(user_id=user.id).order_by(EntryTemplate.id)
+    ])
+
+def render_write_form(**context):
+    """Render write.html with the cached categories and templates"""
+    context.setdefault('template_content', '')
+    context.setdefault('template_title', '')
+    return render_template('write.html',
+                           categories=get_user_categories(current_user),
+                           user_templates=get_user_templates(current_user),
+                           **context)
+
 # ------------------ ROUTES ------------------
 @app.route('/')
 def home():
     return render_template('index.html')
 
+# Service worker: served from the root so its scope covers the whole app
+SW_SHELL_BUNDLES = ('base.css', 'base.js', 'dashboard.css', 'dashboard.js')
+
+@app.route('/sw.js')
+@limiter.exempt
+def service_worker():
+    response = make_response(render_template(
+        'sw.js',
+        version=app.config['BUILD_ID'],
+        offline_url=url_for('offline'),
+        shell_urls=[asset_url(name) for name in SW_SHELL_BUNDLES] + [url_for('offline')],
+        warm_urls=[url_for('dashboard'), url_for('write')],
+        sync_max_changes=SYNC_MAX_CHANGES,
+    ))
+    response.mimetype = 'application/javascript'
+    # Browsers check for a new worker on navigation; never let a stale one stick
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/offline')
+def offline():
+    return render_template('offline.html')
+
+@app.after_request
+def no_store_flashed_pages(response):
+    """Pages that displayed flash messages must not be replayed by the service worker"""
+    if request_ctx.flashes:
+        response.cache_control.no_store = True
+    return response
+
 # Register
 @app.route('/register', methods=['GET', 'POST'])
 @limiter.limit("10 per hour")
@@ -436,7 +827,8 @@ def register():
         try:
             db.session.add(user)
             db.session.commit()
-            
+            shards.select(user.id)  # categories go to the new user's shard
+
             # Create default categories for new user
             default_categories = [
                 {'name': 'General', 'color': '#667eea'},
@@ -507,6 +899,7 @@ def forgot_password():
         if user:
             # Generate and send password reset email
             token = user.get_reset_token()
+            db.session.commit()
             
             # Create reset link
             reset_url = url_for('reset_password', token=token, _external=True)
@@ -557,37 +950,32 @@ def save_theme():
     except Exception as e:
         app.logger.error(f'Error saving theme preference for user {current_user.username}: {str(e)}')
         return jsonify({'error': 'Failed to save theme preference'}), 500
-    """Handle password reset form."""
-    if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
-        
-    user = User.verify_reset_token(token)
-    if not user:
-        flash('That is an invalid or expired token', 'warning')
-        return redirect(url_for('forgot_password'))
-        
-    if request.method == 'POST':
-        password = request.form.get('password')
-        confirm_password = request.form.get('confirm_password')
-        
-        if password != confirm_password:
-            flash('Passwords do not match!', 'danger')
-            return redirect(url_for('reset_password', token=token))
-            
-        if not validate_password(password):
-            flash('Password must be at least 8 characters long and include at least one letter and one number', 'danger')
-            return redirect(url_for('reset_password', token=token))
-            
-        # Update password
-        user.password = bcrypt.generate_password_hash(password).decode('utf-8')
-        user.reset_token = None
-        user.reset_token_expires = None
-        db.session.commit()
-        
-        flash('Your password has been updated! You can now log in.', 'success')
-        return redirect(url_for('login'))
-        
-    return render_template('reset_password.html', token=token)
+
+@app.route('/api/timezone', methods=['POST'])
+@login_required
+@csrf.exempt  # Sent by base.html on page load, same as /api/theme
+def save_timezone():
+    """Save the browser's IANA timezone; streak days are counted in it"""
+    try:
+        data = request.get_json()
+        if not data or 'timezone' not in data:
+            return jsonify({'error': 'Timezone required'}), 400
+
+        name = data['timezone']
+        if not isinstance(name, str) or len(name) > 50 or not streaks.is_valid_timezone(name):
+            return jsonify({'error': 'Invalid timezone'}), 400
+
+        if name != current_user.timezone_name:
+            current_user.timezone_name = name
+            current_user.recompute_streak()
+            db.session.commit()
+
+        return jsonify({'success': True, 'timezone': name})
+
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f'Error saving timezone for user {current_user.username}: {str(e)}')
+        return jsonify({'error': 'Failed to save timezone'}), 500
 
 # AdSense Verification Route
 @app.route('/googleytR3N45PwqlIrLfAySGxBq54hgHbj6GCP2Hp_SgoK6w.html')
@@ -604,12 +992,14 @@ def adsense_ads_txt():
 # Dashboard
 @app.route('/dashboard')
 @login_required
+@conditional_get
 def dashboard():
     page = request.args.get('page', 1, type=int)
     per_page = 10  # Show 10 entries per page
     
     # Get entries with pagination, ordered by favorites first, then most recent
     entries_pagination = DiaryEntry.query.filter_by(user_id=current_user.id)\
+        .options(db.load_only(*ENTRY_CARD_COLUMNS))\
         .order_by(DiaryEntry.is_favorite.desc(), DiaryEntry.timestamp.desc())\
         .paginate(page=page, per_page=per_page, error_out=False)
     
@@ -621,9 +1011,15 @@ def dashboard():
             entry.timestamp = datetime.now()
             db.session.commit()
 
+    # "On this day" sits above the first page only
+    on_this_day = []
+    if page == 1:
+        on_this_day = entries_on_this_day(streaks.today_in(streaks.get_zone(current_user.timezone_name)), limit=3)
+
     return render_template('dashboard.html', 
                          entries=entries, 
-                         pagination=entries_pagination)
+                         pagination=entries_pagination,
+                         on_this_day=on_this_day)
 
 # Write Entry
 @app.route('/write', methods=['GET', 'POST'])
@@ -649,21 +1045,18 @@ def write():
             if len(content) < 10:
                 app.logger.warning(f'Entry too short by {current_user.username}')
                 flash('Entry must be at least 10 characters long', 'warning')
-                return render_template('write.html')
+                return render_write_form()
             
             if len(content) > 10000:
                 app.logger.warning(f'Entry too long by {current_user.username}')
                 flash('Entry is too long (maximum 10,000 characters)', 'warning')
-                return render_template('write.html')
+                return render_write_form()
             
             # Process tags
             tags_list = []
             if tags_input:
                 tags_list = [tag.strip() for tag in tags_input.split(',') if tag.strip()]
             
-            # Calculate word count
-            word_count = len(content.split())
-            
             entry = DiaryEntry(
                 user_id=current_user.id,
                 title=title if title else None,
@@ -672,20 +1065,20 @@ def write():
                 mood=mood if mood else None,
                 weather=weather if weather else None,
                 location=location if location else None,
-                is_private=is_private,
-                word_count=word_count
+                is_private=is_private
             )
             entry.set_tags_list(tags_list)
+            duplicates = find_similar_entries(content, app.config['NEAR_DUPLICATE_SIMILARITY'], limit=1)
             
             try:
+                # Entry insert, derived fields and streak update share one commit
                 db.session.add(entry)
-                db.session.commit()
-                
-                # Update user's writing streak
                 current_user.update_streak()
+                db.session.commit()
                 
-                app.logger.info(f'Entry created successfully by {current_user.username} (ID: {entry.id}, Words: {word_count})')
+                app.logger.info(f'Entry created successfully by {current_user.username} (ID: {entry.id}, Words: {entry.word_count})')
                 flash('Entry saved successfully!', 'success')
+                flash_near_duplicate(duplicates)
                 return redirect(url_for('dashboard'))
             except Exception as e:
                 db.session.rollback()
@@ -695,21 +1088,13 @@ def write():
             app.logger.warning(f'Empty entry submission by {current_user.username}')
             flash('Entry content cannot be empty!', 'danger')
     
-    # Get user's categories for the form
-    categories = Category.query.filter_by(user_id=current_user.id).all()
-    
-    # Get user's templates for the form
-    user_templates = EntryTemplate.query.filter_by(user_id=current_user.id).all()
-    
     # Check if using a template
     template_content = request.args.get('template_content', '')
     template_title = request.args.get('template_title', '')
     
-    return render_template('write.html', 
-                         categories=categories,
-                         user_templates=user_templates,
-                         template_content=template_content,
-                         template_title=template_title)
+    # Categories and templates come from the per-user reference-data cache
+    return render_write_form(template_content=template_content,
+                             template_title=template_title)
 
 # Search Entries
 @app.route('/search', methods=['GET'])
@@ -722,9 +1107,13 @@ def search():
     # Start with base query for current user
     base_query = DiaryEntry.query.filter_by(user_id=current_user.id)
     
-    # Add text search if query provided
+    # Add text search if query provided; matches are highlighted in the full text,
+    # otherwise the result cards only need the stored excerpt
     if query:
-        base_query = base_query.filter(DiaryEntry.content.contains(query))
+        base_query = base_query.filter(DiaryEntry.content.contains(query))\
+            .options(db.undefer(DiaryEntry.content))
+    else:
+        base_query = base_query.options(db.load_only(*ENTRY_CARD_COLUMNS))
     
     # Add date filtering if dates provided
     if date_from:
@@ -756,7 +1145,8 @@ def search():
 @app.route('/edit/<int:entry_id>', methods=['GET', 'POST'])
 @login_required
 def edit_entry(entry_id):
-    entry = DiaryEntry.query.filter_by(id=entry_id, user_id=current_user.id).first_or_404()
+    entry = DiaryEntry.query.filter_by(id=entry_id, user_id=current_user.id)\
+        .options(db.undefer(DiaryEntry.content)).first_or_404()
     
     if request.method == 'POST':
         content = request.form['content'].strip()
@@ -770,10 +1160,13 @@ def edit_entry(entry_id):
                 flash('Entry is too long (maximum 10,000 characters)', 'warning')
                 return render_template('edit_entry.html', entry=entry)
             
+            duplicates = find_similar_entries(content, app.config['NEAR_DUPLICATE_SIMILARITY'],
+                                              exclude=entry.id, limit=1)
             try:
                 entry.content = content
                 db.session.commit()
                 flash('Entry updated successfully!', 'success')
+                flash_near_duplicate(duplicates)
                 return redirect(url_for('dashboard'))
             except Exception as e:
                 db.session.rollback()
@@ -791,6 +1184,7 @@ def delete_entry(entry_id):
     
     try:
         db.session.delete(entry)
+        current_user.recompute_streak()
         db.session.commit()
         app.logger.info(f'Entry deleted by {current_user.username} - Entry ID: {entry_id}')
         flash('Entry deleted successfully!', 'success')
@@ -801,13 +1195,196 @@ def delete_entry(entry_id):
     
     return redirect(url_for('dashboard'))
 
+def find_similar_entries(content, min_similarity, exclude=None, before=None, limit=None):
+    """[(entry, similarity), ...] of the current user's entries overlapping `content`, most similar first
+
+    Candidates come from the MinHash/LSH index (similarity.py); `before`
+    keeps only entries written earlier than that timestamp.
+    """
+    matches = dict(similarity.similar(db.session, EntrySignature.__table__, EntryBucket.__table__,
+                                      current_user.id, similarity.signature(content),
+                                      min_similarity=min_similarity, exclude=exclude))
+    if not matches:
+        return []
+    query = DiaryEntry.query.filter(DiaryEntry.user_id == current_user.id, DiaryEntry.id.in_(list(matches)))\
+        .options(db.load_only(DiaryEntry.id, DiaryEntry.title, DiaryEntry.excerpt, DiaryEntry.timestamp))
+    if before is not None:
+        query = query.filter(DiaryEntry.timestamp < before)
+    entries = sorted(query.all(), key=lambda entry: (-matches[entry.id], entry.id))[:limit]
+    return [(entry, matches[entry.id]) for entry in entries]
+
+def flash_near_duplicate(duplicates):
+    """Warn (without blocking the save) that the text repeats an existing entry"""
+    if duplicates:
+        entry, score = duplicates[0]
+        label = entry.title or (entry.excerpt or '')[:40] or 'an earlier entry'
+        flash(f'This entry is {round(score * 100)}% similar to "{label}" from '
+              f"{entry.timestamp.strftime('%B %d, %Y') if entry.timestamp else 'an unknown date'}. "
+              f'Saved anyway, in case that was intended.', 'warning')
+
 # View Single Entry
 @app.route('/entry/<int:entry_id>')
 @login_required
+@conditional_get
 def view_entry(entry_id):
     app.logger.info(f'Entry view requested by {current_user.username} - Entry ID: {entry_id}')
-    entry = DiaryEntry.query.filter_by(id=entry_id, user_id=current_user.id).first_or_404()
-    return render_template('view_entry.html', entry=entry)
+    entry = DiaryEntry.query.filter_by(id=entry_id, user_id=current_user.id)\
+        .options(db.undefer(DiaryEntry.content)).first_or_404()
+    related = find_similar_entries(entry.content, app.config['RELATED_MIN_SIMILARITY'], exclude=entry.id,
+                                   before=entry.timestamp, limit=app.config['RELATED_ENTRIES_LIMIT'])
+    return render_template('view_entry.html', entry=entry, related=related)
+
+# On This Day
+def entries_on_this_day(day, limit=None):
+    """Current user's entries from years before `day` written on its month and day (local time)
+
+    month_day holds the UTC date, and a local day overlaps the UTC days on
+    either side of it, so the index seek covers those three month_days (in a
+    leap year too, for the days around February 29) and the exact local date
+    is checked on the few rows it returns.
+    """
+    zone = streaks.get_zone(current_user.timezone_name)
+    keys = {entry_fields.month_day(d + timedelta(days=offset))
+            for d in (day, day.replace(year=2000)) for offset in (-1, 0, 1)}
+    day_start = datetime.combine(day, datetime.min.time(), tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+    candidates = DiaryEntry.query\
+        .filter(DiaryEntry.user_id == current_user.id, DiaryEntry.month_day.in_(sorted(keys)),
+                DiaryEntry.timestamp < day_start)\
+        .options(db.load_only(DiaryEntry.id, DiaryEntry.title, DiaryEntry.excerpt, DiaryEntry.mood,
+                              DiaryEntry.timestamp))\
+        .order_by(DiaryEntry.timestamp.desc()).all()
+    matches = [entry for entry in candidates
+               if streaks.local_day(entry.timestamp, zone).strftime('%m-%d') == day.strftime('%m-%d')]
+    return matches[:limit]
+
+@app.route('/api/on-this-day')
+@login_required
+@conditional_get
+def api_on_this_day():
+    """Entries from earlier years on ?date=YYYY-MM-DD (default: today in the user's timezone)"""
+    zone = streaks.get_zone(current_user.timezone_name)
+    try:
+        day = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') \
+            else streaks.today_in(zone)
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    if not datetime.min.year < day.year < datetime.max.year:
+        return jsonify({'error': 'date out of range'}), 400
+
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+    entries = entries_on_this_day(day, limit=limit)
+    return jsonify({
+        'date': day.isoformat(),
+        'entries': [{
+            'id': entry.id,
+            'title': entry.title,
+            'excerpt': entry.excerpt,
+            'mood': entry.mood,
+            'timestamp': entry.timestamp.isoformat(),
+            'years_ago': day.year - streaks.local_day(entry.timestamp, zone).year,
+            'url': url_for('view_entry', entry_id=entry.id),
+        } for entry in entries],
+    })
+
+# Writing Calendar
+calendar_cache = ReferenceDataCache(max_entries=app.config['CALENDAR_CACHE_SIZE'])
+
+def calendar_year(user, year):
+    """[(date, entries, words), ...] of `user`'s writing days in `year` (local time), cached per data_version"""
+    zone = streaks.get_zone(user.timezone_name)
+
+    def load():
+        start, end = writing_calendar.utc_bounds(date(year, 1, 1), date(year, 12, 31), zone)
+        # Only indexed columns: one range scan of idx_user_timestamp_words
+        rows = db.session.query(DiaryEntry.timestamp, DiaryEntry.word_count)\
+            .filter(DiaryEntry.user_id == user.id, DiaryEntry.timestamp >= start, DiaryEntry.timestamp < end)\
+            .order_by(DiaryEntry.timestamp)
+        return writing_calendar.day_totals(rows, zone)
+
+    return calendar_cache.get(year, user.id, (user.data_version, user.timezone_name), load)
+
+def _calendar_month_arg(zone):
+    """(year, month) from ?month=YYYY-MM, defaulting to the current local month; None if malformed"""
+    if not request.args.get('month'):
+        today = streaks.today_in(zone)
+        return today.year, today.month
+    try:
+        month = datetime.strptime(request.args['month'], '%Y-%m')
+    except ValueError:
+        return None
+    if not datetime.min.year < month.year < datetime.max.year:
+        return None
+    return month.year, month.month
+
+@app.route('/api/calendar')
+@login_required
+@conditional_get
+def api_calendar():
+    """Entries and words per local day for ?year=YYYY or ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive)"""
+    try:
+        if request.args.get('year'):
+            year = int(request.args['year'])
+            start, end = date(year, 1, 1), date(year, 12, 31)
+        else:
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return jsonify({'error': 'pass year=YYYY or start and end as YYYY-MM-DD'}), 400
+    if end < start or not datetime.min.year < start.year <= end.year < datetime.max.year:
+        return jsonify({'error': 'invalid date range'}), 400
+    if (end - start).days >= writing_calendar.MAX_RANGE_DAYS:
+        return jsonify({'error': f'ranges are limited to {writing_calendar.MAX_RANGE_DAYS} days'}), 400
+
+    days = [(day, count, words)
+            for year in range(start.year, end.year + 1)
+            for day, count, words in calendar_year(current_user, year)
+            if start <= day <= end]
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'entries': sum(count for _, count, _ in days),
+        'words': sum(words for _, _, words in days),
+        'days': [{'date': day.isoformat(), 'entries': count, 'words': words} for day, count, words in days],
+    })
+
+@app.route('/calendar')
+@login_required
+@conditional_get
+def writing_calendar_view():
+    """Year heatmap plus a month calendar listing the month's entries by day"""
+    zone = streaks.get_zone(current_user.timezone_name)
+    selected = _calendar_month_arg(zone)
+    if selected is None:
+        flash('Invalid month, showing the current one.', 'warning')
+        return redirect(url_for('writing_calendar_view'))
+    year, month = selected
+
+    first, last = writing_calendar.month_bounds(year, month)
+    start, end = writing_calendar.utc_bounds(first, last, zone)
+    # Titles and metadata only; the month view never loads entry content
+    entries = DiaryEntry.query\
+        .filter(DiaryEntry.user_id == current_user.id, DiaryEntry.timestamp >= start, DiaryEntry.timestamp < end)\
+        .options(db.load_only(DiaryEntry.id, DiaryEntry.title, DiaryEntry.excerpt, DiaryEntry.word_count,
+                              DiaryEntry.is_favorite, DiaryEntry.timestamp))\
+        .order_by(DiaryEntry.timestamp).all()
+    entries_by_day = {}
+    for entry in entries:
+        entries_by_day.setdefault(streaks.local_day(entry.timestamp, zone), []).append(entry)
+
+    totals = calendar_year(current_user, year)
+    month_totals = [(count, words) for day, count, words in totals if day.month == month]
+    return render_template('calendar.html',
+                           year=year, month=month, first=first,
+                           today=streaks.today_in(zone),
+                           weeks=writing_calendar.month_weeks(year, month),
+                           entries_by_day=entries_by_day,
+                           heatmap=writing_calendar.year_heatmap(year, totals),
+                           year_entries=sum(count for _, count, _ in totals),
+                           year_days=len(totals),
+                           month_entries=sum(count for count, _ in month_totals),
+                           month_words=sum(words for _, words in month_totals),
+                           prev_month=writing_calendar.shift_month(year, month, -1),
+                           next_month=writing_calendar.shift_month(year, month, 1))
 
 # Categories Management
 @app.route('/categories')
@@ -839,6 +1416,7 @@ def create_category():
     try:
         category = Category(name=name, color=color, user_id=current_user.id)
         db.session.add(category)
+        current_user.bump_categories_version()
         db.session.commit()
         
         app.logger.info(f'Category created successfully by {current_user.username} - ID: {category.id}')
@@ -876,10 +1454,6 @@ def create_template():
         flash('Template name and content are required', 'danger')
         return redirect(url_for('templates'))
     
-    if __name__ == '__main__':
-        app.run(debug=True)
-    direct(url_for('templates'))
-    
     # Process tags
     tags_list = []
     if tags_input:
@@ -899,6 +1473,7 @@ def create_template():
         template.set_tags_list(tags_list)
         
         db.session.add(template)
+        current_user.bump_templates_version()
         db.session.commit()
         
         app.logger.info(f'Template created successfully by {current_user.username} - ID: {template.id}')
@@ -913,16 +1488,13 @@ def create_template():
 @app.route('/templates/use/<int:template_id>')
 @login_required
 def use_template(template_id):
-    template = EntryTemplate.query.filter_by(id=template_id, user_id=current_user.id).first_or_404()
+    template = next((t for t in get_user_templates(current_user) if t['id'] == template_id), None)
+    if template is None:
+        abort(404)
     
-    # Get user's categories for the form
-    categories = Category.query.filter_by(user_id=current_user.id).all()
-    
-    return render_template('write.html', 
-                         categories=categories,
-                         template=template,
-                         template_content=template.content,
-                         template_title=template.name)
+    return render_write_form(template=template,
+                             template_content=template['content'],
+                             template_title=template['name'])
 
 @app.route('/templates/delete/<int:template_id>', methods=['POST'])
 @login_required
@@ -931,6 +1503,7 @@ def delete_template(template_id):
     
     try:
         db.session.delete(template)
+        current_user.bump_templates_version()
         db.session.commit()
         app.logger.info(f'Template deleted by {current_user.username} - ID: {template_id}')
         flash('Template deleted successfully!', 'success')
@@ -942,13 +1515,15 @@ def delete_template(template_id):
     return redirect(url_for('templates'))
 
 # Statistics Dashboard
-@app.route('/stats')
-@login_required
-def stats():
-    app.logger.info(f'Statistics page accessed by {current_user.username}')
-    
-    # Get user's entries
-    entries = DiaryEntry.query.filter_by(user_id=current_user.id).all()
+def compute_stats(user_id):
+    """Statistics page payload for `user_id` (JSON-serializable)."""
+    # Statistics only need the precomputed columns, not the text. Newest first,
+    # so the per-day dicts below don't depend on the query plan
+    entries = DiaryEntry.query.filter_by(user_id=user_id)\
+        .options(db.load_only(DiaryEntry.id, DiaryEntry.category_id, DiaryEntry.mood, DiaryEntry.tags,
+                              DiaryEntry.word_count, DiaryEntry.timestamp))\
+        .order_by(DiaryEntry.timestamp.desc())\
+        .all()
     
     # Calculate statistics
     total_entries = len(entries)
@@ -1004,29 +1579,33 @@ def stats():
     # Most common mood
     most_common_mood = max(mood_stats.items(), key=lambda x: x[1])[0] if mood_stats else None
     
-    # Mood improvement tracking (comparing first half vs second half of entries)
-    if len(entries) >= 10:
-        midpoint = len(entries) // 2
-        first_half = entries[midpoint:]
-        second_half = entries[:midpoint]
-        
-        first_half_moods = [entry.mood for entry in first_half if entry.mood]
-        second_half_moods = [entry.mood for entry in second_half if entry.mood]
-        
-        first_half_positive = len([m for m in first_half_moods if m in ['😊 Happy', '🎉 Excited', '😌 Peaceful']])
-        second_half_positive = len([m for m in second_half_moods if m in ['😊 Happy', '🎉 Excited', '😌 Peaceful']])
-        
-        mood_improvement = second_half_positive - first_half_positive
+    # Sentiment (sentiment.py): averaged in SQL; entries not scored yet are NULL and ignored.
+    # mood_improvement is the last 30 days' average minus the average before that
+    since = thirty_days_ago.replace(tzinfo=None)
+    recent = DiaryEntry.timestamp >= since
+    avg_sentiment, recent_sentiment, earlier_sentiment = db.session.query(
+        db.func.avg(DiaryEntry.sentiment),
+        db.func.avg(db.case((recent, DiaryEntry.sentiment))),
+        db.func.avg(db.case((DiaryEntry.timestamp < since, DiaryEntry.sentiment))),
+    ).filter(DiaryEntry.user_id == user_id).one()
+    if recent_sentiment is not None and earlier_sentiment is not None:
+        mood_improvement = round(recent_sentiment - earlier_sentiment, 2)
     else:
         mood_improvement = None
+    day = db.func.date(DiaryEntry.timestamp)
+    sentiment_trend = {
+        str(key): round(value, 2)
+        for key, value in db.session.query(day, db.func.avg(DiaryEntry.sentiment))
+        .filter(DiaryEntry.user_id == user_id, recent, DiaryEntry.sentiment.isnot(None))
+        .group_by(day).order_by(day.desc())
+    }
     
     # Category statistics
+    category_names = dict(db.session.query(Category.id, Category.name).filter_by(user_id=user_id).all())
     category_stats = defaultdict(int)
     for entry in entries:
-        if entry.category_id:
-            category = Category.query.get(entry.category_id)
-            if category:
-                category_stats[category.name] += 1
+        if entry.category_id in category_names:
+            category_stats[category_names[entry.category_id]] += 1
     
     # Most used tags
     tag_stats = defaultdict(int)
@@ -1043,12 +1622,101 @@ def stats():
         'mood_trends': dict(mood_trends),
         'most_common_mood': most_common_mood,
         'mood_improvement': mood_improvement,
+        'avg_sentiment': round(avg_sentiment, 2) if avg_sentiment is not None else None,
+        'sentiment_trend': sentiment_trend,
         'category_stats': dict(category_stats),
         'tag_stats': dict(sorted(tag_stats.items(), key=lambda x: x[1], reverse=True)[:10])
     }
     
+    return stats_data
+
+def load_stats(user):
+    """Stats for `user` from its rollup when current, else computed now."""
+    rollup = db.session.get(StatsRollup, user.id)
+    if (rollup and rollup.data_version == user.data_version
+            and rollup.computed_on == datetime.now(timezone.utc).date()):
+        return json.loads(rollup.payload)
+    return compute_stats(user.id)
+
+@app.route('/stats')
+@login_required
+@conditional_get
+@read_snapshot
+def stats():
+    app.logger.info(f'Statistics page accessed by {current_user.username}')
+    stats_data = load_stats(current_user)
     return render_template('stats.html', stats=stats_data)
 
+# Year in Review
+def compute_year_review(user_id, year, timezone_name):
+    """Year-in-review payload of `user_id` for the local `year`: one pass over its entries, plus keywords"""
+    zone = streaks.get_zone(timezone_name)
+    start, end = writing_calendar.utc_bounds(date(year, 1, 1), date(year, 12, 31), zone)
+    in_year = (DiaryEntry.user_id == user_id, DiaryEntry.timestamp >= start, DiaryEntry.timestamp < end)
+    rows = db.session.execute(
+        db.select(DiaryEntry.id, DiaryEntry.title, DiaryEntry.timestamp, DiaryEntry.word_count,
+                  DiaryEntry.mood, DiaryEntry.category_id, DiaryEntry.tags)
+        .where(*in_year).order_by(DiaryEntry.timestamp)
+        .execution_options(yield_per=500))
+    report = year_review.build(year, rows, zone)
+
+    if report['entries']:
+        # The year's term vectors, ranked against document frequencies over the whole diary
+        vectors = db.session.query(EntryTerm.entry_id, EntryTerm.term, EntryTerm.count)\
+            .join(DiaryEntry, DiaryEntry.id == EntryTerm.entry_id)\
+            .filter(EntryTerm.user_id == user_id, *in_year).all()
+        doc_freq = dict(db.session.query(UserTerm.term, UserTerm.doc_freq).filter_by(user_id=user_id).all())
+        total = db.session.query(db.func.count(DiaryEntry.id)).filter_by(user_id=user_id).scalar()
+        entry_ids, terms, counts = zip(*vectors) if vectors else ((), (), ())
+        ranked = keywords.top_terms(entry_ids, terms, counts, doc_freq, total, limit=year_review.TOP_KEYWORDS)
+        report['keywords'] = ranked.get(None, [])
+    return report
+
+def load_year_review(user, year):
+    """(payload, updating) of `user`'s stored report for `year`; payload is None until first built
+
+    The job only stores reports for years between the first and last entry, so
+    a year without entries (a new user's current year, say) gets its empty
+    report here; finding that out is one index seek.
+    """
+    review = db.session.get(YearReview, (user.id, year))
+    if review is None or review.payload is None or review.report_version != year_review.REPORT_VERSION:
+        zone = streaks.get_zone(user.timezone_name)
+        start, end = writing_calendar.utc_bounds(date(year, 1, 1), date(year, 12, 31), zone)
+        written = db.session.query(DiaryEntry.id).filter(
+            DiaryEntry.user_id == user.id, DiaryEntry.timestamp >= start, DiaryEntry.timestamp < end).first()
+        if written is None:
+            return year_review.build(year, [], zone), False
+        return None, True
+    return json.loads(review.payload), year_review.needs_build(review, user.timezone_name)
+
+@app.route('/review', defaults={'year': None})
+@app.route('/review/<int:year>')
+@login_required
+def year_in_review(year):
+    """Stored year-in-review report; never computed during the request"""
+    if year is None:
+        year = streaks.today_in(streaks.get_zone(current_user.timezone_name)).year
+    if not datetime.min.year < year < datetime.max.year:
+        abort(404)
+    report, updating = load_year_review(current_user, year)
+    years = [stored for stored, in db.session.query(YearReview.year).filter_by(user_id=current_user.id)]
+    categories = {category['id']: category for category in get_user_categories(current_user)}
+    return render_template('review.html', year=year, report=report, updating=updating,
+                           years=sorted(set(years) | {year}, reverse=True), categories=categories,
+                           weekday_names=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
+
+@app.route('/api/review/<int:year>')
+@login_required
+def api_year_in_review(year):
+    """Stored year-in-review JSON; 202 while it has not been generated yet"""
+    if not datetime.min.year < year < datetime.max.year:
+        return jsonify({'error': 'year out of range'}), 400
+    report, updating = load_year_review(current_user, year)
+    if report is None:
+        return jsonify({'year': year, 'status': 'pending'}), 202
+    return jsonify({'status': 'updating' if updating else 'ready', 'report': report})
+
 # Backup/Restore Routes
 @app.route('/backup', methods=['GET', 'POST'])
 @login_required
@@ -1077,6 +1745,7 @@ def backup_restore():
     
     return render_template('backup_restore.html')
 
+@read_snapshot
 def create_backup():
     """Create a complete backup of user's data"""
     try:
@@ -1103,7 +1772,8 @@ def create_backup():
             })
         
         # Get entries
-        entries = DiaryEntry.query.filter_by(user_id=current_user.id).all()
+        entries = DiaryEntry.query.filter_by(user_id=current_user.id)\
+            .options(db.undefer(DiaryEntry.content)).all()
         for entry in entries:
             entry_data = {
                 'id': entry.id,
@@ -1200,8 +1870,7 @@ def restore_backup(file):
                     weather=entry_data.get('weather'),
                     location=entry_data.get('location'),
                     is_private=entry_data.get('is_private', True),
-                    is_favorite=entry_data.get('is_favorite', False),
-                    word_count=entry_data.get('word_count', 0)
+                    is_favorite=entry_data.get('is_favorite', False)
                 )
                 entry.set_tags_list(entry_data.get('tags', []))
                 
@@ -1231,6 +1900,10 @@ def restore_backup(file):
                 
                 db.session.add(template)
         
+        # Restored entries can carry any past timestamp
+        current_user.recompute_streak()
+        current_user.bump_categories_version()
+        current_user.bump_templates_version()
         db.session.commit()
         
         app.logger.info(f'Backup restored by {current_user.username}')
@@ -1294,7 +1967,8 @@ def bot_chat():
             User message: {user_message}
             """
 
-            response = gemini_model.generate_content(context_prompt)
+            response = gemini_model.generate_content(
+                context_prompt, request_options={'timeout': app.config['AI_REQUEST_TIMEOUT']})
 
             if response and response.text:
                 return jsonify({
@@ -1355,7 +2029,8 @@ def suggest_prompts():
             Each prompt should be 1-2 sentences long and inspiring.
             """
 
-            response = gemini_model.generate_content(prompt_request)
+            response = gemini_model.generate_content(
+                prompt_request, request_options={'timeout': app.config['AI_REQUEST_TIMEOUT']})
 
             if response and response.text:
                 # Parse the response into individual prompts
@@ -1423,11 +2098,14 @@ def suggest_prompts():
 # Export Entries
 @app.route('/export')
 @login_required
+@read_snapshot
 def export_entries():
     app.logger.info(f'Export requested by {current_user.username}')
     
     format_type = request.args.get('format', 'txt')
-    entries = DiaryEntry.query.filter_by(user_id=current_user.id).order_by(DiaryEntry.timestamp.desc()).all()
+    entries = DiaryEntry.query.filter_by(user_id=current_user.id)\
+        .options(db.undefer(DiaryEntry.content))\
+        .order_by(DiaryEntry.timestamp.desc()).all()
     
     if format_type == 'json':
         export_data = []
@@ -1499,9 +2177,11 @@ def categories():
     """Display and manage user categories"""
     app.logger.info(f'Categories page accessed by {current_user.username}')
 
-    # Get user's categories with entry counts
+    # Get user's categories with entry counts; joining on user_id too lets the
+    # count use idx_user_category instead of scanning every user's entries
     categories = db.session.query(Category, db.func.count(DiaryEntry.id).label('entry_count'))\
-        .outerjoin(DiaryEntry, Category.id == DiaryEntry.category_id)\
+        .outerjoin(DiaryEntry, db.and_(DiaryEntry.user_id == Category.user_id,
+                                       DiaryEntry.category_id == Category.id))\
         .filter(Category.user_id == current_user.id)\
         .group_by(Category.id)\
         .order_by(Category.name)\
@@ -1544,6 +2224,7 @@ def create_category():
         # Create new category
         category = Category(name=name, color=color, user_id=current_user.id)
         db.session.add(category)
+        current_user.bump_categories_version()
         db.session.commit()
 
         app.logger.info(f'Category created: {name} by {current_user.username}')
@@ -1559,7 +2240,7 @@ def create_category():
 # Edit Category
 @app.route('/categories/<int:category_id>/edit', methods=['POST'], endpoint='edit_category_post')
 @login_required
-@limiter.limit("30 per hour")
+@limiter.shared_limit(OPERATION_LIMITS['edit_category'], scope='edit_category')
 def edit_category(category_id):
     """Edit an existing category"""
     category = Category.query.filter_by(id=category_id, user_id=current_user.id).first_or_404()
@@ -1587,6 +2268,7 @@ def edit_category(category_id):
         old_name = category.name
         category.name = name
         category.color = color
+        current_user.bump_categories_version()
         db.session.commit()
 
         app.logger.info(f'Category updated: {old_name} -> {name} by {current_user.username}')
@@ -1602,7 +2284,7 @@ def edit_category(category_id):
 # Delete Category
 @app.route('/categories/<int:category_id>/delete', methods=['POST'], endpoint='delete_category_post')
 @login_required
-@limiter.limit("10 per hour")
+@limiter.shared_limit(OPERATION_LIMITS['delete_category'], scope='delete_category')
 def delete_category(category_id):
     """Delete a category and unassign it from entries"""
     category = Category.query.filter_by(id=category_id, user_id=current_user.id).first_or_404()
@@ -1617,6 +2299,7 @@ def delete_category(category_id):
 
         # Delete the category
         db.session.delete(category)
+        current_user.bump_categories_version()
         db.session.commit()
 
         app.logger.info(f'Category deleted: {category.name} by {current_user.username}')
@@ -1632,12 +2315,14 @@ def delete_category(category_id):
 # View Entries by Category
 @app.route('/categories/<int:category_id>', endpoint='view_category_entries_get')
 @login_required
+@conditional_get
 def view_category_entries(category_id):
     """View all entries in a specific category"""
     category = Category.query.filter_by(id=category_id, user_id=current_user.id).first_or_404()
 
     # Get entries in this category
     entries = DiaryEntry.query.filter_by(category_id=category_id, user_id=current_user.id)\
+        .options(db.load_only(*ENTRY_CARD_COLUMNS))\
         .order_by(DiaryEntry.timestamp.desc()).all()
 
     return render_template('category_entries.html',
@@ -1647,6 +2332,7 @@ def view_category_entries(category_id):
 # API endpoint to get category entries count
 @app.route('/api/categories/<int:category_id>/entries')
 @login_required
+@limiter.shared_limit(OPERATION_LIMITS['category_entries'], scope='category_entries')
 def get_category_entries_count(category_id):
     """Get the number of entries in a category (AJAX endpoint)"""
     category = Category.query.filter_by(id=category_id, user_id=current_user.id).first()
@@ -1661,15 +2347,57 @@ def get_category_entries_count(category_id):
         'entry_count': count
     })
 
+# Keywords (keywords.py)
+@app.route('/api/keywords')
+@login_required
+@conditional_get
+@read_snapshot
+def api_keywords():
+    """Top TF-IDF keywords overall, plus per month or category with ?by=month|category"""
+    by = request.args.get('by')
+    if by not in (None, 'month', 'category'):
+        return jsonify({'error': "by must be 'month' or 'category'"}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    user_id = current_user.id
+
+    entries = db.session.query(DiaryEntry.id, DiaryEntry.timestamp, DiaryEntry.category_id)\
+        .filter_by(user_id=user_id).all()
+    doc_freq = dict(db.session.query(UserTerm.term, UserTerm.doc_freq).filter_by(user_id=user_id).all())
+    vectors = db.session.query(EntryTerm.entry_id, EntryTerm.term, EntryTerm.count)\
+        .filter_by(user_id=user_id).all()
+    entry_ids, terms, counts = zip(*vectors) if vectors else ((), (), ())
+
+    def ranked(groups=None):
+        return keywords.top_terms(entry_ids, terms, counts, doc_freq, len(entries), groups=groups, limit=limit)
+
+    def as_json(pairs):
+        return [{'term': term, 'score': score} for term, score in pairs]
+
+    result = {'entries': len(entries), 'keywords': as_json(ranked().get(None, []))}
+    if by == 'month':
+        # UTC months, like the monthly counts on /stats
+        months = ranked({entry.id: entry.timestamp.strftime('%Y-%m') for entry in entries if entry.timestamp})
+        result['months'] = [{'month': month, 'keywords': as_json(months[month])}
+                            for month in sorted(months, reverse=True)]
+    elif by == 'category':
+        names = dict(db.session.query(Category.id, Category.name).filter_by(user_id=user_id).all())
+        categories = ranked({entry.id: entry.category_id for entry in entries if entry.category_id in names})
+        result['categories'] = [{'id': category_id, 'name': names[category_id],
+                                 'keywords': as_json(categories[category_id])}
+                                for category_id in sorted(categories, key=lambda c: names[c].lower())]
+    return jsonify(result)
+
 # Toggle Favorite/Pin Entry
 @app.route('/toggle_favorite/<int:entry_id>', methods=['POST'])
 @login_required
-@limiter.limit("50 per hour")
+@limiter.shared_limit(OPERATION_LIMITS['toggle_favorite'], scope='toggle_favorite')
 def toggle_favorite(entry_id):
     entry = DiaryEntry.query.filter_by(id=entry_id, user_id=current_user.id).first_or_404()
 
     try:
-        entry.is_favorite = not entry.is_favorite
+        # Clients may send the desired state, which makes retries/replays idempotent
+        desired = (request.get_json(silent=True) or {}).get('is_favorite')
+        entry.is_favorite = desired if isinstance(desired, bool) else not entry.is_favorite
         db.session.commit()
 
         status = 'pinned' if entry.is_favorite else 'unpinned'
@@ -1688,6 +2416,945 @@ def toggle_favorite(entry_id):
             'message': 'An error occurred. Please try again.'
         }), 500
 
+# ------------------ SYNC API ------------------
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_CHANGES = 200
+
+def serialize_entry(entry):
+    return {
+        'id': entry.id,
+        'version': entry.sync_version,
+        'title': entry.title,
+        'content': entry.content,
+        'category_id': entry.category_id,
+        'mood': entry.mood,
+        'weather': entry.weather,
+        'location': entry.location,
+        'tags': entry.get_tags_list(),
+        'is_private': entry.is_private,
+        'is_favorite': entry.is_favorite,
+        'word_count': entry.word_count,
+        'timestamp': sync.isoformat(entry.timestamp),
+        'updated_at': sync.isoformat(entry.updated_at),
+    }
+
+def serialize_category(category):
+    return {
+        'id': category.id,
+        'version': category.sync_version,
+        'name': category.name,
+        'color': category.color,
+        'created_at': sync.isoformat(category.created_at),
+    }
+
+def serialize_template(template):
+    return {
+        'id': template.id,
+        'version': template.sync_version,
+        'name': template.name,
+        'content': template.content,
+        'category_id': template.category_id,
+        'mood': template.mood,
+        'weather': template.weather,
+        'location': template.location,
+        'tags': template.get_tags_list(),
+        'created_at': sync.isoformat(template.created_at),
+    }
+
+SYNC_SERIALIZERS = {'entry': serialize_entry, 'category': serialize_category, 'template': serialize_template}
+
+def _sync_text(data, key, max_length, required=False):
+    """Validated optional string field from a sync change payload"""
+    value = data.get(key)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            raise ValueError(f'{key} is required')
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{key} must be a string')
+    value = value.strip()
+    if len(value) > max_length:
+        raise ValueError(f'{key} is too long (maximum {max_length} characters)')
+    return value
+
+def _sync_tags(data):
+    tags = data.get('tags') or []
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError('tags must be a list of strings')
+    return [tag.strip() for tag in tags if tag.strip()]
+
+def _sync_category_id(data):
+    category_id = data.get('category_id')
+    if category_id is None:
+        return None
+    if not isinstance(category_id, int) or not Category.query.filter_by(id=category_id, user_id=current_user.id).first():
+        raise ValueError('unknown category_id')
+    return category_id
+
+def _entry_fields(data):
+    """Validated entry fields from a client payload, with the same limits as /write"""
+    content = _sync_text(data, 'content', 10000, required=True)
+    if len(content) < 10:
+        raise ValueError('Entry must be at least 10 characters long')
+    return {
+        'content': content,
+        'title': _sync_text(data, 'title', 200),
+        'category_id': _sync_category_id(data),
+        'mood': _sync_text(data, 'mood', 20),
+        'weather': _sync_text(data, 'weather', 50),
+        'location': _sync_text(data, 'location', 100),
+        'tags': _sync_tags(data),
+        'is_private': bool(data.get('is_private', True)),
+        'is_favorite': bool(data.get('is_favorite', False)),
+    }
+
+def _category_fields(data):
+    color = _sync_text(data, 'color', 7) or '#667eea'
+    if not re.fullmatch(r'#[0-9a-fA-F]{6}', color):
+        raise ValueError('color must be a #rrggbb hex value')
+    return {'name': _sync_text(data, 'name', 50, required=True), 'color': color}
+
+def _template_fields(data):
+    return {
+        'name': _sync_text(data, 'name', 100, required=True),
+        'content': _sync_text(data, 'content', 10000, required=True),
+        'category_id': _sync_category_id(data),
+        'mood': _sync_text(data, 'mood', 20),
+        'weather': _sync_text(data, 'weather', 50),
+        'location': _sync_text(data, 'location', 100),
+        'tags': _sync_tags(data),
+    }
+
+SYNC_VALIDATORS = {'entry': _entry_fields, 'category': _category_fields, 'template': _template_fields}
+
+def apply_sync_change(change):
+    """Apply one client change to the session (no commit).
+
+    Returns (result, row, kind): result is the per-change status dict sent back
+    to the client; row is the created/updated object, if any. Invalid data
+    raises ValueError before anything is modified.
+    """
+    kind = change.get('type')
+    op = change.get('op', 'upsert')
+    result = {'client_id': change.get('client_id'), 'type': kind, 'id': change.get('id')}
+    if kind not in SYNCED_MODELS or op not in ('upsert', 'patch', 'delete'):
+        result.update(status='error', error='unknown type or op')
+        return result, None, kind
+
+    model = SYNCED_MODELS[kind]
+    row = None
+    if change.get('id') is not None:
+        query = model.query.filter_by(id=change['id'], user_id=current_user.id)
+        if kind == 'entry':
+            query = query.options(db.undefer(DiaryEntry.content))
+        row = query.first()
+        if row is None:
+            # Deleted on the server (or never ours); a delete is already done
+            result['status'] = 'applied' if op == 'delete' else 'conflict'
+            result['server'] = None
+            return result, None, kind
+        # A patch without base_version is last-writer-wins for the fields it names
+        if (op != 'patch' or 'base_version' in change) and change.get('base_version') != row.sync_version:
+            result.update(status='conflict', server=SYNC_SERIALIZERS[kind](row))
+            return result, None, kind
+    elif op in ('patch', 'delete'):
+        result.update(status='error', error=f'{op} needs an id')
+        return result, None, kind
+
+    if op == 'delete':
+        if kind == 'category':
+            for entry in DiaryEntry.query.filter_by(category_id=row.id, user_id=current_user.id).all():
+                entry.category_id = None
+        db.session.delete(row)
+        result['status'] = 'applied'
+        return result, None, kind
+
+    data = change.get('data') or {}
+    if not isinstance(data, dict):
+        raise ValueError('data must be an object')
+    if op == 'patch':
+        # Validate the row as it will look after the patch
+        data = {**SYNC_SERIALIZERS[kind](row), **data}
+    fields = SYNC_VALIDATORS[kind](data)
+    if row is None:
+        row = model(user_id=current_user.id)
+        if kind == 'entry':
+            # Entries written offline keep the time they were written
+            row.timestamp = sync.parse_timestamp(data.get('timestamp')) or datetime.now(timezone.utc)
+    for field, value in fields.items():
+        if field == 'tags':
+            row.set_tags_list(value)
+        else:
+            setattr(row, field, value)
+    db.session.add(row)
+    result['status'] = 'applied'
+    return result, row, kind
+
+def sync_delta(since):
+    """Rows changed after the cursor `since` (None: everything) for the current user.
+
+    Entries are paged SYNC_PAGE_SIZE at a time on (sync_version, id); the
+    cursor is (version, last id sent at that version), or (version, None)
+    once a version is complete. Categories, templates and tombstones are small
+    and always sent whole up to the cursor's version.
+    """
+    user_id = current_user.id
+    version, last_id = since if since is not None else (-1, None)
+    latest = db.session.query(User.data_version).filter_by(id=user_id).scalar() or 0
+
+    after_cursor = DiaryEntry.sync_version > version
+    if last_id is not None:
+        after_cursor = db.or_(after_cursor, db.and_(DiaryEntry.sync_version == version, DiaryEntry.id > last_id))
+    entries = DiaryEntry.query.filter(DiaryEntry.user_id == user_id, after_cursor)\
+        .options(db.undefer(DiaryEntry.content))\
+        .order_by(DiaryEntry.sync_version, DiaryEntry.id)\
+        .limit(SYNC_PAGE_SIZE + 1).all()
+    more = len(entries) > SYNC_PAGE_SIZE
+    if more:
+        entries = entries[:SYNC_PAGE_SIZE]
+        cursor = (entries[-1].sync_version, entries[-1].id)
+    else:
+        cursor = (latest, None)
+
+    def changed(model):
+        return model.query.filter(model.user_id == user_id, model.sync_version > version,
+                                  model.sync_version <= cursor[0]).order_by(model.sync_version).all()
+
+    deleted = {kind: [] for kind in SYNCED_MODELS}
+    if since is not None:
+        for tombstone in changed(SyncTombstone):
+            deleted[tombstone.kind].append(tombstone.object_id)
+
+    return {
+        'full': since is None,
+        'token': sync.make_token(user_id, *cursor),
+        'more': more,
+        'entries': [serialize_entry(e) for e in entries],
+        'categories': [serialize_category(c) for c in changed(Category)],
+        'templates': [serialize_template(t) for t in changed(EntryTemplate)],
+        'deleted': deleted,
+    }
+
+@app.route('/api/sync', methods=['GET', 'POST'])
+@login_required
+@csrf.exempt  # JSON bodies only (get_json rejects form posts), so cross-site forms cannot use it
+@limiter.limit("300 per hour")
+def api_sync():
+    """Delta sync for offline-capable clients.
+
+    GET  ?since=<token>  changes after the token; no/invalid token = full dump
+    POST {"since": token, "changes": [...]}  apply client changes in one
+         transaction, then return the delta plus a result per change
+
+    Each change is {"op": "upsert"|"patch"|"delete", "type": "entry"|"category"|
+    "template", "id": server id or null for new rows, "client_id": any,
+    "base_version": version the client last saw, "data": {...}}. A change whose
+    base_version no longer matches the server row is reported as a conflict with
+    the server copy and not applied. "patch" updates only the fields in data and
+    may omit base_version (e.g. the offline favorite toggle in sw.js).
+    """
+    if request.method == 'GET':
+        since = sync.read_token(request.args.get('since'), current_user.id)
+        return jsonify(sync_delta(since))
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('changes', []), list):
+        return jsonify({'error': 'Expected a JSON object with a "changes" list'}), 400
+    changes = payload.get('changes', [])
+    if len(changes) > SYNC_MAX_CHANGES:
+        return jsonify({'error': f'At most {SYNC_MAX_CHANGES} changes per request'}), 400
+    since = sync.read_token(payload.get('since'), current_user.id)
+
+    results, created = [], []
+    touched_kinds, streak_times, deleted_entries = set(), [], False
+    try:
+        for change in changes:
+            if not isinstance(change, dict):
+                results.append({'status': 'error', 'error': 'change must be an object'})
+                continue
+            try:
+                result, row, kind = apply_sync_change(change)
+            except ValueError as e:
+                result, row, kind = {'client_id': change.get('client_id'), 'type': change.get('type'),
+                                     'id': change.get('id'), 'status': 'error', 'error': str(e)}, None, None
+            results.append(result)
+            if result['status'] != 'applied':
+                continue
+            touched_kinds.add(kind)
+            if row is not None:
+                created.append((result, row))
+                if kind == 'entry' and change.get('id') is None:
+                    streak_times.append(row.timestamp)
+            elif kind == 'entry':
+                deleted_entries = True
+
+        if deleted_entries or len(streak_times) > 1:
+            current_user.recompute_streak()
+        elif streak_times:
+            current_user.update_streak(streak_times[0])
+        if 'category' in touched_kinds:
+            current_user.bump_categories_version()
+        if 'template' in touched_kinds:
+            current_user.bump_templates_version()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f'Error applying sync changes for {current_user.username}: {str(e)}')
+        return jsonify({'error': 'An error occurred while applying changes. Please try again.'}), 500
+
+    for result, row in created:
+        result['id'] = row.id
+        result['version'] = row.sync_version
+    app.logger.info(f'Sync by {current_user.username}: {len(changes)} changes, '
+                    f"{sum(r['status'] == 'applied' for r in results)} applied")
+
+    response = sync_delta(since)
+    response['results'] = results
+    return jsonify(response)
+
+# ------------------ BATCH API ------------------
+# Page scripts send the AJAX calls of one tick together (static/src/js/batch.js)
+BATCH_MAX_OPERATIONS = 100
+
+class BatchOperationError(Exception):
+    """A sub-operation that cannot be applied; reported in its result, the batch goes on"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _batch_id(operation):
+    value = operation.get('id')
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise BatchOperationError(400, 'id must be an integer')
+    return value
+
+def _batch_category(operation):
+    category = Category.query.filter_by(id=_batch_id(operation), user_id=current_user.id).first()
+    if category is None:
+        raise BatchOperationError(404, 'Category not found')
+    return category
+
+def batch_toggle_favorite(operation):
+    """Like POST /toggle_favorite/<id>: {"id", "is_favorite": optional desired state}"""
+    entry = DiaryEntry.query.filter_by(id=_batch_id(operation), user_id=current_user.id)\
+        .options(db.load_only(DiaryEntry.id, DiaryEntry.is_favorite)).first()
+    if entry is None:
+        raise BatchOperationError(404, 'Entry not found')
+    desired = operation.get('is_favorite')
+    entry.is_favorite = desired if isinstance(desired, bool) else not entry.is_favorite
+    status = 'pinned' if entry.is_favorite else 'unpinned'
+    return {'success': True, 'is_favorite': entry.is_favorite, 'message': f'Entry {status} successfully!'}
+
+def batch_edit_category(operation):
+    """Like POST /categories/<id>/edit: {"id", "name", "color"}"""
+    category = _batch_category(operation)
+    try:
+        fields = _category_fields(operation)
+    except ValueError as e:
+        raise BatchOperationError(400, str(e))
+    duplicate = Category.query.filter_by(name=fields['name'], user_id=current_user.id)\
+        .filter(Category.id != category.id).first()
+    if duplicate:
+        raise BatchOperationError(409, 'A category with this name already exists')
+    category.name = fields['name']
+    category.color = fields['color']
+    current_user.bump_categories_version()
+    return {'success': True, 'category': {'id': category.id, 'name': category.name, 'color': category.color},
+            'message': f'Category "{category.name}" updated successfully!'}
+
+def batch_delete_category(operation):
+    """Like POST /categories/<id>/delete: {"id"}; the category's entries are kept, uncategorized"""
+    category = _batch_category(operation)
+    for entry in DiaryEntry.query.filter_by(category_id=category.id, user_id=current_user.id).all():
+        entry.category_id = None
+    db.session.delete(category)
+    current_user.bump_categories_version()
+    return {'success': True, 'message': f'Category "{category.name}" deleted successfully!'}
+
+def batch_category_entries(operation):
+    """Like GET /api/categories/<id>/entries: {"id"}"""
+    category = _batch_category(operation)
+    count = db.session.query(db.func.count(DiaryEntry.id))\
+        .filter_by(category_id=category.id, user_id=current_user.id).scalar()
+    return {'category_id': category.id, 'entry_count': count}
+
+BATCH_OPERATIONS = {
+    'toggle_favorite': batch_toggle_favorite,
+    'edit_category': batch_edit_category,
+    'delete_category': batch_delete_category,
+    'category_entries': batch_category_entries,
+}
+
+def _batch_count(name):
+    """How many operations called `name` the batch being requested holds (0 if it will be rejected)"""
+    payload = request.get_json(silent=True)
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list) or len(operations) > BATCH_MAX_OPERATIONS:
+        return 0
+    return sum(isinstance(operation, dict) and operation.get('op') == name for operation in operations)
+
+def batch_limit(name):
+    """Charge each `name` operation of a batch to the bucket its single-item route uses"""
+    return limiter.shared_limit(OPERATION_LIMITS[name], scope=name,
+                                cost=lambda: _batch_count(name), exempt_when=lambda: not _batch_count(name))
+
+@app.route('/api/batch', methods=['POST'])
+@login_required
+@limiter.limit("300 per hour")
+@batch_limit('toggle_favorite')
+@batch_limit('edit_category')
+@batch_limit('delete_category')
+@batch_limit('category_entries')
+def api_batch():
+    """Run a list of sub-operations in order, in one transaction.
+
+    Body: {"operations": [{"op": name, ...arguments}, ...]} with the names in
+    BATCH_OPERATIONS. Returns {"results": [...]}, one per operation in the same
+    order: {"op", "status": HTTP-like code, "result": {...}} or {"op", "status",
+    "error"}. A failed operation changes nothing and later operations still run
+    (they see the effects of the earlier ones); everything that succeeded is
+    committed together. Each operation counts against the rate limit of its
+    single-item route; a batch that would exceed one is refused as a whole (429).
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('operations'), list):
+        return jsonify({'error': 'Expected a JSON object with an "operations" list'}), 400
+    operations = payload['operations']
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({'error': f'At most {BATCH_MAX_OPERATIONS} operations per request'}), 400
+
+    results = []
+    try:
+        for operation in operations:
+            name = operation.get('op') if isinstance(operation, dict) else None
+            if not isinstance(name, str):
+                name = None
+            handler = BATCH_OPERATIONS.get(name)
+            if handler is None:
+                results.append({'op': name, 'status': 400, 'error': 'unknown operation'})
+                continue
+            try:
+                results.append({'op': name, 'status': 200, 'result': handler(operation)})
+            except BatchOperationError as e:
+                results.append({'op': name, 'status': e.status, 'error': str(e)})
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f'Error applying batch for {current_user.username}: {str(e)}')
+        return jsonify({'error': 'An error occurred while applying the batch. Please try again.'}), 500
+
+    app.logger.info(f'Batch by {current_user.username}: {len(operations)} operations, '
+                    f"{sum(r['status'] == 200 for r in results)} succeeded")
+    return jsonify({'results': results})
+
+# ------------------ BACKGROUND JOBS ------------------
+# Run by `flask jobs run` or, with SCHEDULER_ENABLED, by one elected web worker
+jobs = Scheduler(db, JobRun, JobLock)
+
+@jobs.job(every(hours=1), lease=600)
+def purge_reset_tokens():
+    """Clear expired password-reset tokens"""
+    result = db.session.execute(
+        db.update(User)
+        .where(User.reset_token_expires < datetime.now(timezone.utc))
+        .values(reset_token=None, reset_token_expires=None))
+    db.session.commit()
+    return f'{result.rowcount} expired tokens cleared'
+
+@jobs.job(every(minutes=15), lease=1800)
+def refresh_stats_rollups(batch_size=200):
+    """Precompute /stats for recently active users whose rollup is stale"""
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    active_since = now - timedelta(days=app.config['STATS_ROLLUP_ACTIVE_DAYS'])
+    active = db.session.query(User.id, User.data_version)\
+        .filter(db.or_(User.last_login >= active_since, User.data_updated_at >= active_since))\
+        .order_by(User.id).all()
+
+    # Rollups sit next to the entries (in the user's shard when sharded), so
+    # staleness is checked per user. The version is read before computing: if
+    # the user writes meanwhile, the rollup is stored under the old version
+    # and simply never used
+    refreshed = 0
+    for user_id, version in active:
+        with shards.use(user_id, db.session):
+            rollup = db.session.get(StatsRollup, user_id)
+            if rollup and rollup.data_version == version and rollup.computed_on >= today:
+                continue
+            db.session.merge(StatsRollup(user_id=user_id, data_version=version, computed_on=today,
+                                         computed_at=now, payload=json.dumps(compute_stats(user_id))))
+            refreshed += 1
+            if shards.enabled or refreshed % batch_size == 0:
+                db.session.commit()
+    db.session.commit()
+    return f'{refreshed} rollups refreshed'
+
+@jobs.job(every(minutes=10), lease=1800)
+def refresh_year_reviews():
+    """Build year-in-review reports for recently active users: new years, stale or outdated reports"""
+    now = datetime.now(timezone.utc)
+    active_since = now - timedelta(days=app.config['STATS_ROLLUP_ACTIVE_DAYS'])
+    active = db.session.query(User.id, User.timezone_name)\
+        .filter(db.or_(User.last_login >= active_since, User.data_updated_at >= active_since))\
+        .order_by(User.id).all()
+
+    built = 0
+    for user_id, timezone_name in active:
+        with shards.use(user_id, db.session):
+            first, last = db.session.query(db.func.min(DiaryEntry.timestamp), db.func.max(DiaryEntry.timestamp))\
+                .filter(DiaryEntry.user_id == user_id).one()
+            reviews = {review.year: review for review in YearReview.query.filter_by(user_id=user_id)}
+            if first is not None:
+                zone = streaks.get_zone(timezone_name)
+                # Rows are committed before building so later entry writes bump their entries_version
+                for year in range(streaks.local_day(first, zone).year, streaks.local_day(last, zone).year + 1):
+                    if year not in reviews:
+                        reviews[year] = YearReview(user_id=user_id, year=year)
+                        db.session.add(reviews[year])
+                db.session.commit()
+
+            for year, review in sorted(reviews.items()):
+                if not year_review.needs_build(review, timezone_name):
+                    continue
+                # Read before building: a write meanwhile leaves built_from behind, so it is rebuilt next run
+                seen = review.entries_version
+                report = compute_year_review(user_id, year, timezone_name)
+                review.payload = json.dumps(report)
+                review.built_from = seen
+                review.report_version = year_review.REPORT_VERSION
+                review.timezone_name = timezone_name
+                review.generated_at = now
+                db.session.commit()
+                built += 1
+    return f'{built} reports built'
+
+@jobs.job(cron('30 3 * * *'))
+def database_maintenance():
+    """Nightly SQLite upkeep: stale optimizer stats, free pages, WAL checkpoint"""
+    with db.engine.connect() as conn:
+        report = {
+            'optimize': db_maintenance.optimize(conn),
+            'vacuum': db_maintenance.incremental_vacuum(conn),
+            'checkpoint': db_maintenance.checkpoint(conn),
+        }
+    if shards.enabled:
+        swept = reclaimed = busy = 0
+        for user_id in shards.shard_ids():
+            with shards.connect(user_id) as conn:
+                db_maintenance.optimize(conn)
+                reclaimed += db_maintenance.incremental_vacuum(conn)['reclaimed']
+                busy += db_maintenance.checkpoint(conn)['busy']
+            swept += 1
+        report['shards'] = {'count': swept, 'reclaimed': reclaimed, 'busy': busy}
+    return json.dumps(report)
+
+@jobs.job(cron('0 4 * * 0'))
+def analyze_database():
+    """Weekly full ANALYZE so the planner sees current table and index statistics"""
+    with db.engine.connect() as conn:
+        report = db_maintenance.analyze(conn)
+    if shards.enabled:
+        for user_id in shards.shard_ids():
+            with shards.connect(user_id) as conn:
+                db_maintenance.analyze(conn)
+        report['shards'] = len(shards.shard_ids())
+    return json.dumps(report)
+
+@jobs.job(cron('0 5 * * *'), lease=600)
+def prune_job_history():
+    """Delete job runs older than JOB_HISTORY_DAYS, keeping each job's latest"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=app.config['JOB_HISTORY_DAYS'])
+    latest = db.session.query(db.func.max(JobRun.id)).group_by(JobRun.job_name)
+    result = db.session.execute(
+        db.delete(JobRun).where(JobRun.started_at < cutoff, JobRun.id.not_in(latest.scalar_subquery())))
+    db.session.commit()
+    return f'{result.rowcount} runs deleted'
+
+# ------------------ CLI COMMANDS ------------------
+streaks_cli = AppGroup('streaks', help='Writing-streak maintenance.')
+
+@streaks_cli.command('repair')
+@click.option('--username', default=None, help='Only repair this user.')
+@click.option('--batch-size', default=200, show_default=True, help='Users per commit.')
+def repair_streaks(username, batch_size):
+    """Recompute every user's streak from entry history"""
+    query = User.query.order_by(User.id)
+    if username:
+        query = query.filter_by(username=username)
+
+    checked = changed = 0
+    for user in query.yield_per(batch_size):
+        before = user._streak_state()
+        with shards.use(user.id, db.session):
+            user.recompute_streak()
+        checked += 1
+        if user._streak_state() != before:
+            changed += 1
+        if checked % batch_size == 0:
+            db.session.commit()
+    db.session.commit()
+    click.echo(f'Checked {checked} users, repaired {changed} streaks')
+
+app.cli.add_command(streaks_cli)
+
+jobs_cli = AppGroup('jobs', help='Background job scheduler.')
+
+def _fmt_time(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else '-'
+
+@jobs_cli.command('list')
+def list_jobs():
+    """Show registered jobs with their last and next run (UTC)"""
+    last = jobs.last_runs()
+    click.echo(f"{'job':<24}{'schedule':<20}{'last run':<18}{'status':<10}{'next run':<18}")
+    for job in jobs.jobs.values():
+        run = JobRun.query.filter_by(job_name=job.name).order_by(JobRun.started_at.desc()).first()
+        next_run = jobs.next_run(job, last.get(job.name))
+        click.echo(f"{job.name:<24}{str(job.schedule):<20}{_fmt_time(last.get(job.name)):<18}"
+                   f"{run.status if run else '-':<10}{_fmt_time(next_run) if next_run else 'now':<18}")
+
+@jobs_cli.command('run')
+@click.option('--poll', default=None, type=int, help='Seconds between checks (default: SCHEDULER_POLL_SECONDS).')
+def run_scheduler(poll):
+    """Run due jobs until interrupted (the separate scheduler process)"""
+    poll = poll or app.config['SCHEDULER_POLL_SECONDS']
+    click.echo(f'Scheduler running {len(jobs.jobs)} jobs, polling every {poll}s')
+    try:
+        jobs.run_forever(app, poll_seconds=poll, elect=True)
+    except KeyboardInterrupt:
+        click.echo('Scheduler stopped')
+
+@jobs_cli.command('run-once')
+@click.argument('names', nargs=-1)
+def run_jobs_once(names):
+    """Run the named jobs now, or every due job when none are named"""
+    unknown = [name for name in names if name not in jobs.jobs]
+    if unknown:
+        raise click.BadParameter(f"unknown job(s): {', '.join(unknown)}", param_hint='NAMES')
+    selected = [jobs.jobs[name] for name in names] if names else jobs.due()
+    for job in selected:
+        click.echo(f'{job.name}: {jobs.run_job(job, app)}')
+    if not selected:
+        click.echo('No jobs due')
+
+@jobs_cli.command('history')
+@click.option('--job', 'job_name', default=None, help='Only this job.')
+@click.option('--limit', default=20, show_default=True)
+def job_history(job_name, limit):
+    """Show recent job runs"""
+    query = JobRun.query.order_by(JobRun.started_at.desc())
+    if job_name:
+        query = query.filter_by(job_name=job_name)
+    for run in query.limit(limit):
+        duration = f'{run.duration_ms}ms' if run.duration_ms is not None else '-'
+        detail = (run.error or '').strip().splitlines()[-1:] if run.status == 'failed' else [run.result or '']
+        click.echo(f"{_fmt_time(run.started_at)}  {run.job_name:<24}{run.status:<10}{duration:>9}  {detail[0] if detail else ''}")
+
+app.cli.add_command(jobs_cli)
+
+db_maint_cli = AppGroup('db-maint', help='Database maintenance and index health (SQLite).')
+
+def hot_queries(user_id):
+    """The busiest page queries, built the way their routes build them"""
+    entries = DiaryEntry.query.filter_by(user_id=user_id)
+    category_id = db.session.query(Category.id).filter_by(user_id=user_id).limit(1).scalar() or 0
+    return {
+        'dashboard': entries.options(db.load_only(*ENTRY_CARD_COLUMNS))
+            .order_by(DiaryEntry.is_favorite.desc(), DiaryEntry.timestamp.desc()).limit(10).statement,
+        'search': entries.filter(DiaryEntry.content.contains('coffee')).options(db.undefer(DiaryEntry.content))
+            .order_by(DiaryEntry.timestamp.desc()).statement,
+        'category listing': DiaryEntry.query.filter_by(category_id=category_id, user_id=user_id)
+            .options(db.load_only(*ENTRY_CARD_COLUMNS)).order_by(DiaryEntry.timestamp.desc()).statement,
+        'categories page': db.session.query(Category, db.func.count(DiaryEntry.id))
+            .outerjoin(DiaryEntry, db.and_(DiaryEntry.user_id == Category.user_id,
+                                           DiaryEntry.category_id == Category.id))
+            .filter(Category.user_id == user_id).group_by(Category.id).order_by(Category.name).statement,
+        'stats': entries.options(db.load_only(DiaryEntry.id, DiaryEntry.category_id, DiaryEntry.mood,
+                                              DiaryEntry.tags, DiaryEntry.word_count, DiaryEntry.timestamp))
+            .order_by(DiaryEntry.timestamp.desc()).statement,
+        'stats categories': db.session.query(Category.id, Category.name).filter_by(user_id=user_id).statement,
+        'keyword vectors': db.session.query(EntryTerm.entry_id, EntryTerm.term, EntryTerm.count)
+            .filter_by(user_id=user_id).statement,
+        'keyword doc freq': db.session.query(UserTerm.term, UserTerm.doc_freq).filter_by(user_id=user_id).statement,
+        'similar candidates': db.session.query(EntryBucket.entry_id).distinct()
+            .filter(EntryBucket.user_id == user_id, EntryBucket.bucket.in_([1, 2, 3])).statement,
+        'on this day': db.session.query(DiaryEntry.id, DiaryEntry.title, DiaryEntry.timestamp)
+            .filter(DiaryEntry.user_id == user_id, DiaryEntry.month_day.in_([1017, 1018, 1019]),
+                    DiaryEntry.timestamp < datetime(2026, 10, 18)).statement,
+        'calendar year': db.session.query(DiaryEntry.timestamp, DiaryEntry.word_count)
+            .filter(DiaryEntry.user_id == user_id, DiaryEntry.timestamp >= datetime(2026, 1, 1),
+                    DiaryEntry.timestamp < datetime(2027, 1, 1)).order_by(DiaryEntry.timestamp).statement,
+        'calendar month': db.session.query(DiaryEntry.id, DiaryEntry.title, DiaryEntry.excerpt, DiaryEntry.timestamp)
+            .filter(DiaryEntry.user_id == user_id, DiaryEntry.timestamp >= datetime(2026, 10, 1),
+                    DiaryEntry.timestamp < datetime(2026, 11, 1)).order_by(DiaryEntry.timestamp).statement,
+        'year review entries': db.session.query(DiaryEntry.id, DiaryEntry.title, DiaryEntry.timestamp,
+                                                 DiaryEntry.word_count, DiaryEntry.mood, DiaryEntry.category_id,
+                                                 DiaryEntry.tags)
+            .filter(DiaryEntry.user_id == user_id, DiaryEntry.timestamp >= datetime(2025, 1, 1),
+                    DiaryEntry.timestamp < datetime(2026, 1, 1)).order_by(DiaryEntry.timestamp).statement,
+        'streak recompute': db.session.query(DiaryEntry.timestamp).filter_by(user_id=user_id)
+            .order_by(DiaryEntry.timestamp).statement,
+        'sync delta': entries.filter(DiaryEntry.sync_version > 0)
+            .order_by(DiaryEntry.sync_version, DiaryEntry.id).limit(SYNC_PAGE_SIZE).statement,
+    }
+
+def _fmt_bytes(value):
+    if value is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if value < 1024 or unit == 'GB':
+            return f'{value:.0f} {unit}' if unit == 'B' else f'{value:.1f} {unit}'
+        value /= 1024
+
+@db_maint_cli.command('analyze')
+def db_analyze():
+    """Rebuild planner statistics for every table and index (ANALYZE)"""
+    with db.engine.connect() as conn:
+        click.echo(db_maintenance.analyze(conn))
+
+@db_maint_cli.command('optimize')
+def db_optimize():
+    """PRAGMA optimize: re-analyze only where the statistics are stale"""
+    with db.engine.connect() as conn:
+        click.echo(db_maintenance.optimize(conn))
+
+@db_maint_cli.command('vacuum')
+@click.option('--pages', default=None, type=int, help='Free at most this many pages (default: all).')
+@click.option('--enable-incremental', is_flag=True,
+              help='Switch the database to auto_vacuum=INCREMENTAL first (one full VACUUM; locks the database).')
+def db_vacuum(pages, enable_incremental):
+    """Return free pages to the filesystem (incremental VACUUM)"""
+    with db.engine.connect() as conn:
+        if enable_incremental:
+            click.echo(db_maintenance.enable_incremental_vacuum(conn))
+        result = db_maintenance.incremental_vacuum(conn, pages)
+    click.echo(result)
+    if result.get('auto_vacuum') == 'off':
+        click.echo('auto_vacuum is off; run with --enable-incremental once to turn it on')
+
+@db_maint_cli.command('backfill-month-day')
+@click.option('--batch-size', default=500, show_default=True, help='Entries per UPDATE batch.')
+def db_backfill_month_day(batch_size):
+    """Fill diary_entry.month_day where it is missing, in the main database and every shard
+
+    The migration backfills the main database; shards created before it need this once.
+    """
+    entries = DiaryEntry.__table__
+    engines = [('main', db.engine)] + [(f'shard {user_id}', shards.engine_for(user_id))
+                                      for user_id in (shards.shard_ids() if shards.enabled else [])]
+    for name, engine in engines:
+        filled = 0
+        with engine.connect() as conn:
+            while True:
+                rows = conn.execute(db.select(entries.c.id, entries.c.timestamp)
+                                    .where(entries.c.month_day.is_(None), entries.c.timestamp.isnot(None))
+                                    .limit(batch_size)).all()
+                if not rows:
+                    break
+                # updated_at = updated_at keeps the column's onupdate from firing
+                conn.execute(entries.update().where(entries.c.id == db.bindparam('row_id'))
+                             .values(month_day=db.bindparam('row_month_day'), updated_at=entries.c.updated_at),
+                             [{'row_id': row.id, 'row_month_day': entry_fields.month_day(row.timestamp)}
+                              for row in rows])
+                conn.commit()
+                filled += len(rows)
+        click.echo(f'{name}: {filled} entries')
+
+@db_maint_cli.command('integrity')
+@click.option('--quick', is_flag=True, help='quick_check: skip index/table cross-checks.')
+def db_integrity(quick):
+    """integrity_check plus foreign_key_check; exits non-zero on problems"""
+    with db.engine.connect() as conn:
+        problems = db_maintenance.integrity_check(conn, quick=quick)
+    for problem in problems:
+        click.echo(problem)
+    if problems:
+        raise SystemExit(1)
+    click.echo('ok')
+
+@db_maint_cli.command('sizes')
+def db_sizes():
+    """Per-table and per-index size, page count and rows"""
+    with db.engine.connect() as conn:
+        summary = db_maintenance.database_summary(conn)
+        rows = db_maintenance.table_sizes(conn)
+    click.echo(f"{_fmt_bytes(summary.get('bytes'))} in {summary.get('pages')} pages of {summary.get('page_size')} B; "
+               f"{summary.get('free_pages')} free; journal={summary.get('journal_mode')} "
+               f"auto_vacuum={summary.get('auto_vacuum')}")
+    click.echo(f"{'name':<36}{'type':<7}{'table':<20}{'pages':>8}{'size':>11}{'rows':>10}")
+    for row in rows:
+        click.echo(f"{row['name']:<36}{row['type']:<7}{row['table']:<20}"
+                   f"{row['pages'] if row['pages'] is not None else '-':>8}{_fmt_bytes(row['bytes']):>11}"
+                   f"{row['rows'] if row['rows'] is not None else '':>10}")
+
+@db_maint_cli.command('explain')
+@click.option('--user-id', default=None, type=int, help='User whose queries to plan (default: the first user).')
+@click.option('--verbose', is_flag=True, help='Print the full plan of every query.')
+def db_explain(user_id, verbose):
+    """EXPLAIN QUERY PLAN for the hot queries; exits non-zero on full table scans"""
+    if user_id is None:
+        user_id = db.session.query(db.func.min(User.id)).scalar() or 1
+    # The hot queries only touch per-user tables, so plan them in the user's shard when sharded
+    engine = shards.engine_for(user_id) if shards.enabled else db.engine
+    with shards.use(user_id, db.session), engine.connect() as conn:
+        report = db_maintenance.explain_report(conn, hot_queries(user_id))
+
+    flagged = 0
+    for name, result in report.items():
+        status = 'FULL SCAN' if result['full_scans'] else 'ok'
+        if result['temp_sorts'] and not result['full_scans']:
+            status = 'ok (temp sort)'
+        click.echo(f'{name:<20}{status}')
+        steps = result['plan'] if verbose else result['full_scans'] + result['temp_sorts']
+        for step in steps:
+            click.echo(f'    {step}')
+        flagged += bool(result['full_scans'])
+    if flagged and shards.enabled:
+        # A shard holds one user's rows, so the planner rightly prefers scanning to a user_id index
+        click.echo(f'{flagged} hot queries scan a whole table (expected in a per-user shard)')
+    elif flagged:
+        click.echo(f'{flagged} hot queries scan a whole table')
+        raise SystemExit(1)
+
+app.cli.add_command(db_maint_cli)
+
+shards_cli = AppGroup('shards', help='Per-user SQLite shards (SHARDING_ENABLED).')
+
+@shards_cli.command('split')
+@click.option('--user-id', 'user_ids', multiple=True, type=int, help='Only this user (repeatable).')
+@click.option('--delete-source', is_flag=True, help='Delete the copied rows from the main database afterwards.')
+def split_shards(user_ids, delete_source):
+    """Copy each user's entries, categories, templates and stats into their shard"""
+    if shards.enabled:
+        # The main database is no longer written to; copying it would overwrite newer shard data
+        raise click.UsageError('split reads the main database; run it with SHARDING_ENABLED off')
+    query = db.session.query(User.id).order_by(User.id)
+    if user_ids:
+        query = query.filter(User.id.in_(user_ids))
+
+    split = 0
+    for (user_id,) in query.all():
+        counts = shards.split_user(db.engine, user_id, delete_source=delete_source)
+        click.echo(f'user {user_id}: ' + ', '.join(f'{count} {table}' for table, count in counts.items()))
+        split += 1
+    click.echo(f'Split {split} users into {shards.shard_dir}; set SHARDING_ENABLED=true to serve from them')
+
+@shards_cli.command('list')
+def list_shards():
+    """Show each shard file with its owner, size and entry count"""
+    user_ids = shards.shard_ids()
+    names = dict(db.session.query(User.id, User.username).filter(User.id.in_(user_ids))) if user_ids else {}
+    click.echo(f"{'user':>6}  {'username':<20}{'size':>11}{'entries':>9}")
+    for user_id in user_ids:
+        with shards.connect(user_id) as conn:
+            entries = conn.execute(db.select(db.func.count()).select_from(DiaryEntry.__table__)).scalar()
+        click.echo(f"{user_id:>6}  {names.get(user_id, '?'):<20}"
+                   f"{_fmt_bytes(os.path.getsize(shards.path_for(user_id))):>11}{entries:>9}")
+    click.echo(f'{len(user_ids)} shards in {shards.shard_dir}' + ('' if shards.enabled else ' (SHARDING_ENABLED is off)'))
+
+app.cli.add_command(shards_cli)
+
+sentiment_cli = AppGroup('sentiment', help='Lexicon sentiment scores (sentiment.py).')
+
+@sentiment_cli.command('backfill')
+@click.option('--all', 'rescore', is_flag=True, help='Rescore every entry, not only unscored ones.')
+@click.option('--batch-size', default=250, show_default=True, help='Entries per scoring batch.')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True,
+              help='Scoring processes; 1 scores in this process.')
+def backfill_sentiment(rescore, batch_size, workers):
+    """Score existing entries in batches across a process pool"""
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    pool = None
+    if workers > 1:
+        # spawn: the workers only need sentiment.py, not a fork of the app and its connections
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    score = pool.map if pool else map
+    entries = DiaryEntry.__table__
+    scored = users = 0
+    try:
+        for (user_id,) in db.session.query(User.id).order_by(User.id).all():
+            user_scored = 0
+            with shards.use(user_id, db.session):
+                last_id = 0
+                while True:
+                    # A page feeds every worker one batch; updated_at is written back unchanged
+                    query = db.select(entries.c.id, entries.c.content, entries.c.updated_at)\
+                        .where(entries.c.user_id == user_id, entries.c.id > last_id)\
+                        .order_by(entries.c.id).limit(batch_size * workers)
+                    if not rescore:
+                        query = query.where(entries.c.sentiment.is_(None))
+                    rows = db.session.execute(query).all()
+                    if not rows:
+                        break
+                    texts = [[row.content for row in rows[i:i + batch_size]]
+                             for i in range(0, len(rows), batch_size)]
+                    scores = [value for batch in score(sentiment.score_batch, texts) for value in batch]
+                    db.session.execute(db.update(DiaryEntry), [
+                        {'id': row.id, 'sentiment': value, 'updated_at': row.updated_at}
+                        for row, value in zip(rows, scores)])
+                    db.session.commit()
+                    last_id = rows[-1].id
+                    user_scored += len(rows)
+            if user_scored:
+                # Bulk updates skip the sync flush hook; bump the version so stats rollups and ETags refresh
+                db.session.execute(db.update(User).where(User.id == user_id).values(
+                    data_version=User.data_version + 1, data_updated_at=datetime.now(timezone.utc)))
+                db.session.commit()
+                scored += user_scored
+                users += 1
+    finally:
+        if pool:
+            pool.shutdown()
+    click.echo(f'Scored {scored} entries for {users} users')
+
+app.cli.add_command(sentiment_cli)
+
+keywords_cli = AppGroup('keywords', help='Per-user TF-IDF keyword index (keywords.py).')
+
+@keywords_cli.command('rebuild')
+@click.option('--user-id', 'user_ids', multiple=True, type=int, help='Only these users (repeatable).')
+def rebuild_keywords(user_ids):
+    """Recompute the term index from scratch (after upgrading, or to repair drift)"""
+    query = db.session.query(User.id).order_by(User.id)
+    if user_ids:
+        query = query.filter(User.id.in_(user_ids))
+
+    indexed = users = 0
+    for (user_id,) in query.all():
+        with shards.use(user_id, db.session):
+            connection = db.session.connection(bind_arguments={'mapper': DiaryEntry.__mapper__})
+            indexed += keywords.rebuild_user(connection, DiaryEntry.__table__, EntryTerm.__table__,
+                                             UserTerm.__table__, user_id)
+            db.session.commit()
+        users += 1
+    click.echo(f'Indexed {indexed} entries for {users} users')
+
+app.cli.add_command(keywords_cli)
+
+similarity_cli = AppGroup('similarity', help='MinHash/LSH index behind related entries (similarity.py).')
+
+@similarity_cli.command('rebuild')
+@click.option('--user-id', 'user_ids', multiple=True, type=int, help='Only these users (repeatable).')
+def rebuild_similarity(user_ids):
+    """Recompute entry signatures and LSH buckets from scratch"""
+    query = db.session.query(User.id).order_by(User.id)
+    if user_ids:
+        query = query.filter(User.id.in_(user_ids))
+
+    indexed = users = 0
+    for (user_id,) in query.all():
+        with shards.use(user_id, db.session):
+            connection = db.session.connection(bind_arguments={'mapper': DiaryEntry.__mapper__})
+            indexed += similarity.rebuild_user(connection, DiaryEntry.__table__, EntrySignature.__table__,
+                                               EntryBucket.__table__, user_id)
+            db.session.commit()
+        users += 1
+    click.echo(f'Indexed {indexed} entries for {users} users')
+
+app.cli.add_command(similarity_cli)
+
 # Initialize database tables for production deployment
 with app.app_context():
     try:
@@ -1708,4 +3375,6 @@ with app.app_context():
 if __name__ == '__main__':
     # Production deployment configuration
     port = int(os.environ.get("PORT", 5000))
+    if app.config['SCHEDULER_ENABLED']:
+        jobs.start(app, poll_seconds=app.config['SCHEDULER_POLL_SECONDS'])
     app.run(host="0.0.0.0", port=port, debug=False)
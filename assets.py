@@ -0,0 +1,210 @@
+"""
+Static asset pipeline.
+
+Page CSS and JavaScript live under static/src, third-party files under
+static/vendor. `flask assets build` concatenates them into the bundles listed
+in BUNDLES, minifies them, names each output after a hash of its content and
+writes gzip and brotli copies alongside it in static/dist, together with
+manifest.json mapping bundle names to the fingerprinted files.
+
+Templates reference bundles through asset_url(). Built files are served from
+/assets with an immutable one-year Cache-Control, since a fingerprinted file
+never changes, picking the precompressed variant the client accepts. With
+ASSETS_DEBUG set, or when a bundle has not been built yet, asset_url() points
+at the unminified sources instead, concatenated on the fly and not cached.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+import click
+from flask import Blueprint, Response, abort, current_app, request, send_file, url_for
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:  # optional; gzip copies are always written
+    brotli = None
+
+# Bundle name -> source files, relative to the static folder
+BUNDLES = {
+    'base.css': ['src/css/base.css'],
+    'base.js': ['src/js/base.js', 'src/js/batch.js'],
+    'dashboard.css': ['src/css/dashboard.css'],
+    'dashboard.js': ['src/js/dashboard.js'],
+    'bot.css': ['src/css/bot.css'],
+    'bot.js': ['src/js/bot.js'],
+    'calendar.css': ['src/css/calendar.css'],
+    'review.css': ['src/css/review.css'],
+    'auth.css': ['vendor/bootstrap-5.1.3/css/bootstrap.min.css'],
+    'auth.js': ['vendor/bootstrap-5.1.3/js/bootstrap.min.js'],
+}
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Checked in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+assets_bp = Blueprint('assets', __name__)
+assets_cli = AppGroup('assets', help='Build and inspect static asset bundles.')
+
+
+def _dist_path(app, *parts):
+    return os.path.join(app.static_folder, DIST_DIR, *parts)
+
+
+def load_manifest(app):
+    """Read static/dist/manifest.json; an empty dict if it has not been built."""
+    try:
+        with open(_dist_path(app, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def read_sources(app, name):
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(app.static_folder, source), encoding='utf-8') as f:
+            parts.append(f.read())
+    return '\n'.join(parts)
+
+
+def minify(name, text):
+    """Minify CSS/JS text, keeping /*! license comments."""
+    if name.endswith('.css'):
+        import rcssmin
+        return rcssmin.cssmin(text, keep_bang_comments=True)
+    if name.endswith('.js'):
+        import rjsmin
+        return rjsmin.jsmin(text, keep_bang_comments=True)
+    return text
+
+
+def build(app, do_minify=True):
+    """Build every bundle into static/dist and rewrite the manifest.
+
+    Returns:
+        list: (bundle name, output file, raw bytes, gzip bytes, brotli bytes or None)
+    """
+    dist = _dist_path(app)
+    os.makedirs(dist, exist_ok=True)
+
+    manifest, report, outputs = {}, [], {MANIFEST_NAME}
+    for name in BUNDLES:
+        text = read_sources(app, name)
+        if do_minify:
+            text = minify(name, text)
+        data = text.encode('utf-8')
+
+        stem, ext = os.path.splitext(name)
+        filename = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        # mtime=0 keeps the .gz byte-identical between builds
+        variants = {'': data, '.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+        for suffix, payload in variants.items():
+            with open(os.path.join(dist, filename + suffix), 'wb') as f:
+                f.write(payload)
+            outputs.add(filename + suffix)
+
+        manifest[name] = filename
+        report.append((name, filename, len(data), len(variants['.gz']),
+                       len(variants['.br']) if '.br' in variants else None))
+
+    # Drop outputs of previous builds so dist/ only holds what the manifest references
+    for existing in os.listdir(dist):
+        if existing not in outputs:
+            os.remove(os.path.join(dist, existing))
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    app.extensions['assets'] = manifest
+    return report
+
+
+def asset_url(name):
+    """URL for a bundle: the fingerprinted build, or the live sources in debug."""
+    manifest = current_app.extensions.get('assets', {})
+    if current_app.config.get('ASSETS_DEBUG') or name not in manifest:
+        return url_for('assets.source', name=name)
+    return url_for('assets.built', filename=manifest[name])
+
+
+@assets_bp.route('/assets/<path:filename>')
+def built(filename):
+    if filename not in current_app.extensions.get('assets', {}).values():
+        abort(404)
+
+    path = _dist_path(current_app, filename)
+    encoding = None
+    for candidate, suffix in ENCODINGS:
+        if candidate in request.accept_encodings and os.path.exists(path + suffix):
+            path, encoding = path + suffix, candidate
+            break
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_file(path, mimetype=mimetype, conditional=True, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@assets_bp.route('/assets/src/<name>')
+def source(name):
+    if name not in BUNDLES:
+        abort(404)
+    response = Response(read_sources(current_app, name),
+                        mimetype=mimetypes.guess_type(name)[0])
+    response.cache_control.no_cache = True
+    return response
+
+
+@assets_cli.command('build')
+@click.option('--no-minify', is_flag=True, help='Concatenate only, for debugging the output.')
+def build_command(no_minify):
+    """Build fingerprinted, precompressed bundles into static/dist."""
+    report = build(current_app, do_minify=not no_minify)
+    click.echo(f"{'bundle':<16}{'file':<32}{'raw':>10}{'gzip':>10}{'brotli':>10}")
+    for name, filename, raw, gz, br in report:
+        click.echo(f"{name:<16}{filename:<32}{raw:>10}{gz:>10}{br if br is not None else '-':>10}")
+    if brotli is None:
+        click.echo('Brotli is not installed; only gzip variants were written.')
+
+
+@assets_cli.command('check')
+def check_command():
+    """Exit non-zero if static/dist is missing or older than its sources."""
+    manifest = load_manifest(current_app)
+    stale = []
+    for name in BUNDLES:
+        filename = manifest.get(name)
+        if not filename or not os.path.exists(_dist_path(current_app, filename)):
+            stale.append(name)
+            continue
+        with open(_dist_path(current_app, filename), 'rb') as f:
+            if minify(name, read_sources(current_app, name)).encode('utf-8') != f.read():
+                stale.append(name)
+    if stale:
+        click.echo(f"Out of date: {', '.join(stale)}. Run `flask assets build`.")
+        raise SystemExit(1)
+    click.echo('All bundles are up to date.')
+
+
+def init_assets(app):
+    """Register the asset routes, the asset_url() template global and the CLI."""
+    app.extensions['assets'] = load_manifest(app)
+    if not app.extensions['assets'] and not app.config.get('ASSETS_DEBUG'):
+        app.logger.warning('static/dist/manifest.json not found; serving unbuilt assets. '
+                           'Run `flask assets build`.')
+    app.register_blueprint(assets_bp)
+    app.add_template_global(asset_url)
+    app.cli.add_command(assets_cli)
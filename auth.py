@@ -25,6 +25,7 @@ def forgot_password():
         if user:
             # Generate and send password reset email
             token = user.get_reset_token()
+            db.session.commit()
             send_password_reset_email(user.email, user.username, token)
             
         # Always show success message to prevent email enumeration
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark: bytes on the wire and CPU cost per route.
+
+Logs in to a generated database through a Flask test client and fetches each
+route with Accept-Encoding set to identity, gzip and br. For every route it
+reports the response size per encoding and the CPU time spent per request,
+both for the whole request (identity) and for compressing the body alone with
+the same settings the middleware uses (see compression.py).
+
+Usage:
+    python benchmarks/bench_compression.py
+    python benchmarks/bench_compression.py --entries 500 --repeat 20
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import loadtest  # noqa: E402
+
+ROUTES = [
+    ('GET', '/dashboard', None),
+    ('GET', '/bot', None),
+    ('GET', '/search?q=work', None),
+    ('GET', '/stats', None),
+    ('GET', '/export?format=json', None),
+    ('GET', '/export?format=txt', None),
+    ('POST', '/backup', {'action': 'create_backup'}),
+]
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def _fetch(client, method, path, data, encoding):
+    headers = {'Accept-Encoding': encoding}
+    if method == 'POST':
+        return client.post(path, data=data, headers=headers)
+    return client.get(path, headers=headers)
+
+
+def cpu_ms(fn, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) * 1000 / repeat
+
+
+def measure(client, repeat):
+    import compression
+
+    rows = []
+    for method, path, data in ROUTES:
+        sizes = {}
+        for encoding in ENCODINGS:
+            resp = _fetch(client, method, path, data, encoding)
+            if resp.status_code != 200:
+                raise RuntimeError(f'{method} {path} returned {resp.status_code}')
+            sizes[encoding] = len(resp.get_data())
+            if encoding == 'identity':
+                body = resp.get_data()
+
+        request_ms = cpu_ms(lambda: _fetch(client, method, path, data, 'identity'), repeat)
+
+        def compress(encoding):
+            compressor = compression._Compressor(encoding)
+            return compressor.compress(body) + compressor.finish()
+
+        rows.append({
+            'route': f'{method} {path}',
+            'sizes': sizes,
+            'request_ms': request_ms,
+            'gzip_ms': cpu_ms(lambda: compress('gzip'), repeat),
+            'br_ms': cpu_ms(lambda: compress('br'), repeat) if compression.brotli else None,
+        })
+    return rows
+
+
+def print_report(rows):
+    print(f"{'route':<28}{'identity':>10}{'gzip':>9}{'br':>9}{'saved':>8}"
+          f"{'req cpu ms':>12}{'gzip ms':>9}{'br ms':>8}")
+    for row in rows:
+        sizes = row['sizes']
+        best = min(sizes['gzip'], sizes['br'])
+        saved = 100 * (1 - best / sizes['identity']) if sizes['identity'] else 0
+        br_ms = f"{row['br_ms']:.2f}" if row['br_ms'] is not None else '-'
+        print(f"{row['route']:<28}{sizes['identity']:>10}{sizes['gzip']:>9}{sizes['br']:>9}{saved:>7.0f}%"
+              f"{row['request_ms']:>12.2f}{row['gzip_ms']:>9.2f}{br_ms:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure compressed response sizes and CPU cost per route.')
+    parser.add_argument('--entries', type=int, default=200, help='entries for the benchmark user')
+    parser.add_argument('--repeat', type=int, default=10, help='timed repetitions per measurement')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('AI_BOT_BACKEND', 'stub')
+    os.environ['RATELIMIT_ENABLED'] = 'false'
+    workdir = tempfile.mkdtemp(prefix='diary-bench-compression-')
+    try:
+        loadtest.generate_database(os.path.join(workdir, 'diary.db'), 1, args.entries)
+        from app import app
+        app.config['WTF_CSRF_ENABLED'] = False
+
+        client = app.test_client()
+        resp = client.post('/login', data={'username': 'loaduser0', 'password': loadtest.PASSWORD})
+        if resp.status_code != 302:
+            raise RuntimeError('login failed')
+        print_report(measure(client, args.repeat))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
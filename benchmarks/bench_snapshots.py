@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Write latency while heavy reads run: read-only snapshot connections vs not.
+
+Boots gunicorn (gunicorn.conf.py, 2 workers by default) once with
+READ_SNAPSHOTS_ENABLED off and once on, against the same generated
+database. Reader sessions loop over the long read routes (/stats, JSON
+/export and backup creation); writer sessions, some logged in as the same
+users, loop over /write and /toggle_favorite. Reports writer latency and
+reader throughput per mode.
+
+Usage:
+    python benchmarks/bench_snapshots.py
+    python benchmarks/bench_snapshots.py --readers 6 --writers 4 --duration 30
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import loadtest  # noqa: E402
+
+ENTRY_LINK_RE = re.compile(r'/entry/(\d+)')
+WRITE_ROUTES = ['write_submit', 'toggle_favorite']
+READ_ROUTES = ['stats', 'export', 'backup']
+
+
+def _reader(base_url, username, recorder, stop_at, seed):
+    rng = random.Random(seed)
+    session = loadtest.Session(base_url, recorder)
+    session.login(username)
+    _, html = session.request(None, 'GET', '/backup')
+    token = session.csrf_token(html)
+    while time.time() < stop_at:
+        route = rng.choice(READ_ROUTES)
+        if route == 'stats':
+            session.request('stats', 'GET', '/stats')
+        elif route == 'export':
+            session.request('export', 'GET', '/export?format=json')
+        else:
+            session.request('backup', 'POST', '/backup', form={'csrf_token': token, 'action': 'create_backup'})
+
+
+def _writer(base_url, username, recorder, stop_at, seed):
+    rng = random.Random(seed)
+    session = loadtest.Session(base_url, recorder)
+    session.login(username)
+    _, html = session.request(None, 'GET', '/dashboard')
+    entry_ids = ENTRY_LINK_RE.findall(html)
+    token = session.csrf_token(html) or session.csrf_token(session.request(None, 'GET', '/write')[1])
+    while time.time() < stop_at:
+        loadtest.scenario_write(session, rng)
+        if entry_ids:
+            session.request('toggle_favorite', 'POST', f'/toggle_favorite/{rng.choice(entry_ids)}',
+                            json_body={}, headers={'X-CSRFToken': token})
+
+
+def run_mode(db_path, snapshots, workers, readers, writers, users, duration, warmup, log_path):
+    os.environ['READ_SNAPSHOTS_ENABLED'] = 'true' if snapshots else 'false'
+    port = loadtest._free_port()
+    server = loadtest.start_server(db_path, port, workers, log_path=log_path)
+    base_url = f'http://127.0.0.1:{port}'
+    recorder = loadtest.Recorder()
+    stop_at = time.time() + warmup + duration
+    # Readers use the first users; writers cover every user, so some share a reader's user
+    threads = [threading.Thread(target=_reader, args=(base_url, f'loaduser{i % max(1, users // 2)}',
+                                                      recorder, stop_at, i), daemon=True)
+               for i in range(readers)]
+    threads += [threading.Thread(target=_writer, args=(base_url, f'loaduser{i % users}', recorder,
+                                                       stop_at, 1000 + i), daemon=True)
+                for i in range(writers)]
+    try:
+        for t in threads:
+            t.start()
+        time.sleep(warmup)
+        recorder.enabled = True
+        measured_from = time.time()
+        for t in threads:
+            t.join()
+        recorder.enabled = False
+    finally:
+        loadtest.stop_server(server)
+    return loadtest.summarize(recorder, time.time() - measured_from)
+
+
+def print_report(results):
+    header = f"{'snapshots':<11}" + ''.join(f'{route + " p50/p95 ms":>28}' for route in WRITE_ROUTES)
+    header += f"{'reads/s':>9}{'errors':>8}"
+    print('\n' + header)
+    print('-' * len(header))
+    for label, summary, elapsed_reads in results:
+        line = f'{label:<11}'
+        for route in WRITE_ROUTES:
+            stats = summary['routes'].get(route)
+            cell = f"{stats['p50_ms']}/{stats['p95_ms']}" if stats else '-'
+            line += f'{cell:>28}'
+        line += f"{elapsed_reads:>9}{summary['errors']:>8}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure write latency under heavy read routes.')
+    parser.add_argument('--users', type=int, default=4, help='distinct users in the generated DB')
+    parser.add_argument('--entries', type=int, default=1000, help='entries per generated user')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--readers', type=int, default=4, help='concurrent reader sessions')
+    parser.add_argument('--writers', type=int, default=4, help='concurrent writer sessions')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds per mode')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured warm-up seconds')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='diary-bench-snapshots-')
+    try:
+        db_path = os.path.join(workdir, 'diary.db')
+        print(f'Generating database: {args.users} users x {args.entries} entries')
+        loadtest.generate_database(db_path, args.users, args.entries)
+
+        results = []
+        for label, snapshots in (('off', False), ('on', True)):
+            summary = run_mode(db_path, snapshots, args.workers, args.readers, args.writers, args.users,
+                               args.duration, args.warmup, os.path.join(workdir, f'gunicorn-{label}.log'))
+            reads = sum(summary['routes'].get(route, {}).get('count', 0) for route in READ_ROUTES)
+            results.append((label, summary, round(reads / args.duration, 1)))
+        print_report(results)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Gunicorn worker-class comparison under the load-test traffic mix.
+
+Boots gunicorn once per profile against the same generated database and
+drives the loadtest.py traffic mix (dashboard, search, write, stats and the
+bot with a stubbed, AI_STUB_LATENCY_MS-slow backend). Each profile overrides
+gunicorn.conf.py on the command line; everything else (timeouts, preload,
+max_requests) comes from the config file. Reports throughput, error rate and
+p95 latency of the main routes per profile.
+
+Usage:
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --sessions 16 --duration 30
+    python benchmarks/bench_workers.py --profile gthread-4 --profile sync
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import loadtest  # noqa: E402
+
+CPUS = multiprocessing.cpu_count()
+DEFAULT_WORKERS = max(2, CPUS)
+
+# name -> (workers, extra gunicorn args)
+PROFILES = {
+    # Classic sync sizing; --threads 1 stops gunicorn switching to gthread
+    'sync': (2 * CPUS + 1, ['--worker-class', 'sync', '--threads', '1']),
+    'gthread-2': (DEFAULT_WORKERS, ['--worker-class', 'gthread', '--threads', '2']),
+    'gthread-4': (DEFAULT_WORKERS, ['--worker-class', 'gthread', '--threads', '4']),
+    'gthread-8': (DEFAULT_WORKERS, ['--worker-class', 'gthread', '--threads', '8']),
+}
+
+REPORT_ROUTES = ['dashboard', 'write_submit', 'stats', 'bot']
+
+
+def run_profile(db_path, workers, gunicorn_args, sessions, users, duration, warmup, log_path):
+    port = loadtest._free_port()
+    server = loadtest.start_server(db_path, port, workers, gunicorn_args, log_path=log_path)
+    try:
+        recorder, elapsed = loadtest.drive_traffic(f'http://127.0.0.1:{port}', sessions,
+                                                   users, duration, warmup)
+    finally:
+        loadtest.stop_server(server)
+    return loadtest.summarize(recorder, elapsed)
+
+
+def print_report(results):
+    header = f"{'profile':<12}{'workers':>8}{'req/s':>8}{'errors':>8}"
+    header += ''.join(f'{route + " p95":>18}' for route in REPORT_ROUTES)
+    print('\n' + header)
+    print('-' * len(header))
+    for name, workers, summary in results:
+        line = f"{name:<12}{workers:>8}{summary['throughput_rps']:>8}{summary['error_rate']:>8.2%}"
+        for route in REPORT_ROUTES:
+            stats = summary['routes'].get(route)
+            line += f"{stats['p95_ms'] if stats else '-':>18}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare gunicorn worker classes under load.')
+    parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                        help='profile to run (repeatable; default: all)')
+    parser.add_argument('--users', type=int, default=8, help='distinct users in the generated DB')
+    parser.add_argument('--entries', type=int, default=300, help='entries per generated user')
+    parser.add_argument('--sessions', type=int, default=16, help='concurrent client sessions')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds per profile')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured warm-up seconds')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='diary-bench-workers-')
+    try:
+        db_path = os.path.join(workdir, 'diary.db')
+        print(f'Generating database: {args.users} users x {args.entries} entries ({CPUS} CPUs)')
+        loadtest.generate_database(db_path, args.users, args.entries)
+
+        results = []
+        for name in args.profile or list(PROFILES):
+            workers, gunicorn_args = PROFILES[name]
+            print(f'{name}: {workers} workers {" ".join(gunicorn_args)}')
+            summary = run_profile(db_path, workers, gunicorn_args, args.sessions, args.users,
+                                  args.duration, args.warmup,
+                                  os.path.join(workdir, f'gunicorn-{name}.log'))
+            results.append((name, workers, summary))
+        print_report(results)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Write-path throughput benchmark: entries/sec under concurrent writers.
+
+Each writer thread logs in as its own user and POSTs new entries to /write
+through a Flask test client, so every entry goes through the real route:
+validation, derived fields, the streak update and the commit. The database
+is a generated SQLite file (see loadtest.generate_database). With --sharded
+it is split into per-user shards first (`flask shards split`) and the app
+runs with SHARDING_ENABLED, so each writer commits to its own file.
+
+Usage:
+    python benchmarks/bench_writes.py
+    python benchmarks/bench_writes.py --writers 1 2 4 8 --entries 200
+    python benchmarks/bench_writes.py --sharded
+"""
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import loadtest  # noqa: E402
+
+
+def _writer(app, username, count, seed, barrier, results, index):
+    rng = random.Random(seed)
+    client = app.test_client()
+    resp = client.post('/login', data={'username': username, 'password': loadtest.PASSWORD})
+    if resp.status_code != 302:
+        raise RuntimeError(f'login failed for {username}')
+    barrier.wait()
+    ok = 0
+    for _ in range(count):
+        resp = client.post('/write', data={
+            'title': 'Benchmark entry',
+            'content': loadtest._make_content(rng, 50, 300),
+            'mood': rng.choice(loadtest.MOODS),
+            'is_private': 'on',
+        })
+        if resp.status_code == 302 and '/dashboard' in resp.headers.get('Location', ''):
+            ok += 1
+    results[index] = ok
+
+
+def run(app, writers, entries_per_writer):
+    barrier = threading.Barrier(writers + 1)
+    results = [0] * writers
+    threads = [
+        threading.Thread(target=_writer, args=(app, f'loaduser{i}', entries_per_writer, i, barrier, results, i))
+        for i in range(writers)
+    ]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return sum(results), writers * entries_per_writer, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure /write throughput under concurrent writers.')
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--entries', type=int, default=100, help='entries per writer')
+    parser.add_argument('--sharded', action='store_true', help='serve from per-user shard files')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('AI_BOT_BACKEND', 'stub')
+    os.environ['RATELIMIT_ENABLED'] = 'false'
+    workdir = tempfile.mkdtemp(prefix='diary-bench-writes-')
+    try:
+        loadtest.generate_database(os.path.join(workdir, 'diary.db'), max(args.writers), 20)
+        if args.sharded:
+            os.environ['SHARD_DIR'] = os.path.join(workdir, 'shards')
+            repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'shards', 'split', '--delete-source'],
+                           cwd=repo, check=True, stdout=subprocess.DEVNULL)
+            os.environ['SHARDING_ENABLED'] = 'true'
+        from app import app
+        app.config['WTF_CSRF_ENABLED'] = False
+
+        print(f"{'writers':>8}{'saved':>8}{'failed':>8}{'seconds':>10}{'entries/s':>12}")
+        for writers in args.writers:
+            saved, attempted, elapsed = run(app, writers, args.entries)
+            print(f'{writers:>8}{saved:>8}{attempted - saved:>8}{elapsed:>10.2f}{saved / elapsed:>12.1f}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+End-to-end HTTP load harness for the Diary application.
+
+Boots the app under gunicorn against a freshly generated SQLite database,
+drives a weighted mix of logged-in traffic (dashboard, write, search, stats,
+bot) from concurrent sessions, and reports p50/p95/p99 latency and
+throughput per route. Results are compared against a committed baseline
+and the script exits non-zero when anything regresses beyond tolerance.
+
+The AI bot runs against the stub backend (AI_BOT_BACKEND=stub), so no
+Gemini calls are made. Rate limiting is switched off for the run.
+
+Usage:
+    python benchmarks/loadtest.py                     # run and compare
+    python benchmarks/loadtest.py --write-baseline    # refresh the baseline
+    python benchmarks/loadtest.py --sessions 16 --duration 60
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, 'benchmarks', 'loadtest_baseline.json')
+
+PASSWORD = 'LoadTest123'
+
+# Route mix: (scenario, weight). Weights roughly follow production traffic,
+# where reading the dashboard dominates and writes are comparatively rare.
+TRAFFIC_MIX = [
+    ('dashboard', 40),
+    ('search', 15),
+    ('write', 15),
+    ('stats', 10),
+    ('bot', 20),
+]
+
+MOODS = ['😊 Happy', '😢 Sad', '😴 Tired', '🤔 Thoughtful', '😤 Frustrated', '😌 Peaceful',
+         '🎉 Excited', '😰 Anxious', '😍 Loved', '😔 Melancholy', '🔥 Motivated', '😌 Content']
+WEATHER = ['☀️ Sunny', '⛅ Partly Cloudy', '☁️ Cloudy', '🌧️ Rainy', '⛈️ Stormy', '❄️ Snowy']
+TAGS = ['work', 'family', 'gratitude', 'travel', 'health', 'goals', 'reading', 'friends']
+VOCABULARY = (
+    'today I felt really grateful for the small things morning coffee walk park friend '
+    'called work meeting project deadline tired happy calm anxious excited dinner family '
+    'weekend plans book chapter reading music evening rain sunshine garden run gym sleep '
+    'dream goal progress learned something new conversation laughed cried quiet thoughts '
+    'journal reflect week month year change hope worry focus energy travel trip city home'
+).split()
+SEARCH_TERMS = ['grateful', 'work', 'family', 'coffee', 'project', 'rain', 'goal', 'travel']
+
+
+# ------------------ DATABASE GENERATION ------------------
+def _make_content(rng, min_words=40, max_words=600):
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(min_words, max_words))]
+    sentences = []
+    for i in range(0, len(words), 12):
+        chunk = words[i:i + 12]
+        sentences.append(' '.join(chunk).capitalize() + '.')
+    return ' '.join(sentences)
+
+
+def generate_database(db_path, users, entries_per_user, seed=42):
+    """Create a SQLite database populated with users, categories and entries.
+
+    The app module is imported with DATABASE_URL pointing at db_path so the
+    schema comes from the real models.
+    """
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    sys.path.insert(0, REPO_ROOT)
+    from app import app, db, bcrypt, User, Category, DiaryEntry
+
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    hashed = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+
+    with app.app_context():
+        db.create_all()
+        for u in range(users):
+            user = User(username=f'loaduser{u}', email=f'loaduser{u}@example.com', password=hashed)
+            db.session.add(user)
+            db.session.flush()
+
+            categories = []
+            for name, color in [('General', '#667eea'), ('Work', '#f39c12'), ('Personal', '#e74c3c'),
+                                ('Travel', '#2ecc71'), ('Health', '#9b59b6')]:
+                category = Category(name=name, color=color, user_id=user.id)
+                db.session.add(category)
+                categories.append(category)
+            db.session.flush()
+
+            for _ in range(entries_per_user):
+                content = _make_content(rng)
+                entry = DiaryEntry(
+                    user_id=user.id,
+                    title=' '.join(rng.choice(VOCABULARY) for _ in range(4)).title(),
+                    content=content,
+                    category_id=rng.choice(categories).id,
+                    mood=rng.choice(MOODS) if rng.random() < 0.8 else None,
+                    weather=rng.choice(WEATHER) if rng.random() < 0.5 else None,
+                    is_favorite=rng.random() < 0.05,
+                    timestamp=now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+                )
+                entry.set_tags_list(rng.sample(TAGS, rng.randint(0, 3)))
+                db.session.add(entry)
+            db.session.commit()
+
+
+# ------------------ SERVER ------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, port, workers, gunicorn_args=None, log_path=None):
+    """Start gunicorn serving app:app and wait until it answers requests."""
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f'sqlite:///{db_path}',
+        'SECRET_KEY': 'loadtest-secret-key',
+        'AI_BOT_BACKEND': 'stub',
+        'AI_STUB_LATENCY_MS': env.get('AI_STUB_LATENCY_MS', '150'),
+        'RATELIMIT_ENABLED': 'false',
+        'GEMINI_API_KEY': '',
+    })
+    cmd = [sys.executable, '-m', 'gunicorn', 'app:app',
+           '--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+    cmd += gunicorn_args or []
+    log = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'gunicorn exited early with code {proc.returncode}')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/login', timeout=2)
+            return proc
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.25)
+    stop_server(proc)
+    raise RuntimeError('gunicorn did not become ready within 60 seconds')
+
+
+def stop_server(proc):
+    if proc.poll() is None:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ------------------ CLIENT ------------------
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects as responses so each request is timed on its own."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Session:
+    """One logged-in browser session with its own cookie jar."""
+
+    CSRF_RE = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, label, method, path, form=None, json_body=None, headers=None):
+        data = None
+        headers = dict(headers or {})
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=60) as resp:
+                body = resp.read()
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            status = e.code
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            body = b''
+            status = 0
+        elapsed = time.perf_counter() - start
+
+        if label:
+            self.recorder.record(label, elapsed, status)
+        return status, body.decode('utf-8', 'replace')
+
+    def csrf_token(self, html):
+        match = self.CSRF_RE.search(html)
+        return match.group(1) if match else ''
+
+    def login(self, username):
+        _, html = self.request(None, 'GET', '/login')
+        status, _ = self.request(None, 'POST', '/login', form={
+            'csrf_token': self.csrf_token(html), 'username': username, 'password': PASSWORD})
+        if status != 302:
+            raise RuntimeError(f'login failed for {username} (HTTP {status})')
+
+
+class Recorder:
+    """Thread-safe collection of (route, latency, status) samples."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.enabled = False
+
+    def record(self, label, elapsed, status):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.samples[label].append(elapsed)
+            if status == 0 or status >= 500 or status == 429:
+                self.errors[label] += 1
+
+
+# ------------------ SCENARIOS ------------------
+def scenario_dashboard(session, rng):
+    session.request('dashboard', 'GET', f'/dashboard?page={rng.randint(1, 3)}')
+
+
+def scenario_search(session, rng):
+    query = urllib.parse.quote(rng.choice(SEARCH_TERMS))
+    session.request('search', 'GET', f'/search?query={query}')
+
+
+def scenario_write(session, rng):
+    _, html = session.request('write_form', 'GET', '/write')
+    session.request('write_submit', 'POST', '/write', form={
+        'csrf_token': session.csrf_token(html),
+        'title': 'Load test entry',
+        'content': _make_content(rng, 30, 300),
+        'mood': rng.choice(MOODS),
+        'tags': ', '.join(rng.sample(TAGS, 2)),
+        'is_private': 'on',
+    })
+
+
+def scenario_stats(session, rng):
+    session.request('stats', 'GET', '/stats')
+
+
+def scenario_bot(session, rng):
+    session.request('bot', 'POST', '/bot/chat', json_body={'message': 'Give me a writing prompt'})
+
+
+SCENARIOS = {
+    'dashboard': scenario_dashboard,
+    'search': scenario_search,
+    'write': scenario_write,
+    'stats': scenario_stats,
+    'bot': scenario_bot,
+}
+
+
+def _session_worker(base_url, username, recorder, stop_at, seed):
+    rng = random.Random(seed)
+    session = Session(base_url, recorder)
+    session.login(username)
+    names = [name for name, _ in TRAFFIC_MIX]
+    weights = [weight for _, weight in TRAFFIC_MIX]
+    while time.time() < stop_at:
+        SCENARIOS[rng.choices(names, weights)[0]](session, rng)
+
+
+def drive_traffic(base_url, sessions, users, duration, warmup):
+    """Run `sessions` concurrent sessions for warmup + duration seconds."""
+    recorder = Recorder()
+    start = time.time()
+    stop_at = start + warmup + duration
+    threads = [
+        threading.Thread(target=_session_worker,
+                         args=(base_url, f'loaduser{i % users}', recorder, stop_at, i),
+                         daemon=True)
+        for i in range(sessions)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(warmup)
+    recorder.enabled = True
+    measured_from = time.time()
+    for t in threads:
+        t.join()
+    recorder.enabled = False
+    return recorder, time.time() - measured_from
+
+
+# ------------------ REPORTING ------------------
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    total = 0
+    total_errors = 0
+    for label, values in sorted(recorder.samples.items()):
+        values = sorted(values)
+        total += len(values)
+        total_errors += recorder.errors[label]
+        routes[label] = {
+            'count': len(values),
+            'errors': recorder.errors[label],
+            'p50_ms': round(percentile(values, 50) * 1000, 1),
+            'p95_ms': round(percentile(values, 95) * 1000, 1),
+            'p99_ms': round(percentile(values, 99) * 1000, 1),
+        }
+    return {
+        'requests': total,
+        'errors': total_errors,
+        'error_rate': round(total_errors / total, 4) if total else 0.0,
+        'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'routes': routes,
+    }
+
+
+def print_report(summary):
+    print(f"\n{'route':<14}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print('-' * 60)
+    for label, r in summary['routes'].items():
+        print(f"{label:<14}{r['count']:>8}{r['errors']:>8}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+    print('-' * 60)
+    print(f"requests: {summary['requests']}  errors: {summary['errors']}  "
+          f"throughput: {summary['throughput_rps']} req/s")
+
+
+def compare_to_baseline(summary, baseline, tolerance, slack_ms):
+    """Return a list of human-readable regressions (empty when within budget)."""
+    problems = []
+    base_rps = baseline.get('throughput_rps')
+    if base_rps and summary['throughput_rps'] < base_rps * (1 - tolerance):
+        problems.append(f"throughput {summary['throughput_rps']} req/s < baseline {base_rps} req/s")
+    max_error_rate = baseline.get('max_error_rate', 0.01)
+    if summary['error_rate'] > max_error_rate:
+        problems.append(f"error rate {summary['error_rate']:.2%} > allowed {max_error_rate:.2%}")
+
+    for label, base in baseline.get('routes', {}).items():
+        current = summary['routes'].get(label)
+        if current is None:
+            problems.append(f'{label}: no samples recorded')
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            limit = base[key] * (1 + tolerance) + slack_ms
+            if current[key] > limit:
+                problems.append(f'{label} {key} {current[key]} > {limit:.1f} (baseline {base[key]})')
+    return problems
+
+
+# ------------------ MAIN ------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=8, help='distinct users in the generated DB')
+    parser.add_argument('--entries', type=int, default=300, help='entries per generated user')
+    parser.add_argument('--sessions', type=int, default=8, help='concurrent client sessions')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured warm-up seconds')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--gunicorn-arg', action='append', default=[],
+                        help='extra argument passed through to gunicorn (repeatable)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help='allowed relative slowdown (default: value in baseline, else 0.25)')
+    parser.add_argument('--write-baseline', action='store_true',
+                        help='store this run as the new baseline instead of comparing')
+    parser.add_argument('--json-out', help='also write the run summary to this file')
+    parser.add_argument('--keep-db', action='store_true', help='keep the generated database')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='diary-loadtest-')
+    db_path = os.path.join(workdir, 'diary.db')
+    print(f'Generating database: {args.users} users x {args.entries} entries -> {db_path}')
+    generate_database(db_path, args.users, args.entries)
+
+    port = _free_port()
+    server = start_server(db_path, port, args.workers, args.gunicorn_arg,
+                          log_path=os.path.join(workdir, 'gunicorn.log'))
+    try:
+        print(f'Driving {args.sessions} sessions for {args.duration}s (+{args.warmup}s warm-up)')
+        recorder, elapsed = drive_traffic(f'http://127.0.0.1:{port}', args.sessions,
+                                          args.users, args.duration, args.warmup)
+    finally:
+        stop_server(server)
+
+    summary = summarize(recorder, elapsed)
+    summary['config'] = {k: getattr(args, k) for k in ('users', 'entries', 'sessions', 'duration', 'workers')}
+    print_report(summary)
+
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    if not args.keep_db:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.write_baseline:
+        baseline = {
+            'tolerance': args.tolerance if args.tolerance is not None else 0.25,
+            'slack_ms': 5.0,
+            'max_error_rate': 0.01,
+            'throughput_rps': summary['throughput_rps'],
+            'config': summary['config'],
+            'routes': {label: {k: r[k] for k in ('p50_ms', 'p95_ms', 'p99_ms')}
+                       for label, r in summary['routes'].items()},
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --write-baseline first.')
+        return 1
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    tolerance = args.tolerance if args.tolerance is not None else baseline.get('tolerance', 0.25)
+    problems = compare_to_baseline(summary, baseline, tolerance, baseline.get('slack_ms', 5.0))
+    if problems:
+        print('\n❌ Performance regression against baseline:')
+        for problem in problems:
+            print(f'  - {problem}')
+        return 1
+    print('\n✅ Within baseline tolerance')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Response compression for the Diary application.
+
+ResponseCompressor is WSGI middleware that gzip- or brotli-encodes text
+responses (HTML, JSON, CSS/JS, plain-text exports) for clients that accept
+it. Responses are passed through untouched when they:
+
+    - already carry a Content-Encoding (e.g. precompressed /assets files)
+    - have a content type outside COMPRESSIBLE_TYPES
+    - declare a Content-Length below COMPRESS_MIN_SIZE
+    - are partial (206), bodiless (1xx/204/304) or HEAD responses
+    - ask for Cache-Control: no-transform
+
+Responses with a Content-Length are compressed in one go and get a new
+Content-Length. Streamed responses (generators, no Content-Length) are
+compressed chunk by chunk and flushed after each chunk, so the client still
+receives data as it is produced.
+"""
+import zlib
+
+from werkzeug.http import parse_accept_header, parse_options_header
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/manifest+json',
+    'application/xml',
+    'image/svg+xml',
+})
+
+GZIP_LEVEL = 6
+# Dynamic responses favour speed; static bundles use quality 11 at build time
+BROTLI_QUALITY = 4
+
+
+def choose_encoding(accept_encoding):
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    if brotli is not None and accepted['br'] > 0:
+        return 'br'
+    if accepted['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+class _Compressor:
+    """Uniform streaming interface over zlib (gzip framing) and brotli."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self):
+        if self.encoding == 'br':
+            return self._obj.flush()
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._obj.finish()
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class ResponseCompressor:
+    """WSGI middleware that compresses eligible responses."""
+
+    def __init__(self, wsgi_app, min_size=500):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.wsgi_app(environ, start_response)
+
+        captured = {}
+
+        def capturing_start_response(status, headers, exc_info=None):
+            if captured.get('sent'):
+                # start_response called late (from inside the body iterator) or
+                # again for an error: too late to change anything, forward as-is.
+                return start_response(status, headers, exc_info)
+            captured.update(status=status, headers=headers, exc_info=exc_info)
+            return self._no_write
+
+        iterable = self.wsgi_app(environ, capturing_start_response)
+        if 'status' not in captured:
+            captured['sent'] = True
+            return iterable
+
+        status, headers = captured['status'], captured['headers']
+        captured['sent'] = True
+        if not self._should_compress(status, headers):
+            start_response(status, headers, captured['exc_info'])
+            return iterable
+
+        length = _header(headers, 'Content-Length')
+        headers = [(k, v) for k, v in headers if k.lower() not in ('content-length', 'etag', 'vary')]
+        headers += _rewritten_cache_headers(captured['headers'], encoding)
+
+        if length is not None:
+            try:
+                body = b''.join(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+            compressor = _Compressor(encoding)
+            data = compressor.compress(body) + compressor.finish()
+            start_response(status, headers + [('Content-Length', str(len(data)))], captured['exc_info'])
+            return [data]
+
+        start_response(status, headers, captured['exc_info'])
+        return self._stream(iterable, _Compressor(encoding))
+
+    @staticmethod
+    def _no_write(data):
+        raise RuntimeError('ResponseCompressor does not support the WSGI write() callable')
+
+    def _should_compress(self, status, headers):
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return False
+        if _header(headers, 'Content-Encoding') or _header(headers, 'Content-Range'):
+            return False
+        if 'no-transform' in (_header(headers, 'Cache-Control') or '').lower():
+            return False
+        mimetype, _ = parse_options_header(_header(headers, 'Content-Type') or '')
+        if mimetype.lower() not in COMPRESSIBLE_TYPES:
+            return False
+        length = _header(headers, 'Content-Length')
+        return length is None or int(length) >= self.min_size
+
+    @staticmethod
+    def _stream(iterable, compressor):
+        try:
+            for chunk in iterable:
+                if chunk:
+                    data = compressor.compress(chunk) + compressor.flush()
+                    if data:
+                        yield data
+            yield compressor.finish()
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _rewritten_cache_headers(headers, encoding):
+    """Content-Encoding plus Vary/ETag adjusted for the encoded representation."""
+    vary = [v.strip() for k, value in headers if k.lower() == 'vary' for v in value.split(',') if v.strip()]
+    if not any(v.lower() == 'accept-encoding' for v in vary):
+        vary.append('Accept-Encoding')
+    rewritten = [('Content-Encoding', encoding), ('Vary', ', '.join(vary))]
+
+    # The encoded bytes differ from the identity ones, so a strong validator
+    # can no longer be byte-exact; demote it to weak (as nginx does).
+    etag = _header(headers, 'ETag')
+    if etag:
+        rewritten.append(('ETag', etag if etag.startswith('W/') else 'W/' + etag))
+    return rewritten
+
+
+def init_compression(app):
+    """Wrap the app in ResponseCompressor unless COMPRESS_ENABLED is off."""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    app.wsgi_app = ResponseCompressor(app.wsgi_app, min_size=app.config.get('COMPRESS_MIN_SIZE', 500))
@@ -0,0 +1,117 @@
+"""
+HTTP conditional GET for per-user pages.
+
+Every user row carries a data version (User.data_version / data_updated_at)
+that is bumped in the same flush as any change to that user's entries,
+categories, templates or the user row itself (theme, streak, timezone...);
+see sync.py.
+Views decorated with @conditional_get derive a weak ETag and Last-Modified
+from that stamp and answer 304 Not Modified *before* running their queries
+and templates when the browser's cached copy is still current.
+
+Besides the data version, the ETag covers everything else a cached page
+depends on:
+
+    - the user's local date (streak status and "today" wording)
+    - the session's CSRF token and the half-life of its time limit, so a
+      revalidated page never carries an expired or foreign token
+    - the deployed templates and asset bundles (BUILD_ID)
+
+Requests with pending flash messages are never answered with 304, since the
+message would be lost.
+"""
+import functools
+import hashlib
+import os
+import time
+from datetime import datetime, time as dtime, timezone
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+import streaks
+
+
+def compute_build_id(app):
+    """Fingerprint of the deployed templates and asset bundles."""
+    digest = hashlib.sha1(repr(sorted(app.extensions.get('assets', {}).items())).encode())
+    template_dir = os.path.join(app.root_path, app.template_folder or 'templates')
+    for root, _, files in sorted(os.walk(template_dir)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(f'{os.path.relpath(path, template_dir)}:{os.stat(path).st_mtime_ns}'.encode())
+    return digest.hexdigest()[:12]
+
+
+def _csrf_window():
+    """(index, start) of the current half CSRF lifetime, or (0, None) without a limit."""
+    limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if not limit:
+        return 0, None
+    window = max(int(limit) // 2, 1)
+    index = int(time.time()) // window
+    return index, datetime.fromtimestamp(index * window, timezone.utc)
+
+
+def validators(user):
+    """Weak ETag and Last-Modified for the current request's view of `user`'s data."""
+    zone = streaks.get_zone(user.timezone_name)
+    today = streaks.today_in(zone)
+    csrf_index, csrf_start = _csrf_window()
+    raw = ':'.join(str(part) for part in (
+        user.id, user.data_version, today.isoformat(), csrf_index,
+        session.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'), ''),
+        current_app.config.get('BUILD_ID', ''),
+    ))
+    etag = hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+    local_midnight = datetime.combine(today, dtime(), tzinfo=zone).astimezone(timezone.utc)
+    changed = user.data_updated_at
+    if changed is not None and changed.tzinfo is None:
+        changed = changed.replace(tzinfo=timezone.utc)
+    last_modified = max(t for t in (changed, local_midnight, csrf_start) if t is not None)
+    return etag, last_modified.replace(microsecond=0)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    # Cached by the browser only, and always revalidated
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+
+def conditional_get(view):
+    """Answer 304 from the user's data version before running `view`.
+
+    Goes below @login_required. Only successful GET responses get validators.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET' or not current_user.is_authenticated or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        etag, last_modified = validators(current_user)
+        if _not_modified(etag, last_modified):
+            return _set_validators(make_response('', 304), etag, last_modified)
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and '_flashes' not in session:
+            _set_validators(response, etag, last_modified)
+        return response
+    return wrapper
+
+
+def init_conditional(app):
+    """Fix BUILD_ID for this deploy; call after init_assets()."""
+    app.config.setdefault('BUILD_ID', os.environ.get('BUILD_ID') or compute_build_id(app))
@@ -18,6 +18,7 @@ class Config:
         'pool_pre_ping': True,
         'pool_recycle': 300,
     }
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
     
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
@@ -29,6 +30,54 @@ class Config:
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = None  # No time limit for CSRF tokens
     
+    # Rate limiting (disable only for load testing)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+    
+    # AI backend: 'gemini' or 'stub' (offline responses for load tests)
+    AI_BOT_BACKEND = os.environ.get('AI_BOT_BACKEND', 'gemini').lower()
+    AI_STUB_LATENCY_MS = int(os.environ.get('AI_STUB_LATENCY_MS', 0))
+    AI_REQUEST_TIMEOUT = int(os.environ.get('AI_REQUEST_TIMEOUT', 30))
+    
+    # Request profiling (opt-in, guarded by the X-Profile-Secret header)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() in ['true', 'on', '1']
+    PROFILING_SECRET = os.environ.get('PROFILING_SECRET')
+    PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join('logs', 'profiles'))
+    
+    # Serve CSS/JS from static/src instead of the built bundles in static/dist
+    ASSETS_DEBUG = os.environ.get('ASSETS_DEBUG', 'false').lower() in ['true', 'on', '1']
+    
+    # Response compression (gzip/brotli) for HTML, JSON and text
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    
+    # Salts page ETags; defaults to a fingerprint of templates + asset bundles
+    BUILD_ID = os.environ.get('BUILD_ID')
+    
+    # Background jobs: run inside the web workers instead of `flask jobs run`
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'false').lower() in ['true', 'on', '1']
+    SCHEDULER_POLL_SECONDS = int(os.environ.get('SCHEDULER_POLL_SECONDS', 30))
+    JOB_HISTORY_DAYS = int(os.environ.get('JOB_HISTORY_DAYS', 30))
+    STATS_ROLLUP_ACTIVE_DAYS = int(os.environ.get('STATS_ROLLUP_ACTIVE_DAYS', 30))
+
+    # Per-user SQLite shards (see db_routing.py)
+    SHARDING_ENABLED = os.environ.get('SHARDING_ENABLED', 'false').lower() in ['true', 'on', '1']
+    SHARD_DIR = os.environ.get('SHARD_DIR', 'shards')
+    SHARD_ENGINE_CACHE = int(os.environ.get('SHARD_ENGINE_CACHE', 256))
+
+    # Heavy read routes use read-only WAL snapshot connections
+    READ_SNAPSHOTS_ENABLED = os.environ.get('READ_SNAPSHOTS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    
+    # Related entries and near-duplicate warnings (see similarity.py)
+    RELATED_ENTRIES_LIMIT = int(os.environ.get('RELATED_ENTRIES_LIMIT', 5))
+    RELATED_MIN_SIMILARITY = float(os.environ.get('RELATED_MIN_SIMILARITY', 0.2))
+    NEAR_DUPLICATE_SIMILARITY = float(os.environ.get('NEAR_DUPLICATE_SIMILARITY', 0.8))
+    
+    # Writing calendar: per-process LRU of (user, year) day totals
+    CALENDAR_CACHE_SIZE = int(os.environ.get('CALENDAR_CACHE_SIZE', 1000))
+    
+    # Per-process LRU of rendered entry cards
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 5000))
+    
     # File Upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
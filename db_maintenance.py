@@ -0,0 +1,155 @@
+"""
+SQLite maintenance primitives shared by the scheduled jobs and the CLI.
+
+Each function takes a SQLAlchemy Connection and returns a small dict
+describing what it did, so callers can log it or store it in job_run. Other
+database backends maintain themselves, so every function is a no-op there.
+"""
+
+
+def is_sqlite(conn):
+    return conn.dialect.name == 'sqlite'
+
+
+def _pragma(conn, statement):
+    return conn.exec_driver_sql(f'PRAGMA {statement}').scalar()
+
+
+def optimize(conn):
+    """PRAGMA optimize: re-ANALYZE only the tables whose statistics look stale."""
+    if not is_sqlite(conn):
+        return {'skipped': conn.dialect.name}
+    conn.exec_driver_sql('PRAGMA optimize')
+    conn.commit()
+    return {'optimized': True}
+
+
+def analyze(conn):
+    """Full ANALYZE of every table and index."""
+    if not is_sqlite(conn):
+        return {'skipped': conn.dialect.name}
+    conn.exec_driver_sql('ANALYZE')
+    conn.commit()
+    return {'analyzed': True}
+
+
+def incremental_vacuum(conn, pages=None):
+    """Return up to `pages` free pages (all when None) to the filesystem.
+
+    Only works once the database uses auto_vacuum=INCREMENTAL; otherwise
+    reports the free page count and does nothing.
+    """
+    if not is_sqlite(conn):
+        return {'skipped': conn.dialect.name}
+    free_before = _pragma(conn, 'freelist_count')
+    if _pragma(conn, 'auto_vacuum') != 2:
+        return {'free_pages': free_before, 'reclaimed': 0, 'auto_vacuum': 'off'}
+    conn.exec_driver_sql(f'PRAGMA incremental_vacuum({int(pages)})' if pages else 'PRAGMA incremental_vacuum')
+    conn.commit()
+    free_after = _pragma(conn, 'freelist_count')
+    return {'free_pages': free_after, 'reclaimed': free_before - free_after}
+
+
+def checkpoint(conn):
+    """Copy the WAL back into the database file and truncate it."""
+    if not is_sqlite(conn):
+        return {'skipped': conn.dialect.name}
+    busy, log_pages, checkpointed = conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)').one()
+    return {'busy': bool(busy), 'wal_pages': log_pages, 'checkpointed': checkpointed}
+
+
+def enable_incremental_vacuum(conn):
+    """Switch the database to auto_vacuum=INCREMENTAL (rewrites the whole file once)."""
+    if not is_sqlite(conn):
+        return {'skipped': conn.dialect.name}
+    if _pragma(conn, 'auto_vacuum') == 2:
+        return {'auto_vacuum': 'incremental', 'changed': False}
+    conn.commit()
+    conn.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')
+    conn.exec_driver_sql('VACUUM')  # must run outside a transaction
+    return {'auto_vacuum': 'incremental', 'changed': True}
+
+
+def integrity_check(conn, quick=False, max_errors=100):
+    """Problems reported by integrity_check (or quick_check) and foreign_key_check; [] when healthy."""
+    if not is_sqlite(conn):
+        return []
+    check = 'quick_check' if quick else 'integrity_check'
+    problems = [row[0] for row in conn.exec_driver_sql(f'PRAGMA {check}({int(max_errors)})')
+                if row[0] != 'ok']
+    for table, rowid, parent, _ in conn.exec_driver_sql('PRAGMA foreign_key_check'):
+        problems.append(f'{table} row {rowid}: missing {parent} row')
+    return problems
+
+
+def table_sizes(conn):
+    """Pages and bytes per table and index, largest first, plus row counts for tables.
+
+    Uses the dbstat virtual table when SQLite was built with it; otherwise
+    only row counts are available.
+    """
+    if not is_sqlite(conn):
+        return []
+    objects = conn.exec_driver_sql(
+        "SELECT name, type, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')").all()
+    try:
+        usage = {name: (pages, size) for name, pages, size in conn.exec_driver_sql(
+            'SELECT name, COUNT(*), SUM(pgsize) FROM dbstat GROUP BY name')}
+    except Exception:
+        usage = None
+
+    report = []
+    for name, kind, table in objects:
+        row = {'name': name, 'type': kind, 'table': table, 'pages': None, 'bytes': None, 'rows': None}
+        if usage is not None:
+            row['pages'], row['bytes'] = usage.get(name, (0, 0))
+        if kind == 'table':
+            row['rows'] = conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{name}"').scalar()
+        report.append(row)
+    report.sort(key=lambda r: (-(r['bytes'] or 0), -(r['rows'] or 0), r['name']))
+    return report
+
+
+def database_summary(conn):
+    """Page size, page and free-page counts, journal and auto_vacuum modes."""
+    if not is_sqlite(conn):
+        return {}
+    page_size = _pragma(conn, 'page_size')
+    page_count = _pragma(conn, 'page_count')
+    return {
+        'page_size': page_size,
+        'pages': page_count,
+        'bytes': page_size * page_count,
+        'free_pages': _pragma(conn, 'freelist_count'),
+        'journal_mode': _pragma(conn, 'journal_mode'),
+        'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(_pragma(conn, 'auto_vacuum')),
+    }
+
+
+# ------------------ Query plans ------------------
+def query_plan(conn, statement):
+    """EXPLAIN QUERY PLAN rows (detail strings) for a SQLAlchemy statement."""
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})
+    args = tuple(compiled.params[key] for key in compiled.positiontup)
+    return [row[3] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', args)]
+
+
+def full_scans(plan):
+    """Plan steps that read a whole table (or a whole index) instead of searching it."""
+    return [step for step in plan
+            if step.startswith('SCAN ') and not step.startswith('SCAN CONSTANT ROW')]
+
+
+def explain_report(conn, queries):
+    """{name: {'plan': [...], 'full_scans': [...], 'temp_sorts': [...]}} for `queries`."""
+    if not is_sqlite(conn):
+        return {}
+    report = {}
+    for name, statement in queries.items():
+        plan = query_plan(conn, statement)
+        report[name] = {
+            'plan': plan,
+            'full_scans': full_scans(plan),
+            'temp_sorts': [step for step in plan if 'TEMP B-TREE' in step],
+        }
+    return report
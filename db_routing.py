@@ -0,0 +1,336 @@
+"""
+Optional per-user SQLite shards.
+
+With SHARDING_ENABLED, each user's rows in the per-user tables (entries,
+categories, templates, sync tombstones, stats rollups) live in their own
+SQLite file, SHARD_DIR/user_<id>.db. Users, auth and job bookkeeping stay in
+the main database. Writes to different users' diaries then take different
+SQLite write locks, and one user's restore or VACUUM only locks their file.
+
+db.session picks the file per statement: RoutingSession.get_bind sends the
+per-user tables to the shard of the user selected for the current context
+(the logged-in user during a request, `use(user_id)` in jobs and commands)
+and everything else to the main database. A statement that mixes per-user
+and global tables cannot be routed and raises ShardRoutingError.
+
+Shard files are created on first use. Their schema follows the models
+additively: tables, columns and indexes missing from a shard are added when
+it is opened, so new columns need a nullable type or a scalar default.
+
+Caveats: ids are unique within a shard only (every lookup is already scoped
+by user), and a commit that touches both the user row and a shard is two
+SQLite transactions.
+
+Long read-only routes opt into snapshot reads with @read_snapshot: their
+queries go to read-only twins of the same files (`mode=ro`, query_only),
+inside one transaction per file, so they see a single WAL snapshot, never
+take the write lock and never hold the pool connections the write routes
+need (READ_SNAPSHOTS_ENABLED).
+"""
+import functools
+import os
+import re
+import sqlite3
+import threading
+import urllib.parse
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import sqlalchemy as sa
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.util import find_tables
+
+_shard_user = ContextVar('diary_shard_user', default=None)
+_read_snapshot = ContextVar('diary_read_snapshot', default=False)
+
+SHARD_FILE_RE = re.compile(r'^user_(\d+)\.db$')
+
+
+class ShardRoutingError(RuntimeError):
+    """A per-user table was used without a selected shard, or joined to a global table."""
+
+
+class ShardRouter:
+    """Maps user ids to shard engines and keeps their schema current.
+
+    Args:
+        app: Flask app (SHARDING_ENABLED, SHARD_DIR, SHARD_ENGINE_CACHE,
+            READ_SNAPSHOTS_ENABLED)
+        tables: the per-user Table objects; each has a user_id column
+    """
+
+    def __init__(self, app, tables):
+        self.enabled = app.config.get('SHARDING_ENABLED', False)
+        self.shard_dir = os.path.join(app.instance_path, app.config.get('SHARD_DIR') or 'shards')
+        self.max_engines = app.config.get('SHARD_ENGINE_CACHE', 256)
+        self.snapshots_enabled = app.config.get('READ_SNAPSHOTS_ENABLED', True)
+        self.tables = list(tables)
+        self.table_names = {table.name for table in self.tables}
+        self._engines = OrderedDict()
+        self._snapshot_engines = OrderedDict()
+        self._lock = threading.Lock()
+        app.extensions['db_routing'] = self
+
+    # ------------------ Shard selection ------------------
+    @staticmethod
+    def select(user_id):
+        """Route per-user tables to `user_id`'s shard for the rest of this context."""
+        return _shard_user.set(user_id)
+
+    @staticmethod
+    def reset(token=None):
+        if token is None:
+            _shard_user.set(None)
+        else:
+            _shard_user.reset(token)
+
+    @staticmethod
+    def current():
+        return _shard_user.get()
+
+    @contextmanager
+    def use(self, user_id, session=None):
+        """Select `user_id`'s shard inside the block.
+
+        Commit inside the block; on exit the session forgets the shard's rows,
+        since another shard may hold rows with the same primary keys.
+        """
+        token = self.select(user_id)
+        try:
+            yield
+        except BaseException:
+            if self.enabled and session is not None:
+                session.rollback()
+                self.forget(session, check=False)
+            raise
+        else:
+            if self.enabled and session is not None:
+                self.forget(session)
+        finally:
+            self.reset(token)
+
+    def _is_sharded(self, obj):
+        return sa.inspect(obj).mapper.local_table.name in self.table_names
+
+    def forget(self, session, check=True):
+        """Expunge per-user rows from `session`; refuses to drop unflushed changes."""
+        if check and any(map(self._is_sharded, (*session.new, *session.dirty, *session.deleted))):
+            raise ShardRoutingError('uncommitted changes left in a shard; commit before switching shards')
+        for obj in [obj for obj in session.identity_map.values() if self._is_sharded(obj)]:
+            session.expunge(obj)
+
+    # ------------------ Routing ------------------
+    def route(self, mapper=None, clause=None):
+        """The shard engine for a statement on per-user tables, else None."""
+        names = set()
+        if mapper is not None:
+            names.add(sa.inspect(mapper).local_table.name)
+        if clause is not None:
+            names.update(table.name for table in find_tables(clause, include_crud=True)
+                         if isinstance(table, sa.Table))
+        sharded = names & self.table_names
+        if not sharded:
+            return None
+        if names - self.table_names:
+            raise ShardRoutingError(f'cannot join per-user tables {sorted(sharded)} '
+                                    f'with global tables {sorted(names - self.table_names)}')
+        user_id = self.current()
+        if user_id is None:
+            raise ShardRoutingError(f'no shard selected for {sorted(sharded)}')
+        return self.engine_for(user_id)
+
+    # ------------------ Shard files ------------------
+    def path_for(self, user_id):
+        return os.path.join(self.shard_dir, f'user_{int(user_id)}.db')
+
+    def shard_ids(self):
+        """User ids that have a shard file, ascending."""
+        if not os.path.isdir(self.shard_dir):
+            return []
+        return sorted(int(m.group(1)) for m in map(SHARD_FILE_RE.match, os.listdir(self.shard_dir)) if m)
+
+    @contextmanager
+    def connect(self, user_id):
+        """Connection to an existing shard outside the engine cache, for sweeps over every shard."""
+        engine = sa.create_engine(f'sqlite:///{self.path_for(user_id)}', poolclass=sa.pool.NullPool)
+        try:
+            with engine.connect() as conn:
+                yield conn
+        finally:
+            engine.dispose()
+
+    def engine_for(self, user_id):
+        """Engine for `user_id`'s shard, creating the file and schema on first use."""
+        with self._lock:
+            engine = self._engines.get(user_id)
+            if engine is not None:
+                self._engines.move_to_end(user_id)
+                return engine
+            os.makedirs(self.shard_dir, exist_ok=True)
+            engine = sa.create_engine(f'sqlite:///{self.path_for(user_id)}')
+            self.ensure_schema(engine)
+            self._engines[user_id] = engine
+            while len(self._engines) > self.max_engines:
+                # Checked-out connections finish normally; idle ones are closed
+                self._engines.popitem(last=False)[1].dispose()
+            return engine
+
+    def dispose(self, close=True):
+        """Drop every cached shard engine (close=False after a fork: just forget the connections)."""
+        with self._lock:
+            engines = list(self._engines.values()) + list(self._snapshot_engines.values())
+            self._engines, self._snapshot_engines = OrderedDict(), OrderedDict()
+        for engine in engines:
+            engine.dispose(close=close)
+
+    def ensure_schema(self, engine, retry=True):
+        """Add whatever tables, columns and indexes of the models the shard lacks."""
+        try:
+            with engine.begin() as conn:
+                inspector = sa.inspect(conn)
+                existing = set(inspector.get_table_names())
+                for table in self.tables:
+                    if table.name not in existing:
+                        table.create(conn)
+                        continue
+                    columns = {column['name'] for column in inspector.get_columns(table.name)}
+                    for column in table.columns:
+                        if column.name not in columns:
+                            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN {_column_ddl(column, conn.dialect)}')
+                    indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+                    for index in table.indexes:
+                        if index.name not in indexes:
+                            index.create(conn)
+        except sa.exc.OperationalError:
+            # Another process created the same shard at the same moment
+            if not retry:
+                raise
+            self.ensure_schema(engine, retry=False)
+
+    # ------------------ Read snapshots ------------------
+    def snapshot_engine(self, engine):
+        """Read-only twin of the SQLite file behind `engine` (`engine` itself for other databases)."""
+        path = engine.url.database
+        if engine.dialect.name != 'sqlite' or not path or path == ':memory:' or path.startswith('file:'):
+            return engine
+        with self._lock:
+            twin = self._snapshot_engines.get(path)
+            if twin is not None:
+                self._snapshot_engines.move_to_end(path)
+                return twin
+            twin = sa.create_engine(f'sqlite:///file:{urllib.parse.quote(path)}?mode=ro&uri=true',
+                                    connect_args={'factory': SnapshotConnection})
+            sa.event.listen(twin, 'connect', _snapshot_connect)
+            sa.event.listen(twin, 'begin', _snapshot_begin)
+            self._snapshot_engines[path] = twin
+            while len(self._snapshot_engines) > self.max_engines + 1:
+                self._snapshot_engines.popitem(last=False)[1].dispose()
+            return twin
+
+    # ------------------ Splitting ------------------
+    def split_user(self, source, user_id, delete_source=False, chunk_size=500):
+        """Copy `user_id`'s per-user rows from the `source` engine into their shard.
+
+        Re-running replaces the shard's copy. Returns {table name: rows copied}.
+        """
+        counts = {}
+        with self.engine_for(user_id).begin() as dst, source.connect() as src:
+            for table in self.tables:
+                dst.execute(table.delete().where(table.c.user_id == user_id))
+                rows = src.execute(table.select().where(table.c.user_id == user_id)).mappings()
+                copied = 0
+                while True:
+                    chunk = [dict(row) for row in rows.fetchmany(chunk_size)]
+                    if not chunk:
+                        break
+                    dst.execute(table.insert(), chunk)
+                    copied += len(chunk)
+                counts[table.name] = copied
+
+        with self.engine_for(user_id).connect() as dst:
+            for table in self.tables:
+                stored = dst.execute(sa.select(sa.func.count()).select_from(table)
+                                     .where(table.c.user_id == user_id)).scalar()
+                if stored != counts[table.name]:
+                    raise ShardRoutingError(f'user {user_id}: {table.name} has {stored} rows in the shard, '
+                                            f'expected {counts[table.name]}')
+
+        if delete_source:
+            with source.begin() as src:
+                for table in reversed(self.tables):
+                    src.execute(table.delete().where(table.c.user_id == user_id))
+        return counts
+
+
+def _column_ddl(column, dialect):
+    """Column definition for ALTER TABLE ADD COLUMN (SQLite needs a default for NOT NULL)."""
+    ddl = f'"{column.name}" {column.type.compile(dialect=dialect)}'
+    default = None
+    if column.server_default is not None:
+        default = column.server_default.arg
+        default = default.text if hasattr(default, 'text') else str(default)
+        default = f"'{default}'" if isinstance(column.server_default.arg, str) else default
+    elif column.default is not None and column.default.is_scalar:
+        value = column.default.arg
+        default = str(int(value)) if isinstance(value, bool) else repr(value) if isinstance(value, (int, float)) \
+            else "'" + str(value).replace("'", "''") + "'"
+    if default is not None:
+        ddl += f' DEFAULT {default}'
+        if not column.nullable:
+            ddl += ' NOT NULL'
+    return ddl
+
+
+class SnapshotConnection(sqlite3.Connection):
+    """DBAPI connection of the snapshot engines; connect hooks must not write through it."""
+    read_only = True
+
+
+def _snapshot_connect(dbapi_connection, connection_record):
+    # pysqlite only opens transactions for writes; BEGIN is emitted in
+    # _snapshot_begin instead, so the first SELECT pins the WAL snapshot
+    dbapi_connection.isolation_level = None
+    dbapi_connection.execute('PRAGMA query_only=ON')
+
+
+def _snapshot_begin(conn):
+    conn.exec_driver_sql('BEGIN')
+
+
+def read_snapshot(func):
+    """Run `func` with db.session reading from read-only snapshot connections.
+
+    For long read-only work (stats, export, backup). Writing inside fails
+    with "attempt to write a readonly database". The read transactions end
+    when `func` returns, which expires the objects it loaded.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        router = current_app.extensions.get('db_routing')
+        if router is None or not router.snapshots_enabled or _read_snapshot.get():
+            return func(*args, **kwargs)
+        token = _read_snapshot.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _read_snapshot.reset(token)
+            current_app.extensions['sqlalchemy'].session.rollback()
+    return wrapper
+
+
+class RoutingSession(Session):
+    """db.session that sends per-user tables to the selected user's shard,
+    and every table to its read-only twin inside @read_snapshot."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        router = current_app.extensions.get('db_routing')
+        engine = router.route(mapper, clause) if router is not None and router.enabled else None
+        if engine is None:
+            engine = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if router is not None and _read_snapshot.get():
+            engine = router.snapshot_engine(engine)
+        return engine
@@ -0,0 +1,107 @@
+"""
+Derived fields for diary entries.
+
+Everything that can be computed from an entry's own columns (word count,
+reading time, excerpt, sentiment, month_day, ...) is produced here and stored on the row, so list
+views and statistics never need to re-read the full text.
+
+Each derived-field step declares the attributes it depends on. register()
+hooks the pipeline into SQLAlchemy's before_insert/before_update mapper
+events: every step runs on insert, and on update only the steps whose
+inputs changed are re-run. Routes, restore and scripts therefore never
+compute these fields themselves.
+"""
+import hashlib
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import event, inspect
+
+import sentiment
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 200
+
+# (watched attribute names, function(entry) -> dict of derived values)
+_pipeline = []
+
+
+def derived_from(*attributes):
+    """Register a derived-field step that re-runs when `attributes` change."""
+    def decorator(func):
+        _pipeline.append((frozenset(attributes), func))
+        return func
+    return decorator
+
+
+def month_day(timestamp):
+    """MMDD integer of `timestamp` (e.g. 1018 for October 18), the "on this day" key."""
+    return timestamp.month * 100 + timestamp.day
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """First `length` characters of the content with whitespace collapsed."""
+    return ' '.join(content[:length * 2].split())[:length]
+
+
+@derived_from('content')
+def text_statistics(entry):
+    """Word/character counts, reading time, excerpt and content hash."""
+    content = entry.content or ''
+    words = len(content.split())
+    return {
+        'word_count': words,
+        'char_count': len(content),
+        'reading_time': max(1, math.ceil(words / WORDS_PER_MINUTE)),
+        'excerpt': make_excerpt(content),
+        'content_hash': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+    }
+
+
+@derived_from('content')
+def sentiment_score(entry):
+    """Lexicon sentiment of the content, -1 (negative) to 1 (positive)."""
+    return {'sentiment': sentiment.score(entry.content or '')}
+
+
+@derived_from('timestamp')
+def calendar_fields(entry):
+    """month_day of the (UTC) timestamp, indexed with user_id for "on this day"."""
+    if entry.timestamp is None:
+        # The column default would only be applied by the INSERT itself; set it
+        # here so month_day describes the stored timestamp
+        entry.timestamp = datetime.now(timezone.utc)
+    return {'month_day': month_day(entry.timestamp)}
+
+
+def apply_derived_fields(entry, changed=None):
+    """Run the pipeline on `entry`.
+
+    Args:
+        entry: The DiaryEntry instance to update in place
+        changed: Set of attribute names that changed, or None to run every step
+    """
+    for watched, func in _pipeline:
+        if changed is None or watched & changed:
+            for key, value in func(entry).items():
+                setattr(entry, key, value)
+
+
+def _changed_attributes(entry):
+    state = inspect(entry)
+    watched = set().union(*(w for w, _ in _pipeline)) if _pipeline else set()
+    return {key for key in watched if state.attrs[key].history.has_changes()}
+
+
+def register(model):
+    """Attach the derived-field pipeline to `model`'s insert and update events."""
+
+    @event.listens_for(model, 'before_insert')
+    def _before_insert(mapper, connection, target):
+        apply_derived_fields(target)
+
+    @event.listens_for(model, 'before_update')
+    def _before_update(mapper, connection, target):
+        changed = _changed_attributes(target)
+        if changed:
+            apply_derived_fields(target, changed)
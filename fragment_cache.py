@@ -0,0 +1,56 @@
+"""
+In-process cache for rendered HTML fragments.
+
+Used for entry cards in list views: a card's HTML only depends on the entry
+row (identified by id + updated_at) and the viewer's theme, so once rendered
+it can be reused across page views until the entry changes. Keys that embed
+updated_at never need explicit invalidation; stale versions simply age out
+of the LRU.
+"""
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """Thread-safe, size-bounded LRU mapping of keys to rendered Markup."""
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_render(self, key, render):
+        """Return the cached fragment for `key`, rendering and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = Markup(render())
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
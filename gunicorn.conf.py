@@ -0,0 +1,95 @@
+"""
+Gunicorn serving profile for the Diary application.
+
+gunicorn reads ./gunicorn.conf.py automatically, so `gunicorn app:app` picks
+this up; every setting can still be overridden on the command line or
+through the environment variables below.
+
+The workload is mostly short SQLite-backed page renders plus the bot routes,
+which spend up to AI_REQUEST_TIMEOUT seconds waiting on Gemini. Threaded
+workers (gthread) keep a worker serving pages while some of its threads wait
+on the network; the process count follows the CPUs. Numbers from
+benchmarks/bench_workers.py are in the README.
+"""
+import multiprocessing
+import os
+import sys
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+# ------------------ Server socket ------------------
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+
+# ------------------ Workers ------------------
+# One process per CPU (at least 2, so a restart or a stuck worker never takes
+# the site down); SQLite allows one writer at a time, so more processes than
+# cores only add lock contention. WEB_CONCURRENCY is the usual PaaS override.
+workers = _env_int('WEB_CONCURRENCY', max(2, multiprocessing.cpu_count()))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Threads per worker: cover concurrent bot calls blocked on Gemini
+threads = _env_int('GUNICORN_THREADS', 4)
+
+# ------------------ Timeouts ------------------
+# Bot requests may legitimately wait AI_REQUEST_TIMEOUT seconds on Gemini.
+# With gthread, `timeout` is the worker heartbeat rather than a per-request
+# limit, but sync workers would be killed mid-request, so stay above it.
+_ai_timeout = _env_int('AI_REQUEST_TIMEOUT', 30)
+timeout = _env_int('GUNICORN_TIMEOUT', _ai_timeout + 30)
+# On reload/shutdown let in-flight bot calls finish before workers are killed
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', _ai_timeout + 5)
+# Behind a proxy that reuses connections; above the proxy's idle timeout
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# ------------------ Worker recycling ------------------
+# Recycle workers to cap slow growth (fragment cache, Gemini client buffers);
+# jitter keeps them from all restarting at once.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+# ------------------ App loading ------------------
+# Import the app (migrations, Gemini model discovery, asset manifest) once in
+# the master instead of once per worker. This also gives every worker the same
+# fallback SECRET_KEY when none is configured.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ['true', 'on', '1']
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master.
+
+    With preload_app the master opened SQLite connections while running
+    migrations; a connection must never be shared across processes. close=False
+    leaves the master's copies alone and just forgets them in the child.
+    """
+    module = sys.modules.get('app')
+    if module is None or not hasattr(module, 'db'):
+        return
+    with module.app.app_context():
+        for engine in module.db.engines.values():
+            engine.dispose(close=False)
+        module.shards.dispose(close=False)
+    server.log.debug(f'Worker {worker.pid}: reset inherited database pools')
+
+
+def post_worker_init(worker):
+    """Start the background job loop when SCHEDULER_ENABLED (see scheduler.py).
+
+    Every worker polls; only the one holding the scheduler lease runs jobs.
+    """
+    module = sys.modules.get('app')
+    if module is not None and module.app.config.get('SCHEDULER_ENABLED'):
+        module.jobs.start(module.app, poll_seconds=module.app.config['SCHEDULER_POLL_SECONDS'])
+
+
+def worker_exit(server, worker):
+    """Hand the scheduler lease over as soon as a worker stops."""
+    module = sys.modules.get('app')
+    if module is not None and hasattr(module, 'jobs'):
+        module.jobs.stop(timeout=5)
@@ -0,0 +1,212 @@
+"""
+Per-user keyword statistics for diary entries (TF-IDF).
+
+Two tables hold the index:
+
+    entry_term  (entry_id, term) -> count   sparse term vector of each entry
+    user_term   (user_id, term) -> doc_freq number of the user's entries using the term
+
+register() keeps both up to date from DiaryEntry's after_insert, after_update
+and after_delete mapper events, on the flush's own connection (so in the same
+transaction, and in the same shard, as the entry). An edit diffs the entry's
+new term counts against its stored vector and only touches the terms that
+appeared, disappeared or changed count; nothing ever rescans the corpus.
+rebuild_user() recomputes a user's index from scratch for the backfill.
+
+top_terms() ranks terms by TF-IDF over a set of entries: every (entry, term)
+pair is one non-zero of a sparse matrix held as three NumPy arrays, each
+entry's vector is L2-normalized, and the per-group sums are one bincount.
+"""
+import re
+from collections import Counter
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy import event, inspect
+
+MIN_LENGTH = 3
+MAX_LENGTH = 40  # longer "words" are URLs, hashes or keyboard mashing
+
+TOKEN_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+STOPWORDS = frozenset("""
+about above after again against all also and any are aren't because been before being below
+between both but can can't cannot could couldn't did didn't does doesn't doing don't down during
+each even ever every few for from further get gets getting got had hadn't has hasn't have haven't
+having her here hers herself him himself his how i'd i'll i'm i've into isn't it's its itself
+just let's like made make many may maybe more most much must myself need nor not now off once
+one only other our ours ourselves out over own really same she she'd she'll she's should
+shouldn't some still such than that that's the their theirs them themselves then there there's
+these they they'd they'll they're they've thing things this those though through too under
+until very was wasn't way we'd we'll we're we've well went were weren't what what's when where
+which while who who's whom why will with won't would wouldn't yet you you'd you'll you're
+you've your yours yourself yourselves today yesterday tomorrow day days time lot bit
+""".split())
+
+
+def terms(text):
+    """Indexable terms of `text` in order: lowercase words without stopwords."""
+    return [token for token in TOKEN_RE.findall((text or '').lower().replace('’', "'"))
+            if MIN_LENGTH <= len(token) <= MAX_LENGTH and token not in STOPWORDS]
+
+
+def term_counts(text):
+    """Counter of the indexable terms in `text`."""
+    return Counter(terms(text))
+
+
+# ------------------ Incremental maintenance ------------------
+def update_entry(connection, entry_terms, user_terms, user_id, entry_id, counts):
+    """Replace the stored vector of one entry with `counts`, adjusting doc_freq by the difference.
+
+    Args:
+        connection: Connection of the flush writing the entry
+        entry_terms, user_terms: the entry_term and user_term Tables
+        user_id, entry_id: the entry's owner and id
+        counts: {term: count} of the new content ({} when the entry is deleted)
+    """
+    old = dict(connection.execute(sa.select(entry_terms.c.term, entry_terms.c.count)
+                                  .where(entry_terms.c.entry_id == entry_id)).all())
+    added = [term for term in counts if term not in old]
+    removed = [term for term in old if term not in counts]
+    changed = [term for term in counts if term in old and old[term] != counts[term]]
+
+    if removed:
+        connection.execute(entry_terms.delete().where(entry_terms.c.entry_id == entry_id,
+                                                      entry_terms.c.term.in_(removed)))
+    if changed:
+        connection.execute(entry_terms.update().where(entry_terms.c.entry_id == sa.bindparam('e_id'),
+                                                      entry_terms.c.term == sa.bindparam('e_term'))
+                           .values(count=sa.bindparam('e_count')),
+                           [{'e_id': entry_id, 'e_term': term, 'e_count': counts[term]} for term in changed])
+    if added:
+        connection.execute(entry_terms.insert(), [{'entry_id': entry_id, 'user_id': user_id, 'term': term,
+                                                   'count': counts[term]} for term in added])
+        for_user = sa.and_(user_terms.c.user_id == user_id, user_terms.c.term.in_(added))
+        connection.execute(user_terms.update().where(for_user).values(doc_freq=user_terms.c.doc_freq + 1))
+        known = set(connection.execute(sa.select(user_terms.c.term).where(for_user)).scalars())
+        new_terms = [term for term in added if term not in known]
+        if new_terms:
+            connection.execute(user_terms.insert(), [{'user_id': user_id, 'term': term, 'doc_freq': 1}
+                                                     for term in new_terms])
+    if removed:
+        for_user = sa.and_(user_terms.c.user_id == user_id, user_terms.c.term.in_(removed))
+        connection.execute(user_terms.update().where(for_user).values(doc_freq=user_terms.c.doc_freq - 1))
+        connection.execute(user_terms.delete().where(for_user, user_terms.c.doc_freq <= 0))
+
+
+def rebuild_user(connection, entries, entry_terms, user_terms, user_id, chunk_size=500):
+    """Recompute `user_id`'s whole index from the entries table. Returns the number of entries indexed."""
+    connection.execute(entry_terms.delete().where(entry_terms.c.user_id == user_id))
+    connection.execute(user_terms.delete().where(user_terms.c.user_id == user_id))
+    doc_freq = Counter()
+    indexed = 0
+    rows = connection.execute(sa.select(entries.c.id, entries.c.content)
+                              .where(entries.c.user_id == user_id).order_by(entries.c.id))
+    while True:
+        chunk = rows.fetchmany(chunk_size)
+        if not chunk:
+            break
+        vectors = []
+        for entry_id, content in chunk:
+            counts = term_counts(content)
+            doc_freq.update(counts.keys())
+            vectors.extend({'entry_id': entry_id, 'user_id': user_id, 'term': term, 'count': count}
+                           for term, count in counts.items())
+        if vectors:
+            connection.execute(entry_terms.insert(), vectors)
+        indexed += len(chunk)
+    if doc_freq:
+        connection.execute(user_terms.insert(), [{'user_id': user_id, 'term': term, 'doc_freq': freq}
+                                                 for term, freq in doc_freq.items()])
+    return indexed
+
+
+def register(model, entry_terms, user_terms):
+    """Keep the keyword index of `model` (DiaryEntry) current on insert, edit and delete."""
+
+    @event.listens_for(model, 'after_insert')
+    def _after_insert(mapper, connection, target):
+        update_entry(connection, entry_terms, user_terms, target.user_id, target.id,
+                     term_counts(target.content))
+
+    @event.listens_for(model, 'after_update')
+    def _after_update(mapper, connection, target):
+        if inspect(target).attrs.content.history.has_changes():
+            update_entry(connection, entry_terms, user_terms, target.user_id, target.id,
+                         term_counts(target.content))
+
+    @event.listens_for(model, 'after_delete')
+    def _after_delete(mapper, connection, target):
+        update_entry(connection, entry_terms, user_terms, target.user_id, target.id, {})
+
+
+# ------------------ Ranking ------------------
+def top_terms(entry_ids, terms, counts, doc_freq, total_docs, groups=None, limit=10):
+    """Highest-scoring terms per group of entries.
+
+    Args:
+        entry_ids, terms, counts: the non-zeros of the entry/term matrix, one item per pair
+        doc_freq: {term: number of entries using it} over the whole diary
+        total_docs: number of entries in the whole diary
+        groups: {entry_id: group key}; entries missing from it are left out.
+            None ranks every entry together under the key None
+        limit: terms kept per group
+
+    Returns:
+        {group key: [(term, score), ...]} with the best term first. A score is
+        the mean over the group's entries of the term's weight in each
+        entry's L2-normalized TF-IDF vector.
+    """
+    entry_ids = np.asarray(entry_ids, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.float64)
+    if not len(entry_ids):
+        return {}
+
+    vocabulary = {}
+    columns = np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for term in terms),
+                          dtype=np.int64, count=len(entry_ids))
+    names = list(vocabulary)
+    df = np.fromiter((doc_freq.get(term, 1) for term in names), dtype=np.float64, count=len(names))
+    idf = np.log((1 + total_docs) / (1 + df)) + 1
+
+    docs, rows = np.unique(entry_ids, return_inverse=True)
+    weights = (1 + np.log(counts)) * idf[columns]
+    norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(docs)))
+    weights /= norms[rows]
+
+    if groups is None:
+        labels, doc_groups = [None], np.zeros(len(docs), dtype=np.int64)
+    else:
+        # Entries outside `groups` get group -1 and their non-zeros are dropped
+        in_group = np.fromiter((entry_id in groups for entry_id in docs.tolist()), dtype=bool, count=len(docs))
+        labels, codes = _factorize([groups[entry_id] for entry_id in docs[in_group].tolist()])
+        doc_groups = np.full(len(docs), -1, dtype=np.int64)
+        doc_groups[in_group] = codes
+        kept = doc_groups[rows] >= 0
+        rows, columns, weights = rows[kept], columns[kept], weights[kept]
+        if not len(rows):
+            return {}
+    docs_per_group = np.bincount(doc_groups[doc_groups >= 0], minlength=len(labels))
+
+    # Sum per (group, term) without a dense groups x vocabulary matrix
+    cells, cell_index = np.unique(doc_groups[rows] * len(names) + columns, return_inverse=True)
+    scores = np.bincount(cell_index, weights=weights)
+    cell_groups, cell_terms = np.divmod(cells, len(names))
+    bounds = np.searchsorted(cell_groups, np.arange(len(labels) + 1))
+
+    ranked = {}
+    for group, label in enumerate(labels):
+        start, stop = bounds[group], bounds[group + 1]
+        group_scores = scores[start:stop] / docs_per_group[group]
+        best = np.argsort(-group_scores, kind='stable')[:limit]
+        ranked[label] = [(names[cell_terms[start + i]], round(float(group_scores[i]), 4)) for i in best]
+    return ranked
+
+
+def _factorize(values):
+    """(distinct values in first-seen order, index of each value in them)."""
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values),
+                        dtype=np.int64, count=len(values))
+    return list(index), codes
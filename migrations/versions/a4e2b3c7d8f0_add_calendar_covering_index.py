@@ -0,0 +1,27 @@
+"""Add covering index for writing calendar range scans
+
+Revision ID: a4e2b3c7d8f0
+Revises: f3d1a2b6c7e9
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e2b3c7d8f0'
+down_revision = 'f3d1a2b6c7e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (user_id, timestamp, word_count): per-day counts and word totals without reading table rows
+    with op.batch_alter_table('diary_entry', schema=None) as batch_op:
+        batch_op.create_index('idx_user_timestamp_words', ['user_id', 'timestamp', 'word_count'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('diary_entry', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_timestamp_words')
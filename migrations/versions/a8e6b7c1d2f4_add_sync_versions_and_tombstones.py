@@ -0,0 +1,54 @@
+"""Add sync_version columns and tombstones for /api/sync
+
+Revision ID: a8e6b7c1d2f4
+Revises: f7d5a6b0c1e3
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8e6b7c1d2f4'
+down_revision = 'f7d5a6b0c1e3'
+branch_labels = None
+depends_on = None
+
+SYNCED_TABLES = (
+    ('diary_entry', 'idx_entry_user_sync'),
+    ('category', 'idx_category_user_sync'),
+    ('entry_template', 'idx_template_user_sync'),
+)
+
+
+def upgrade():
+    # Existing rows keep version 0; a client's first (full) sync includes them
+    for table, index in SYNCED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('sync_version', sa.Integer(), nullable=False, server_default='0'))
+            batch_op.create_index(index, ['user_id', 'sync_version'], unique=False)
+
+    op.create_table('sync_tombstone',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=False),
+        sa.Column('sync_version', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sync_tombstone', schema=None) as batch_op:
+        batch_op.create_index('idx_tombstone_user_sync', ['user_id', 'sync_version'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sync_tombstone', schema=None) as batch_op:
+        batch_op.drop_index('idx_tombstone_user_sync')
+    op.drop_table('sync_tombstone')
+
+    for table, index in reversed(SYNCED_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(index)
+            batch_op.drop_column('sync_version')
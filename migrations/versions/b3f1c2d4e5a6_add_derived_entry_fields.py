@@ -0,0 +1,69 @@
+"""Add derived entry fields (char count, reading time, excerpt, content hash)
+
+Revision ID: b3f1c2d4e5a6
+Revises: 726600dc2b40
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import hashlib
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f1c2d4e5a6'
+down_revision = '726600dc2b40'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def _derive(content):
+    # Frozen copy of entry_fields.text_statistics at the time of this migration
+    content = content or ''
+    words = len(content.split())
+    return {
+        'word_count': words,
+        'char_count': len(content),
+        'reading_time': max(1, math.ceil(words / 200)),
+        'excerpt': ' '.join(content[:400].split())[:200],
+        'content_hash': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+    }
+
+
+def upgrade():
+    with op.batch_alter_table('diary_entry', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('char_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('reading_time', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    # Backfill every row; word_count is recomputed too because edits never updated it
+    conn = op.get_bind()
+    entries = sa.table('diary_entry',
+                       sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                       sa.column('word_count', sa.Integer), sa.column('char_count', sa.Integer),
+                       sa.column('reading_time', sa.Integer), sa.column('excerpt', sa.String),
+                       sa.column('content_hash', sa.String))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(entries.c.id, entries.c.content)
+            .where(entries.c.id > last_id).order_by(entries.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            conn.execute(entries.update().where(entries.c.id == row.id).values(**_derive(row.content)))
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('diary_entry', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('excerpt')
+        batch_op.drop_column('reading_time')
+        batch_op.drop_column('char_count')
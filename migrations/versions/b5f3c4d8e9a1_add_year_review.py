@@ -0,0 +1,36 @@
+"""Add year_review table for precomputed "year in review" reports
+
+Revision ID: b5f3c4d8e9a1
+Revises: a4e2b3c7d8f0
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5f3c4d8e9a1'
+down_revision = 'a4e2b3c7d8f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by the refresh_year_reviews job; entry writes bump entries_version
+    op.create_table('year_review',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('entries_version', sa.Integer(), nullable=False),
+        sa.Column('built_from', sa.Integer(), nullable=False),
+        sa.Column('report_version', sa.Integer(), nullable=True),
+        sa.Column('timezone_name', sa.String(length=64), nullable=True),
+        sa.Column('generated_at', sa.DateTime(), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'year')
+    )
+
+
+def downgrade():
+    op.drop_table('year_review')
@@ -0,0 +1,58 @@
+"""Add job scheduler tables and stats rollups
+
+Revision ID: b9f7c8d2e3a5
+Revises: a8e6b7c1d2f4
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9f7c8d2e3a5'
+down_revision = 'a8e6b7c1d2f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_run',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_name', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('duration_ms', sa.Integer(), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('owner', sa.String(length=200), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_run', schema=None) as batch_op:
+        batch_op.create_index('idx_job_run_name_started', ['job_name', 'started_at'], unique=False)
+
+    op.create_table('job_lock',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('owner', sa.String(length=200), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+    op.create_table('stats_rollup',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('data_version', sa.Integer(), nullable=False),
+        sa.Column('computed_on', sa.Date(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('stats_rollup')
+    op.drop_table('job_lock')
+    with op.batch_alter_table('job_run', schema=None) as batch_op:
+        batch_op.drop_index('idx_job_run_name_started')
+    op.drop_table('job_run')
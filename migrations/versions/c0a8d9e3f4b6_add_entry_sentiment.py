@@ -0,0 +1,28 @@
+"""Add entry sentiment score
+
+Revision ID: c0a8d9e3f4b6
+Revises: b9f7c8d2e3a5
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c0a8d9e3f4b6'
+down_revision = 'b9f7c8d2e3a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows stay NULL until `flask sentiment backfill` scores them;
+    # new and edited entries are scored by entry_fields on write
+    with op.batch_alter_table('diary_entry', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sentiment', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('diary_entry', schema=None) as batch_op:
+        batch_op.drop_column('sentiment')
@@ -0,0 +1,48 @@
+"""Backfill missing entry excerpts before content is deferred in list views
+
+Revision ID: c4a2d3e6f7b8
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a2d3e6f7b8'
+down_revision = 'b3f1c2d4e5a6'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def upgrade():
+    # Rows written by workers still running pre-excerpt code during the previous
+    # deploy have no excerpt; list views no longer load content, so fill them in.
+    conn = op.get_bind()
+    entries = sa.table('diary_entry',
+                       sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                       sa.column('char_count', sa.Integer), sa.column('excerpt', sa.String))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(entries.c.id, entries.c.content)
+            .where(entries.c.excerpt.is_(None), entries.c.id > last_id)
+            .order_by(entries.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            content = row.content or ''
+            conn.execute(entries.update().where(entries.c.id == row.id).values(
+                excerpt=' '.join(content[:400].split())[:200],
+                char_count=len(content),
+            ))
+        last_id = rows[-1].id
+
+
+def downgrade():
+    # Data-only migration; nothing to undo
+    pass
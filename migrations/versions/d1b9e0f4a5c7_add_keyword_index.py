@@ -0,0 +1,47 @@
+"""Add per-user keyword index (entry_term, user_term)
+
+Revision ID: d1b9e0f4a5c7
+Revises: c0a8d9e3f4b6
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1b9e0f4a5c7'
+down_revision = 'c0a8d9e3f4b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled for existing entries by `flask keywords rebuild`; entry writes keep it current
+    op.create_table('entry_term',
+        sa.Column('entry_id', sa.Integer(), nullable=False),
+        sa.Column('term', sa.String(length=40), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['entry_id'], ['diary_entry.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('entry_id', 'term')
+    )
+    with op.batch_alter_table('entry_term', schema=None) as batch_op:
+        batch_op.create_index('idx_entry_term_user', ['user_id', 'entry_id'], unique=False)
+
+    op.create_table('user_term',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('term', sa.String(length=40), nullable=False),
+        sa.Column('doc_freq', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'term')
+    )
+
+
+def downgrade():
+    op.drop_table('user_term')
+    with op.batch_alter_table('entry_term', schema=None) as batch_op:
+        batch_op.drop_index('idx_entry_term_user')
+
+    op.drop_table('entry_term')
@@ -0,0 +1,28 @@
+"""Add timezone_name to user for local-day streaks
+
+Revision ID: d5b3e4f8a9c1
+Revises: c4a2d3e6f7b8
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5b3e4f8a9c1'
+down_revision = 'c4a2d3e6f7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('timezone_name', sa.String(length=50), nullable=True, server_default='UTC'))
+
+    # Streaks are now derived from history; run `flask streaks repair` after upgrading
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('timezone_name')
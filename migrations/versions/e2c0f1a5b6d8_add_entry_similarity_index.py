@@ -0,0 +1,41 @@
+"""Add MinHash/LSH similarity index (entry_signature, entry_bucket)
+
+Revision ID: e2c0f1a5b6d8
+Revises: d1b9e0f4a5c7
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c0f1a5b6d8'
+down_revision = 'd1b9e0f4a5c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled for existing entries by `flask similarity rebuild`; entry writes keep it current
+    op.create_table('entry_signature',
+        sa.Column('entry_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('signature', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['entry_id'], ['diary_entry.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('entry_id')
+    )
+    op.create_table('entry_bucket',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.Column('entry_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['entry_id'], ['diary_entry.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'bucket', 'entry_id')
+    )
+
+
+def downgrade():
+    op.drop_table('entry_bucket')
+    op.drop_table('entry_signature')
@@ -0,0 +1,28 @@
+"""Add categories/templates version counters to user
+
+Revision ID: e6c4f5a9b0d2
+Revises: d5b3e4f8a9c1
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6c4f5a9b0d2'
+down_revision = 'd5b3e4f8a9c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('categories_version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('templates_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('templates_version')
+        batch_op.drop_column('categories_version')
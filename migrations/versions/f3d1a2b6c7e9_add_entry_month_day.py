@@ -0,0 +1,49 @@
+"""Add diary_entry.month_day for "on this day" lookups
+
+Revision ID: f3d1a2b6c7e9
+Revises: e2c0f1a5b6d8
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3d1a2b6c7e9'
+down_revision = 'e2c0f1a5b6d8'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def upgrade():
+    with op.batch_alter_table('diary_entry', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('month_day', sa.Integer(), nullable=True))
+        batch_op.create_index('idx_user_month_day', ['user_id', 'month_day', 'timestamp'], unique=False)
+
+    # Backfill: MMDD of the stored (UTC) timestamp, as entry_fields.month_day computes it
+    conn = op.get_bind()
+    entries = sa.table('diary_entry',
+                       sa.column('id', sa.Integer), sa.column('timestamp', sa.DateTime),
+                       sa.column('month_day', sa.Integer))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(entries.c.id, entries.c.timestamp)
+            .where(entries.c.id > last_id).order_by(entries.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            if row.timestamp is not None:
+                conn.execute(entries.update().where(entries.c.id == row.id)
+                             .values(month_day=row.timestamp.month * 100 + row.timestamp.day))
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('diary_entry', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_month_day')
+        batch_op.drop_column('month_day')
@@ -0,0 +1,205 @@
+"""
+On-demand request profiling for the Diary application.
+
+When PROFILING_ENABLED is set, a request carrying the admin secret in the
+X-Profile-Secret header is run under cProfile and tracemalloc. The results
+are written to PROFILING_DIR (logs/profiles/ by default):
+
+    <id>.pstats     cProfile data, loadable with pstats / snakeviz
+    <id>.alloc.txt  top allocation sites from a tracemalloc snapshot
+    <id>.json       request metadata (path, status, wall time, peak memory)
+
+Requests without the header are passed straight through.
+
+Captured profiles can be inspected with:
+    flask profiles list
+    flask profiles show <id>
+"""
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+PROFILE_HEADER = 'X-Profile-Secret'
+
+
+class RequestProfiler:
+    """WSGI middleware that profiles single requests on demand.
+
+    tracemalloc is process-wide, so only one request is profiled at a time;
+    concurrent requests carrying the header are served without profiling.
+    """
+
+    def __init__(self, wsgi_app, secret, output_dir, top_allocations=30, logger=None):
+        self.wsgi_app = wsgi_app
+        self.secret = secret
+        self.output_dir = output_dir
+        self.top_allocations = top_allocations
+        self.logger = logger
+        self._lock = threading.Lock()
+
+    def _authorized(self, environ):
+        supplied = environ.get('HTTP_' + PROFILE_HEADER.upper().replace('-', '_'))
+        return bool(supplied) and hmac.compare_digest(supplied.encode(), self.secret.encode())
+
+    def __call__(self, environ, start_response):
+        if not self._authorized(environ) or not self._lock.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+        try:
+            return self._profile(environ, start_response)
+        finally:
+            self._lock.release()
+
+    def _profile(self, environ, start_response):
+        method = environ.get('REQUEST_METHOD', 'GET')
+        path = environ.get('PATH_INFO', '/')
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-') or 'root'
+        profile_id = f"{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}-{method.lower()}-{slug}-{uuid.uuid4().hex[:6]}"
+        captured = {}
+
+        def capturing_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            headers = list(headers) + [('X-Profile-Id', profile_id)]
+            return start_response(status, headers, exc_info)
+
+        tracemalloc_was_running = tracemalloc.is_tracing()
+        if not tracemalloc_was_running:
+            tracemalloc.start(25)
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+
+        profiler.enable()
+        try:
+            # Drain the body inside the profiler so streamed responses and
+            # lazily rendered templates are included in the numbers.
+            iterable = self.wsgi_app(environ, capturing_start_response)
+            try:
+                body = list(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        finally:
+            profiler.disable()
+            wall_ms = (time.perf_counter() - started) * 1000
+            snapshot = tracemalloc.take_snapshot()
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            if not tracemalloc_was_running:
+                tracemalloc.stop()
+
+        meta = {
+            'id': profile_id,
+            'method': method,
+            'path': path,
+            'query': environ.get('QUERY_STRING', ''),
+            'status': captured.get('status', ''),
+            'wall_ms': round(wall_ms, 2),
+            'peak_kib': round(peak_bytes / 1024, 1),
+            'response_bytes': sum(len(chunk) for chunk in body),
+            'captured_at': datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            self._write(profile_id, profiler, snapshot, meta)
+        except OSError as e:
+            if self.logger:
+                self.logger.error(f'Could not write profile {profile_id}: {str(e)}')
+        else:
+            if self.logger:
+                self.logger.info(f'Profile captured: {profile_id} ({wall_ms:.1f} ms, peak {meta["peak_kib"]} KiB)')
+        return body
+
+    def _write(self, profile_id, profiler, snapshot, meta):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, profile_id)
+        profiler.dump_stats(base + '.pstats')
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        with open(base + '.alloc.txt', 'w') as f:
+            f.write(f"{meta['method']} {meta['path']} -> {meta['status']}\n")
+            f.write(f"wall {meta['wall_ms']} ms, peak traced memory {meta['peak_kib']} KiB\n\n")
+            f.write(f'Top {self.top_allocations} allocation sites:\n')
+            for stat in snapshot.statistics('lineno')[:self.top_allocations]:
+                f.write(f'{stat}\n')
+
+        with open(base + '.json', 'w') as f:
+            json.dump(meta, f, indent=2)
+
+
+def init_profiling(app):
+    """Install the profiler middleware (when enabled) and the CLI commands."""
+    app.cli.add_command(profiles_cli)
+
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+    secret = app.config.get('PROFILING_SECRET')
+    if not secret:
+        app.logger.warning('PROFILING_ENABLED is set but PROFILING_SECRET is empty; profiling disabled')
+        return
+    app.wsgi_app = RequestProfiler(app.wsgi_app, secret, app.config['PROFILING_DIR'], logger=app.logger)
+    app.logger.info(f"Request profiling enabled, writing to {app.config['PROFILING_DIR']}")
+
+
+# ------------------ CLI ------------------
+profiles_cli = AppGroup('profiles', help='Inspect captured request profiles.')
+
+
+def _load_profiles(directory):
+    profiles = []
+    if not os.path.isdir(directory):
+        return profiles
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as f:
+                profiles.append(json.load(f))
+    return sorted(profiles, key=lambda p: p['captured_at'], reverse=True)
+
+
+@profiles_cli.command('list')
+@click.option('--limit', default=20, show_default=True, help='Number of profiles to show.')
+def list_profiles(limit):
+    """List captured profiles, newest first."""
+    profiles = _load_profiles(current_app.config['PROFILING_DIR'])
+    if not profiles:
+        click.echo('No profiles captured yet.')
+        return
+    click.echo(f"{'id':<60}{'status':>8}{'wall ms':>10}{'peak KiB':>10}")
+    for p in profiles[:limit]:
+        click.echo(f"{p['id']:<60}{p['status'][:3]:>8}{p['wall_ms']:>10}{p['peak_kib']:>10}")
+
+
+@profiles_cli.command('show')
+@click.argument('profile_id')
+@click.option('--sort', default='cumulative', show_default=True, help='pstats sort key.')
+@click.option('--limit', default=30, show_default=True, help='Number of functions to show.')
+def show_profile(profile_id, sort, limit):
+    """Summarize one profile: hottest functions and top allocations."""
+    base = os.path.join(current_app.config['PROFILING_DIR'], profile_id)
+    if not os.path.exists(base + '.pstats'):
+        raise click.ClickException(f'Profile not found: {profile_id}')
+
+    with open(base + '.json') as f:
+        meta = json.load(f)
+    click.echo(f"{meta['method']} {meta['path']}?{meta['query']} -> {meta['status']}")
+    click.echo(f"wall {meta['wall_ms']} ms, peak {meta['peak_kib']} KiB, {meta['response_bytes']} bytes\n")
+
+    out = io.StringIO()
+    pstats.Stats(base + '.pstats', stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    click.echo(out.getvalue())
+
+    with open(base + '.alloc.txt') as f:
+        click.echo(f.read())
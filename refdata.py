@@ -0,0 +1,42 @@
+"""
+Per-user reference-data cache for the entry editor.
+
+The /write form needs the user's categories and templates on every render,
+but those lists change rarely. They are cached per worker process as plain
+dicts keyed by (kind, user id, version). The version counters live on the
+user row (User.categories_version / User.templates_version), which is
+already loaded for authentication, so a cache hit needs no extra query.
+Routes that create, edit or delete categories or templates bump the
+counter, and old versions simply fall out of the LRU.
+"""
+import threading
+from collections import OrderedDict
+
+
+class ReferenceDataCache:
+    """Thread-safe LRU of per-user reference lists."""
+
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind, user_id, version, load):
+        """Return the cached list for (kind, user_id, version), calling `load()` on a miss."""
+        key = (kind, user_id, version)
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                return value
+
+        value = tuple(load())
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,291 @@
+"""
+Lightweight job scheduler for periodic maintenance and precomputation.
+
+Jobs are plain functions registered with a schedule, either `every(...)`
+for a fixed interval or `cron('m h dom mon dow')` with five-field cron
+expressions evaluated in UTC. Run state lives in the database:
+
+    - job_run: one row per run (status, timings, result or error), which
+      also tells the scheduler when each job last ran
+    - job_lock: named leases. Each job holds `job:<name>` while it runs, so
+      runs never overlap across processes. The `scheduler` lease elects the
+      single process that executes jobs when every web worker runs the
+      scheduler loop (SCHEDULER_ENABLED).
+
+A job that has never run is due immediately. Leases expire after the job's
+`lease` seconds, so a crashed process cannot block a job for ever.
+
+Run it as its own process with `flask jobs run`, or inside the web workers
+with SCHEDULER_ENABLED=true (see gunicorn.conf.py).
+"""
+import os
+import socket
+import threading
+import time
+import traceback
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+LEADER_LOCK = 'scheduler'
+
+
+def utcnow():
+    """Naive UTC, as stored by SQLite."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ------------------ Schedules ------------------
+class Interval:
+    """Run every `seconds`, measured from the start of the previous run."""
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError('interval must be positive')
+        self.seconds = seconds
+
+    def next_after(self, last):
+        return last + timedelta(seconds=self.seconds)
+
+    def __str__(self):
+        return f'every {self.seconds}s'
+
+
+def every(seconds=0, minutes=0, hours=0, days=0):
+    return Interval(int(seconds + minutes * 60 + hours * 3600 + days * 86400))
+
+
+class Cron:
+    """Five-field cron expression (minute hour day-of-month month day-of-week), UTC.
+
+    Fields accept `*`, numbers, ranges (`1-5`), steps (`*/15`, `0-30/10`)
+    and comma lists. Day-of-week runs 0-6 from Sunday (7 is also Sunday).
+    As in cron, when both day fields are restricted either may match.
+    """
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f'cron expression needs 5 fields: {expression!r}')
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES))
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(','):
+            spec, _, step = part.partition('/')
+            step = int(step) if step else 1
+            if spec == '*':
+                start, end = low, high
+            elif '-' in spec:
+                start, end = (int(v) for v in spec.split('-', 1))
+            else:
+                start = int(spec)
+                end = high if step > 1 else start
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f'cron field out of range: {field!r}')
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, day):
+        in_month = day.day in self.days
+        in_week = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, last):
+        """First matching minute strictly after `last`."""
+        moment = last.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f'cron expression never matches: {self.expression!r}')
+
+    def __str__(self):
+        return f'cron {self.expression}'
+
+
+def cron(expression):
+    return Cron(expression)
+
+
+Job = namedtuple('Job', 'name func schedule lease description')
+
+
+# ------------------ Scheduler ------------------
+class Scheduler:
+    """Job registry plus the run loop.
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        run_model: JobRun model (job_name, status, started_at, finished_at,
+            duration_ms, result, error, owner)
+        lock_model: JobLock model (name, owner, expires_at)
+    """
+
+    def __init__(self, db, run_model, lock_model):
+        self.db = db
+        self.runs = run_model.__table__
+        self.locks = lock_model.__table__
+        self.jobs = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def owner(self):
+        # Per process: with gunicorn's preload_app the scheduler is built before the fork
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def job(self, schedule, name=None, lease=3600):
+        """Decorator registering `func` as a job; `lease` bounds one run in seconds."""
+        def decorator(func):
+            job_name = name or func.__name__
+            if job_name in self.jobs:
+                raise ValueError(f'duplicate job name: {job_name}')
+            description = (func.__doc__ or '').strip().split('\n')[0]
+            self.jobs[job_name] = Job(job_name, func, schedule, lease, description)
+            return func
+        return decorator
+
+    # ------------------ Leases ------------------
+    def acquire(self, name, seconds):
+        """Take or renew lease `name` for this process; False if someone else holds it."""
+        now = utcnow()
+        expires = now + timedelta(seconds=seconds)
+        with self.db.engine.begin() as conn:
+            taken = conn.execute(update(self.locks).where(
+                self.locks.c.name == name,
+                (self.locks.c.expires_at < now) | (self.locks.c.owner == self.owner),
+            ).values(owner=self.owner, expires_at=expires)).rowcount
+            if taken:
+                return True
+        try:
+            with self.db.engine.begin() as conn:
+                conn.execute(insert(self.locks).values(name=name, owner=self.owner, expires_at=expires))
+            return True
+        except IntegrityError:
+            return False  # held by another process
+
+    def release(self, name):
+        with self.db.engine.begin() as conn:
+            conn.execute(update(self.locks).where(
+                self.locks.c.name == name, self.locks.c.owner == self.owner,
+            ).values(expires_at=utcnow()))
+
+    # ------------------ Runs ------------------
+    def last_runs(self):
+        """{job name: start of its latest run}."""
+        with self.db.engine.connect() as conn:
+            rows = conn.execute(select(self.runs.c.job_name, func.max(self.runs.c.started_at))
+                                .where(self.runs.c.status != 'skipped')
+                                .group_by(self.runs.c.job_name)).all()
+        return dict(rows)
+
+    def next_run(self, job, last):
+        return job.schedule.next_after(last) if last else None
+
+    def due(self, now=None):
+        now = now or utcnow()
+        last = self.last_runs()
+        return [job for job in self.jobs.values()
+                if job.name not in last or self.next_run(job, last[job.name]) <= now]
+
+    def run_job(self, job, app):
+        """Run `job` under its lease and record it in job_run; returns the status."""
+        with app.app_context():
+            return self._run_job(job, app)
+
+    def _run_job(self, job, app):
+        lock = f'job:{job.name}'
+        if not self.acquire(lock, job.lease):
+            app.logger.info(f'Job {job.name} skipped: already running elsewhere')
+            return 'locked'
+
+        with self.db.engine.begin() as conn:
+            run_id = conn.execute(insert(self.runs).values(
+                job_name=job.name, status='running', started_at=utcnow(), owner=self.owner,
+            )).inserted_primary_key[0]
+
+        clock = time.perf_counter()
+        status, result, error = 'success', None, None
+        try:
+            outcome = job.func()
+            result = None if outcome is None else str(outcome)[:1000]
+        except Exception as e:
+            status, error = 'failed', traceback.format_exc()[-4000:]
+            app.logger.error(f'Job {job.name} failed: {str(e)}')
+        finally:
+            self.db.session.remove()
+            duration_ms = int((time.perf_counter() - clock) * 1000)
+            with self.db.engine.begin() as conn:
+                conn.execute(update(self.runs).where(self.runs.c.id == run_id).values(
+                    status=status, finished_at=utcnow(), duration_ms=duration_ms,
+                    result=result, error=error))
+            self.release(lock)
+
+        app.logger.info(f'Job {job.name} {status} in {duration_ms}ms' + (f': {result}' if result else ''))
+        return status
+
+    def run_pending(self, app):
+        """Run every due job once, in registration order."""
+        with app.app_context():
+            jobs = self.due()
+        return {job.name: self.run_job(job, app) for job in jobs}
+
+    # ------------------ Loop ------------------
+    def run_forever(self, app, poll_seconds=30, elect=False):
+        """Run due jobs every `poll_seconds` until stop().
+
+        With `elect`, only the process holding the scheduler lease runs jobs;
+        the others keep polling and take over when its lease runs out.
+        """
+        lease = max(poll_seconds * 3, 60)
+        try:
+            while not self._stop.is_set():
+                try:
+                    with app.app_context():
+                        leader = not elect or self.acquire(LEADER_LOCK, lease)
+                    if leader:
+                        self.run_pending(app)
+                except Exception as e:
+                    app.logger.error(f'Scheduler loop error: {str(e)}')
+                self._stop.wait(poll_seconds)
+        finally:
+            if elect:
+                # Let another process take over without waiting for the lease to run out
+                with app.app_context():
+                    self.release(LEADER_LOCK)
+
+    def start(self, app, poll_seconds=30):
+        """Run the elected loop in a daemon thread of this process."""
+        if self._thread and self._thread.is_alive():
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, args=(app, poll_seconds, True),
+                                        name='diary-scheduler', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
@@ -0,0 +1,109 @@
+"""
+Local lexicon-based sentiment scoring for diary entries.
+
+Each word in LEXICON carries a valence between -3 and 3. A word that
+follows a negator ("not", "never", ...) within NEGATION_SCOPE tokens counts
+with a flipped, damped valence. Texts are turned into a token-count matrix
+over the lexicon (one column per word, one more per negated word) and scored
+with a single matrix product, so scoring a batch costs about the same as
+tokenizing it. The raw sum is squashed into [-1, 1].
+
+Nothing here talks to the network or the database: entry_fields calls
+score() on every write and `flask sentiment backfill` calls score_batch()
+from a process pool.
+"""
+import re
+
+import numpy as np
+
+LEXICON = {
+    # positive
+    'amazing': 3, 'awesome': 3, 'beautiful': 2, 'best': 3, 'better': 2, 'blessed': 2,
+    'brilliant': 3, 'calm': 2, 'celebrate': 3, 'celebrated': 3, 'cheerful': 2,
+    'comfortable': 2, 'confident': 2, 'cozy': 2, 'delighted': 3,
+    'delightful': 3, 'easy': 1, 'energized': 2, 'enjoy': 2, 'enjoyed': 2, 'excellent': 3,
+    'excited': 3, 'exciting': 3, 'fantastic': 3, 'fine': 1, 'fortunate': 2, 'free': 1,
+    'fun': 2, 'glad': 2, 'good': 2, 'grateful': 3, 'great': 3, 'happy': 3, 'healthy': 2,
+    'helpful': 2, 'hope': 1, 'hopeful': 2, 'inspired': 2, 'joy': 3, 'joyful': 3,
+    'kind': 2, 'laugh': 2, 'laughed': 2, 'liked': 1, 'love': 3, 'loved': 3,
+    'lovely': 3, 'lucky': 2, 'motivated': 2, 'nice': 2, 'okay': 1, 'peaceful': 2,
+    'perfect': 3, 'pleasant': 2, 'pleased': 2, 'productive': 2, 'proud': 2, 'refreshed': 2,
+    'relaxed': 2, 'relaxing': 2, 'relieved': 2, 'rested': 1, 'safe': 1, 'satisfied': 2,
+    'smile': 2, 'smiled': 2, 'success': 2, 'successful': 2, 'sunny': 1, 'support': 1,
+    'thankful': 3, 'thanks': 2, 'thrilled': 3, 'win': 2, 'won': 2, 'wonderful': 3,
+    # negative
+    'afraid': -2, 'alone': -2, 'angry': -3, 'annoyed': -2, 'annoying': -2, 'anxious': -2,
+    'anxiety': -2, 'argue': -2, 'argued': -2, 'argument': -2, 'ashamed': -2, 'awful': -3,
+    'bad': -2, 'bored': -1, 'boring': -1, 'broke': -1, 'broken': -2, 'burnout': -3,
+    'cried': -2, 'cry': -2, 'crying': -2, 'depressed': -3, 'disappointed': -2,
+    'disappointing': -2, 'drained': -2, 'dread': -3, 'exhausted': -2, 'failed': -2,
+    'failure': -2, 'fear': -2, 'frustrated': -2, 'frustrating': -2, 'furious': -3,
+    'guilty': -2, 'hate': -3, 'hated': -3, 'hopeless': -3, 'hurt': -2, 'ill': -2,
+    'lonely': -2, 'lost': -1, 'mad': -2, 'miserable': -3, 'miss': -1, 'nervous': -2,
+    'overwhelmed': -2, 'pain': -2, 'painful': -2, 'panic': -3, 'problem': -1,
+    'problems': -1, 'regret': -2, 'sad': -2, 'scared': -2, 'sick': -2, 'sorry': -1,
+    'stress': -2, 'stressed': -2, 'stressful': -2, 'struggle': -2, 'struggled': -2,
+    'stuck': -2, 'terrible': -3, 'tired': -1, 'ugly': -2, 'unhappy': -2, 'upset': -2,
+    'useless': -2, 'worried': -2, 'worry': -2, 'worse': -2, 'worst': -3, 'wrong': -2,
+}
+
+NEGATORS = frozenset({
+    'not', 'no', 'never', 'nothing', 'nobody', 'none', 'neither', 'nor', 'without', 'hardly',
+    "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "weren't", "can't", "couldn't",
+    "won't", "wouldn't", "shouldn't", "haven't", "hasn't", "hadn't", 'cannot',
+})
+NEGATION_SCOPE = 3  # tokens after a negator that it flips
+NEGATION_FACTOR = -0.74  # "not good" is milder than "bad"
+ALPHA = 15  # normalisation constant: raw / sqrt(raw^2 + ALPHA)
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+_VOCAB = {word: index for index, word in enumerate(LEXICON)}
+_WEIGHTS = np.array(list(LEXICON.values()), dtype=np.float64)
+# Column i is word i as written, column V + i is word i under negation
+_COLUMN_WEIGHTS = np.concatenate([_WEIGHTS, _WEIGHTS * NEGATION_FACTOR])
+
+
+def tokenize(text):
+    """Lowercase word tokens, keeping contractions ("didn't") whole."""
+    return TOKEN_RE.findall((text or '').lower().replace('’', "'"))
+
+
+def _hits(text):
+    """Matrix column of every lexicon word in `text`."""
+    columns = []
+    negated_until = -1
+    for position, token in enumerate(tokenize(text)):
+        if token in NEGATORS:
+            negated_until = position + NEGATION_SCOPE
+            continue
+        index = _VOCAB.get(token)
+        if index is not None:
+            columns.append(index + len(_VOCAB) if position <= negated_until else index)
+    return columns
+
+
+def token_counts(texts):
+    """(len(texts), 2 * len(LEXICON)) matrix of lexicon token counts."""
+    width = len(_COLUMN_WEIGHTS)
+    rows, columns = [], []
+    for row, text in enumerate(texts):
+        hits = _hits(text)
+        rows.extend([row] * len(hits))
+        columns.extend(hits)
+    flat = np.asarray(rows, dtype=np.int64) * width + np.asarray(columns, dtype=np.int64)
+    return np.bincount(flat, minlength=len(texts) * width).reshape(len(texts), width)
+
+
+def score_batch(texts):
+    """Sentiment in [-1, 1] for each text, rounded to 4 places; 0.0 when no lexicon word occurs."""
+    texts = list(texts)
+    if not texts:
+        return []
+    raw = token_counts(texts) @ _COLUMN_WEIGHTS
+    return np.round(raw / np.sqrt(raw * raw + ALPHA), 4).tolist()
+
+
+def score(text):
+    """Sentiment in [-1, 1] of a single text."""
+    return score_batch([text])[0]
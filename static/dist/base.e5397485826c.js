@@ -0,0 +1,19 @@
+function toggleTheme(){const body=document.body;const icon=document.querySelector('.theme-toggle i');body.classList.toggle('dark-mode');if(body.classList.contains('dark-mode')){icon.classList.replace('fa-moon','fa-sun');localStorage.setItem('theme','dark');saveUserThemePreference('dark');}else{icon.classList.replace('fa-sun','fa-moon');localStorage.setItem('theme','light');saveUserThemePreference('light');}}
+async function saveUserThemePreference(theme){const csrfToken=document.querySelector('meta[name="csrf-token"]');if(csrfToken){try{const response=await fetch('/api/theme',{method:'POST',headers:{'Content-Type':'application/json','X-CSRFToken':csrfToken.getAttribute('content')},body:JSON.stringify({theme:theme})});if(!response.ok){console.warn('Could not save theme preference to server');}}catch(error){console.warn('Error saving theme preference:',error);}}}
+async function syncUserTimezone(){const csrfToken=document.querySelector('meta[name="csrf-token"]');const browserTimezone=Intl.DateTimeFormat().resolvedOptions().timeZone;if(!csrfToken||!window.userTimezone||!browserTimezone||browserTimezone===window.userTimezone){return;}
+try{const response=await fetch('/api/timezone',{method:'POST',headers:{'Content-Type':'application/json','X-CSRFToken':csrfToken.getAttribute('content')},body:JSON.stringify({timezone:browserTimezone})});if(response.ok){window.userTimezone=browserTimezone;}}catch(error){console.warn('Error saving timezone:',error);}}
+function initializeTheme(){const savedTheme=localStorage.getItem('theme');const systemPrefersDark=window.matchMedia('(prefers-color-scheme: dark)').matches;const icon=document.querySelector('.theme-toggle i');const isAuthenticated=document.querySelector('meta[name="csrf-token"]')!==null;let theme='light';if(isAuthenticated&&window.userThemePreference){theme=window.userThemePreference;}else if(savedTheme){theme=savedTheme;}else if(systemPrefersDark){theme='dark';}
+if(theme==='dark'){document.body.classList.add('dark-mode');if(icon){icon.classList.replace('fa-moon','fa-sun');}}else if(icon){icon.classList.add('fa-moon');}
+if(!savedTheme){localStorage.setItem('theme',theme);if(theme!=='light'){saveUserThemePreference(theme);}}
+window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change',(e)=>{if(!localStorage.getItem('theme')||localStorage.getItem('theme')==='system'){if(e.matches){document.body.classList.add('dark-mode');if(icon)icon.classList.replace('fa-moon','fa-sun');localStorage.setItem('theme','dark');}else{document.body.classList.remove('dark-mode');if(icon)icon.classList.replace('fa-sun','fa-moon');localStorage.setItem('theme','light');}}});}
+function showOfflineNotice(text){let container=document.querySelector('.flash-messages');if(!container){container=document.createElement('div');container.className='flash-messages';const main=document.getElementById('main-content');if(!main)return;main.prepend(container);}
+const existing=container.querySelector('.offline-notice');if(existing)existing.remove();if(!text)return;const message=document.createElement('div');message.className='flash-message flash-info offline-notice';message.setAttribute('role','status');message.innerHTML='<i class="fas fa-cloud-upload-alt" aria-hidden="true"></i> ';message.appendChild(document.createTextNode(text));container.appendChild(message);}
+function initServiceWorker(){if(!('serviceWorker'in navigator)){return;}
+navigator.serviceWorker.addEventListener('message',(event)=>{const data=event.data||{};if(data.type==='queued'){showOfflineNotice(data.count?`${data.count} change(s) saved offline, waiting to sync.`:'');}else if(data.type==='synced'){const failed=data.failed&&data.failed.length?` ${data.failed.length} could not be saved: ${data.failed.join('; ')}`:'';showOfflineNotice(`Synced ${data.applied} offline change(s).${failed}`);}});navigator.serviceWorker.register('/sw.js').catch((error)=>console.warn('Service worker registration failed:',error));navigator.serviceWorker.ready.then((registration)=>{registration.active.postMessage({type:'session',userId:window.currentUserId??null});const urls=[...new Set([...document.querySelectorAll('a[href^="/entry/"]')].map((a)=>a.getAttribute('href')))];if(window.currentUserId!=null&&urls.length){registration.active.postMessage({type:'precache',urls:urls.slice(0,20)});}});window.addEventListener('online',()=>{navigator.serviceWorker.controller?.postMessage({type:'replay'});});}
+document.addEventListener('DOMContentLoaded',()=>{initializeTheme();syncUserTimezone();initServiceWorker();const flashMessages=document.querySelectorAll('.flash-message');flashMessages.forEach(message=>{setTimeout(()=>{message.style.opacity='0';message.style.transform='translateY(-10px)';setTimeout(()=>{message.remove();},300);},5000);});});document.addEventListener('keydown',(e)=>{if(e.key==='Escape'){const modal=document.getElementById('botChatModal');if(modal&&modal.style.display!=='none'){toggleBotChat();}}});const DiaryBatch=(()=>{const MAX_OPERATIONS=100;let pending=[];function csrfToken(){return document.querySelector('meta[name="csrf-token"]')?.getAttribute('content')||document.querySelector('input[name="csrf_token"]')?.value;}
+function operationError(result){const error=new Error(result?.error||'Operation failed');error.status=result?.status;return error;}
+async function send(calls){const token=csrfToken();let data;try{const response=await fetch('/api/batch',{method:'POST',credentials:'same-origin',headers:{'Content-Type':'application/json',...(token&&{'X-CSRFToken':token})},body:JSON.stringify({operations:calls.map((call)=>call.operation)})});data=await response.json().catch(()=>({}));if(!response.ok){throw operationError({status:response.status,error:data.error||(response.status===429?'Too many requests. Please try again later.':`Request failed (${response.status})`)});}}catch(error){calls.forEach((call)=>call.reject(error));return;}
+calls.forEach((call,index)=>{const result=data.results[index];if(result&&result.status<400){call.resolve(result.result);}else{call.reject(operationError(result));}});}
+function flush(){const calls=pending;pending=[];for(let start=0;start<calls.length;start+=MAX_OPERATIONS){send(calls.slice(start,start+MAX_OPERATIONS));}}
+function call(op,params={}){return new Promise((resolve,reject)=>{pending.push({operation:{op,...params},resolve,reject});if(pending.length===1){queueMicrotask(flush);}});}
+return{call};})();
\ No newline at end of file
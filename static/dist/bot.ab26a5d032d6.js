@@ -0,0 +1,18 @@
+document.addEventListener('DOMContentLoaded',function(){const chatInput=document.getElementById('chatInput');const chatMessages=document.getElementById('chatMessages');const sendBtn=document.getElementById('sendBtn');const inputCharCount=document.getElementById('inputCharCount');const typingStatus=document.getElementById('typingStatus');chatInput.addEventListener('input',function(){const count=this.value.length;inputCharCount.textContent=count;if(count>450){inputCharCount.style.color='#e74c3c';chatInput.style.borderColor='#e74c3c';}else if(count>400){inputCharCount.style.color='#f39c12';chatInput.style.borderColor='#f39c12';}else{inputCharCount.style.color='#666';chatInput.style.borderColor='rgba(102, 126, 234, 0.3)';}
+sendBtn.disabled=count===0||count>500;if(count>0&&count<=500){typingStatus.style.display='flex';}else{typingStatus.style.display='none';}});chatInput.addEventListener('keydown',function(e){if((e.key==='Enter'&&!e.shiftKey)||(e.ctrlKey&&e.key==='Enter')){e.preventDefault();sendMessage();}
+if(e.key==='Escape'){this.blur();typingStatus.style.display='none';}});document.getElementById('initialMessageTime').textContent=new Date().toLocaleTimeString([],{hour:'2-digit',minute:'2-digit'});});async function sendMessage(){const chatInput=document.getElementById('chatInput');const message=chatInput.value.trim();if(!message)return;addMessage(message,'user');chatInput.value='';document.getElementById('inputCharCount').textContent='0';document.getElementById('typingStatus').style.display='none';chatInput.style.borderColor='rgba(102, 126, 234, 0.3)';showTypingIndicator();try{const response=await fetch('/bot/chat',{method:'POST',headers:{'Content-Type':'application/json',},body:JSON.stringify({message:message})});const data=await response.json();hideTypingIndicator();if(data.success){addMessage(data.response,'bot',data.timestamp);}else{addMessage('Sorry, I encountered an error. Please try again.','bot');}}catch(error){hideTypingIndicator();addMessage('Sorry, I\'m having trouble connecting right now. Please try again later.','bot');console.error('Bot chat error:',error);}}
+function addMessage(text,sender,timestamp=null){const chatMessages=document.getElementById('chatMessages');const messageDiv=document.createElement('div');messageDiv.className=`message ${sender}-message`;const avatarDiv=document.createElement('div');avatarDiv.className='message-avatar';const avatarIcon=document.createElement('i');avatarIcon.className=sender==='bot'?'fas fa-robot':'fas fa-user';avatarDiv.appendChild(avatarIcon);const contentDiv=document.createElement('div');contentDiv.className='message-content';const textDiv=document.createElement('div');textDiv.className='message-text';textDiv.innerHTML=formatMessage(text);const timeDiv=document.createElement('div');timeDiv.className='message-time';timeDiv.textContent=timestamp||new Date().toLocaleTimeString([],{hour:'2-digit',minute:'2-digit'});contentDiv.appendChild(textDiv);contentDiv.appendChild(timeDiv);messageDiv.appendChild(avatarDiv);messageDiv.appendChild(contentDiv);chatMessages.appendChild(messageDiv);scrollToBottom();}
+function formatMessage(text){return text.replace(/\*\*(.*?)\*\*/g,'<strong>$1</strong>').replace(/\*(.*?)\*/g,'<em>$1</em>').replace(/^- (.*$)/gm,'<li>$1</li>').replace(/(<li>.*<\/li>)/s,'<ul>$1</ul>').replace(/\n/g,'<br>');}
+function showTypingIndicator(){const chatMessages=document.getElementById('chatMessages');const typingDiv=document.createElement('div');typingDiv.className='message bot-message typing-indicator';typingDiv.id='typingIndicator';const avatarDiv=document.createElement('div');avatarDiv.className='message-avatar';avatarDiv.innerHTML='<i class="fas fa-robot"></i>';const contentDiv=document.createElement('div');contentDiv.className='message-content';const textDiv=document.createElement('div');textDiv.className='message-text';textDiv.innerHTML='<i class="fas fa-circle"></i> <i class="fas fa-circle"></i> <i class="fas fa-circle"></i>';contentDiv.appendChild(textDiv);typingDiv.appendChild(avatarDiv);typingDiv.appendChild(contentDiv);chatMessages.appendChild(typingDiv);scrollToBottom();}
+function hideTypingIndicator(){const typingIndicator=document.getElementById('typingIndicator');if(typingIndicator){typingIndicator.remove();}}
+function scrollToBottom(){const chatMessages=document.getElementById('chatMessages');chatMessages.scrollTo({top:chatMessages.scrollHeight,behavior:'smooth'});}
+async function getPrompts(category){try{const response=await fetch(`/bot/suggest_prompts?mood=${category}`);const data=await response.json();if(data.success){showPrompts(data.prompts,category);}else{alert('Sorry, I couldn\'t generate prompts right now. Please try again.');}}catch(error){console.error('Prompt generation error:',error);alert('Sorry, I\'m having trouble generating prompts. Please try again later.');}}
+function showPrompts(prompts,category){const promptsSection=document.getElementById('promptsSection');const promptsList=document.getElementById('promptsList');promptsList.innerHTML='';prompts.forEach((prompt,index)=>{const promptDiv=document.createElement('div');promptDiv.className='prompt-item';promptDiv.style.animationDelay=`${index * 0.1}s`;const promptText=document.createElement('div');promptText.className='prompt-text';promptText.textContent=prompt;const actionsDiv=document.createElement('div');actionsDiv.className='prompt-actions';const useBtn=document.createElement('button');useBtn.className='use-prompt-btn';useBtn.innerHTML='<i class="fas fa-pen"></i> Use This Prompt';useBtn.onclick=()=>usePrompt(prompt);actionsDiv.appendChild(useBtn);promptDiv.appendChild(promptText);promptDiv.appendChild(actionsDiv);promptsList.appendChild(promptDiv);});promptsSection.style.display='block';promptsSection.scrollIntoView({behavior:'smooth',block:'start'});}
+function usePrompt(prompt){if(navigator.clipboard){navigator.clipboard.writeText(prompt).then(()=>{showNotification('Prompt copied to clipboard! Redirecting to writing page...','success');setTimeout(()=>{window.location.href=window.diaryUrls.write;},1500);}).catch(()=>{showNotification('Prompt: '+prompt+'\n\nRedirecting to writing page...','info');setTimeout(()=>{window.location.href=window.diaryUrls.write;},2000);});}else{showNotification('Prompt: '+prompt+'\n\nRedirecting to writing page...','info');setTimeout(()=>{window.location.href=window.diaryUrls.write;},2000);}}
+function showNotification(message,type='info'){const notification=document.createElement('div');notification.className=`notification notification-${type}`;notification.innerHTML=`
+        <i class="fas fa-${type === 'success' ? 'check-circle' : type === 'error' ? 'exclamation-triangle' : 'info-circle'}"></i>
+        ${message}
+    `;document.body.appendChild(notification);setTimeout(()=>{notification.classList.add('show');},100);setTimeout(()=>{notification.classList.remove('show');setTimeout(()=>{notification.remove();},300);},3000);}
+function clearChat(){if(confirm('Are you sure you want to clear the chat?')){document.getElementById('chatMessages').innerHTML='';showNotification('Chat cleared!','success');}}
+function showPromptCategories(){const promptsSection=document.getElementById('promptsSection');if(promptsSection.style.display==='none'){getPrompts('gratitude');}else{hidePrompts();}}
+document.addEventListener('DOMContentLoaded',function(){const promptBtns=document.querySelectorAll('.prompt-btn');promptBtns.forEach((btn,index)=>{btn.style.animationDelay=`${index * 0.1}s`;});const interactiveElements=document.querySelectorAll('.prompt-btn, .tip-card, .use-prompt-btn');interactiveElements.forEach(element=>{element.addEventListener('mouseenter',function(){this.style.transform='translateY(-3px) scale(1.02)';});element.addEventListener('mouseleave',function(){this.style.transform='translateY(0) scale(1)';});});});
\ No newline at end of file
@@ -0,0 +1,201 @@
+// Enhanced Theme Toggle with System Detection and User Sync
+function toggleTheme() {
+    const body = document.body;
+    const icon = document.querySelector('.theme-toggle i');
+
+    // Toggle theme
+    body.classList.toggle('dark-mode');
+
+    // Update icon and save preference
+    if (body.classList.contains('dark-mode')) {
+        icon.classList.replace('fa-moon', 'fa-sun');
+        localStorage.setItem('theme', 'dark');
+        saveUserThemePreference('dark');
+    } else {
+        icon.classList.replace('fa-sun', 'fa-moon');
+        localStorage.setItem('theme', 'light');
+        saveUserThemePreference('light');
+    }
+}
+
+// Save theme preference to server (for logged-in users)
+async function saveUserThemePreference(theme) {
+    // Check if user is authenticated by looking for CSRF token
+    const csrfToken = document.querySelector('meta[name="csrf-token"]');
+    if (csrfToken) {
+        try {
+            const response = await fetch('/api/theme', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': csrfToken.getAttribute('content')
+                },
+                body: JSON.stringify({ theme: theme })
+            });
+
+            if (!response.ok) {
+                console.warn('Could not save theme preference to server');
+            }
+        } catch (error) {
+            console.warn('Error saving theme preference:', error);
+        }
+    }
+}
+
+// Keep the server's timezone in step with the browser so streak days
+// follow the user's local calendar
+async function syncUserTimezone() {
+    const csrfToken = document.querySelector('meta[name="csrf-token"]');
+    const browserTimezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
+    if (!csrfToken || !window.userTimezone || !browserTimezone || browserTimezone === window.userTimezone) {
+        return;
+    }
+    try {
+        const response = await fetch('/api/timezone', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken.getAttribute('content')
+            },
+            body: JSON.stringify({ timezone: browserTimezone })
+        });
+        if (response.ok) {
+            window.userTimezone = browserTimezone;
+        }
+    } catch (error) {
+        console.warn('Error saving timezone:', error);
+    }
+}
+
+// Enhanced theme initialization with system preference detection
+function initializeTheme() {
+    const savedTheme = localStorage.getItem('theme');
+    const systemPrefersDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
+    const icon = document.querySelector('.theme-toggle i');
+    const isAuthenticated = document.querySelector('meta[name="csrf-token"]') !== null;
+
+    // Priority: saved theme > system preference > light (default)
+    let theme = 'light';
+
+    if (isAuthenticated && window.userThemePreference) {
+        // Use user's saved preference if logged in
+        theme = window.userThemePreference;
+    } else if (savedTheme) {
+        // Use localStorage if available
+        theme = savedTheme;
+    } else if (systemPrefersDark) {
+        // Use system preference as fallback
+        theme = 'dark';
+    }
+
+    // Apply theme
+    if (theme === 'dark') {
+        document.body.classList.add('dark-mode');
+        if (icon) {
+            icon.classList.replace('fa-moon', 'fa-sun');
+        }
+    } else if (icon) {
+        icon.classList.add('fa-moon');
+    }
+
+    // Save initial theme if not already saved
+    if (!savedTheme) {
+        localStorage.setItem('theme', theme);
+        if (theme !== 'light') {
+            saveUserThemePreference(theme);
+        }
+    }
+
+    // Listen for system theme changes
+    window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', (e) => {
+        // Only auto-switch if user hasn't set a preference and isn't using system theme
+        if (!localStorage.getItem('theme') || localStorage.getItem('theme') === 'system') {
+            if (e.matches) {
+                document.body.classList.add('dark-mode');
+                if (icon) icon.classList.replace('fa-moon', 'fa-sun');
+                localStorage.setItem('theme', 'dark');
+            } else {
+                document.body.classList.remove('dark-mode');
+                if (icon) icon.classList.replace('fa-sun', 'fa-moon');
+                localStorage.setItem('theme', 'light');
+            }
+        }
+    });
+}
+
+// Offline support: register the service worker (templates/sw.js), tell it who
+// is signed in, and let it cache the entries linked from this page
+function showOfflineNotice(text) {
+    let container = document.querySelector('.flash-messages');
+    if (!container) {
+        container = document.createElement('div');
+        container.className = 'flash-messages';
+        const main = document.getElementById('main-content');
+        if (!main) return;
+        main.prepend(container);
+    }
+    const existing = container.querySelector('.offline-notice');
+    if (existing) existing.remove();
+    if (!text) return;
+    const message = document.createElement('div');
+    message.className = 'flash-message flash-info offline-notice';
+    message.setAttribute('role', 'status');
+    message.innerHTML = '<i class="fas fa-cloud-upload-alt" aria-hidden="true"></i> ';
+    message.appendChild(document.createTextNode(text));
+    container.appendChild(message);
+}
+
+function initServiceWorker() {
+    if (!('serviceWorker' in navigator)) {
+        return;
+    }
+    navigator.serviceWorker.addEventListener('message', (event) => {
+        const data = event.data || {};
+        if (data.type === 'queued') {
+            showOfflineNotice(data.count ? `${data.count} change(s) saved offline, waiting to sync.` : '');
+        } else if (data.type === 'synced') {
+            const failed = data.failed && data.failed.length ? ` ${data.failed.length} could not be saved: ${data.failed.join('; ')}` : '';
+            showOfflineNotice(`Synced ${data.applied} offline change(s).${failed}`);
+        }
+    });
+    navigator.serviceWorker.register('/sw.js').catch((error) => console.warn('Service worker registration failed:', error));
+    navigator.serviceWorker.ready.then((registration) => {
+        registration.active.postMessage({ type: 'session', userId: window.currentUserId ?? null });
+        const urls = [...new Set([...document.querySelectorAll('a[href^="/entry/"]')].map((a) => a.getAttribute('href')))];
+        if (window.currentUserId != null && urls.length) {
+            registration.active.postMessage({ type: 'precache', urls: urls.slice(0, 20) });
+        }
+    });
+    window.addEventListener('online', () => {
+        navigator.serviceWorker.controller?.postMessage({ type: 'replay' });
+    });
+}
+
+// Load saved theme and initialize accessibility
+document.addEventListener('DOMContentLoaded', () => {
+    initializeTheme();
+    syncUserTimezone();
+    initServiceWorker();
+
+    // Auto-hide flash messages
+    const flashMessages = document.querySelectorAll('.flash-message');
+    flashMessages.forEach(message => {
+        setTimeout(() => {
+            message.style.opacity = '0';
+            message.style.transform = 'translateY(-10px)';
+            setTimeout(() => {
+                message.remove();
+            }, 300);
+        }, 5000);
+    });
+});
+
+// Keyboard navigation for bot chat
+document.addEventListener('keydown', (e) => {
+    if (e.key === 'Escape') {
+        const modal = document.getElementById('botChatModal');
+        if (modal && modal.style.display !== 'none') {
+            toggleBotChat();
+        }
+    }
+});
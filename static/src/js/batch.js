@@ -0,0 +1,73 @@
+// Batch client: API calls made in the same tick go out as one POST /api/batch.
+// DiaryBatch.call(op, params) resolves with the operation's result, or rejects
+// with an Error carrying the operation's status.
+const DiaryBatch = (() => {
+    const MAX_OPERATIONS = 100;  // BATCH_MAX_OPERATIONS in app.py
+    let pending = [];
+
+    function csrfToken() {
+        return document.querySelector('meta[name="csrf-token"]')?.getAttribute('content') ||
+               document.querySelector('input[name="csrf_token"]')?.value;
+    }
+
+    function operationError(result) {
+        const error = new Error(result?.error || 'Operation failed');
+        error.status = result?.status;
+        return error;
+    }
+
+    async function send(calls) {
+        const token = csrfToken();
+        let data;
+        try {
+            const response = await fetch('/api/batch', {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: {
+                    'Content-Type': 'application/json',
+                    ...(token && { 'X-CSRFToken': token })
+                },
+                body: JSON.stringify({ operations: calls.map((call) => call.operation) })
+            });
+            data = await response.json().catch(() => ({}));
+            if (!response.ok) {
+                throw operationError({
+                    status: response.status,
+                    error: data.error || (response.status === 429
+                        ? 'Too many requests. Please try again later.'
+                        : `Request failed (${response.status})`)
+                });
+            }
+        } catch (error) {
+            calls.forEach((call) => call.reject(error));
+            return;
+        }
+        calls.forEach((call, index) => {
+            const result = data.results[index];
+            if (result && result.status < 400) {
+                call.resolve(result.result);
+            } else {
+                call.reject(operationError(result));
+            }
+        });
+    }
+
+    function flush() {
+        const calls = pending;
+        pending = [];
+        for (let start = 0; start < calls.length; start += MAX_OPERATIONS) {
+            send(calls.slice(start, start + MAX_OPERATIONS));
+        }
+    }
+
+    function call(op, params = {}) {
+        return new Promise((resolve, reject) => {
+            pending.push({ operation: { op, ...params }, resolve, reject });
+            if (pending.length === 1) {
+                queueMicrotask(flush);
+            }
+        });
+    }
+
+    return { call };
+})();
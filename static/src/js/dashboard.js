@@ -0,0 +1,84 @@
+// Animate statistics counters on scroll
+function animateCounters() {
+    const counters = document.querySelectorAll('.stat-number');
+
+    counters.forEach(counter => {
+        const target = parseInt(counter.getAttribute('data-target'));
+        const increment = target / 100;
+        let current = 0;
+
+        const updateCounter = () => {
+            current += increment;
+            if (current < target) {
+                counter.textContent = Math.ceil(current);
+                requestAnimationFrame(updateCounter);
+            } else {
+                counter.textContent = target;
+            }
+        };
+
+        // Start animation when element is in view
+        const observer = new IntersectionObserver((entries) => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) {
+                    updateCounter();
+                    observer.unobserve(entry.target);
+                }
+            });
+        });
+
+        observer.observe(counter);
+    });
+}
+
+// Initialize animations when page loads
+document.addEventListener('DOMContentLoaded', () => {
+    animateCounters();
+});
+
+function toggleFavorite(entryId, button) {
+    const icon = button.querySelector('i');
+    const card = button.closest('.entry-card');
+
+    // Send the desired state so a replayed offline toggle (sw.js) cannot flip it back
+    DiaryBatch.call('toggle_favorite', { id: entryId, is_favorite: !icon.classList.contains('fas') })
+    .then(data => {
+        if (data.success) {
+            // Toggle star icon with animation
+            if (data.is_favorite) {
+                icon.classList.remove('far');
+                icon.classList.add('fas');
+                card.classList.add('favorite-entry');
+                button.title = 'Unpin entry';
+
+                // Add celebration animation
+                card.style.animation = 'celebrate 0.6s ease-out';
+            } else {
+                icon.classList.remove('fas');
+                icon.classList.add('far');
+                card.classList.remove('favorite-entry');
+                button.title = 'Pin entry';
+            }
+
+            // Show success message (optional)
+            console.log(data.message);
+        } else {
+            alert(data.message || 'Failed to update favorite status');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert(error.status ? error.message : 'An error occurred. Please try again.');
+    });
+}
+
+// Add celebration animation keyframes
+const style = document.createElement('style');
+style.textContent = `
+    @keyframes celebrate {
+        0% { transform: scale(1); }
+        50% { transform: scale(1.05); }
+        100% { transform: scale(1); }
+    }
+`;
+document.head.appendChild(style);
@@ -0,0 +1,94 @@
+"""
+Writing-streak engine.
+
+Streaks are defined over *local* calendar days in the user's timezone. The
+full computation walks the user's entry timestamps once, in index order
+(idx_user_timestamp covers user_id + timestamp), collapsing them into
+distinct days and runs of consecutive days. The normal write path instead
+advances the stored state in O(1); anything that can move history backwards
+(deleting, restoring, back-dated entries, a timezone change) falls back to
+the full recompute.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+StreakState = namedtuple('StreakState', 'current longest start last')
+
+EMPTY = StreakState(current=0, longest=0, start=None, last=None)
+
+
+def get_zone(name):
+    """Return the tzinfo for an IANA timezone name, falling back to UTC."""
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def is_valid_timezone(name):
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return False
+
+
+def local_day(timestamp, zone):
+    """Calendar day of `timestamp` in `zone`; naive timestamps are UTC."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(zone).date()
+
+
+def today_in(zone):
+    return datetime.now(zone).date()
+
+
+def compute(timestamps, zone):
+    """Compute streak state from timestamps sorted in ascending order.
+
+    Args:
+        timestamps: Iterable of entry timestamps, oldest first
+        zone: tzinfo used to map timestamps onto calendar days
+
+    Returns:
+        StreakState: current is the length of the most recent run (whether or
+        not it is still alive; see User.get_streak_info), longest the best run
+    """
+    state = EMPTY
+    for ts in timestamps:
+        if ts is None:
+            continue
+        state = advance(state, local_day(ts, zone)) or state
+    return state
+
+
+def advance(state, day):
+    """Apply one writing day to `state` in O(1).
+
+    Returns None when `day` is earlier than the last recorded day, in which
+    case the caller must recompute from history.
+    """
+    if state.last is None:
+        return StreakState(current=1, longest=max(state.longest, 1), start=day, last=day)
+    if day < state.last:
+        return None
+    if day == state.last:
+        return state
+    if day == state.last + timedelta(days=1):
+        current = state.current + 1
+        return StreakState(current=current, longest=max(state.longest, current),
+                           start=state.start or day, last=day)
+    return StreakState(current=1, longest=max(state.longest, 1), start=day, last=day)
+
+
+def to_column(day):
+    """Streak dates are stored in DateTime columns as local midnight."""
+    return datetime.combine(day, time()) if day else None
+
+
+def from_column(value):
+    return value.date() if value else None
@@ -0,0 +1,126 @@
+"""
+Change tracking for delta sync (/api/sync) and conditional GETs.
+
+Each user row holds a change counter, User.data_version. Whenever a flush
+touches a user's entries, categories or templates, or the user row itself,
+the counter is incremented once for that flush, and every changed row is
+stamped with the new value in its sync_version column. Deleted rows leave a
+tombstone carrying the same version. "What changed since version N" is
+therefore an index range scan on (user_id, sync_version) per table.
+
+Versions come from an UPDATE on the user row issued at the start of the
+flush. That takes the row's write lock (SQLite's database lock), so versions
+are handed out in commit order: a reader that has seen version N can never
+later see an uncommitted change with a version <= N. Wall-clock updated_at
+values lack this guarantee, because they are computed before the commit.
+
+Clients only see an opaque, signed change token wrapping (user id, cursor).
+"""
+import itertools
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import select
+from sqlalchemy.orm.attributes import set_committed_value
+
+
+def register(db, user_model, tombstone_model, synced_models):
+    """Stamp versions and write tombstones in the same flush as each change.
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        user_model: the User model (data_version, data_updated_at)
+        tombstone_model: model with user_id, kind, object_id, sync_version
+        synced_models: {kind: model} for models with user_id and sync_version
+    """
+    kinds = {model: kind for kind, model in synced_models.items()}
+    users = user_model.__table__
+
+    def _next_version(session, user_id, now):
+        session.execute(users.update().where(users.c.id == user_id).values(
+            data_version=users.c.data_version + 1, data_updated_at=now))
+        version = session.execute(select(users.c.data_version).where(users.c.id == user_id)).scalar()
+        user = session.identity_map.get(session.identity_key(user_model, user_id))
+        if user is not None and version is not None:
+            # Already written; keep the in-memory user in step without dirtying it
+            set_committed_value(user, 'data_version', version)
+            set_committed_value(user, 'data_updated_at', now)
+        return version
+
+    @db.event.listens_for(db.session, 'before_flush')
+    def stamp_versions(session, flush_context, instances):
+        changed, removed, touched = defaultdict(list), defaultdict(list), set()
+        for obj in itertools.chain(session.new, session.dirty):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            if isinstance(obj, user_model):
+                # New users start at version 0
+                if obj in session.dirty:
+                    touched.add(obj.id)
+            elif type(obj) in kinds and obj.user_id is not None:
+                changed[obj.user_id].append(obj)
+        for obj in session.deleted:
+            if type(obj) in kinds and obj.user_id is not None:
+                removed[obj.user_id].append(obj)
+            elif isinstance(obj, user_model):
+                touched.discard(obj.id)
+
+        deleted_users = {obj.id for obj in session.deleted if isinstance(obj, user_model)}
+        now = datetime.now(timezone.utc)
+        for user_id in (touched | set(changed) | set(removed)) - deleted_users:
+            version = _next_version(session, user_id, now)
+            if version is None:
+                continue
+            for obj in changed[user_id]:
+                obj.sync_version = version
+            for obj in removed[user_id]:
+                session.add(tombstone_model(user_id=user_id, kind=kinds[type(obj)],
+                                            object_id=obj.id, sync_version=version))
+
+
+# ------------------ Change tokens ------------------
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='sync-token')
+
+
+def make_token(user_id, version, last_id=None):
+    """Opaque cursor: changes up to `version` (and, mid-version, up to entry `last_id`) were sent."""
+    return _serializer().dumps({'u': user_id, 'v': version, 'i': last_id})
+
+
+def read_token(token, user_id):
+    """(version, last_id) from `token`, or None if missing, forged or for another user."""
+    if not token:
+        return None
+    try:
+        data = _serializer().loads(token)
+    except BadSignature:
+        return None
+    if not isinstance(data, dict) or data.get('u') != user_id or not isinstance(data.get('v'), int):
+        return None
+    last_id = data.get('i')
+    return data['v'], last_id if isinstance(last_id, int) else None
+
+
+def isoformat(value):
+    """Timestamps go out as ISO 8601 UTC; naive values from SQLite are UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+def parse_timestamp(value):
+    """Parse a client ISO 8601 timestamp into naive UTC, or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
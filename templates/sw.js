@@ -0,0 +1,320 @@
+/*
+ * Diary service worker (rendered by the /sw.js route).
+ *
+ * - Precaches the app shell (CSS/JS bundles, offline page) on install, and the
+ *   pages/entries the page script reports via postMessage({type: 'precache'}).
+ * - Serves signed-in pages stale-while-revalidate from PAGE_CACHE; any
+ *   successful write clears it, so a page is never stale after the user's own
+ *   changes. Pages that showed flash messages (Cache-Control: no-store) are
+ *   never cached.
+ * - When offline, queues /write submissions and favorite toggles (from
+ *   /toggle_favorite or /api/batch) in IndexedDB and replays them through
+ *   /api/sync once back online.
+ */
+const VERSION = {{ version|tojson }};
+const SHELL_CACHE = `diary-shell-${VERSION}`;
+const PAGE_CACHE = 'diary-pages';
+const OFFLINE_URL = {{ offline_url|tojson }};
+const SHELL_URLS = {{ shell_urls|tojson }};
+const WARM_URLS = {{ warm_urls|tojson }};
+const SYNC_MAX_CHANGES = {{ sync_max_changes|tojson }};
+const MAX_PAGES = 50;
+
+// Signed-in pages worth keeping for offline reading/writing
+const CACHEABLE_PAGES = [/^\/dashboard$/, /^\/entry\/\d+$/, /^\/categories(\/\d+)?$/, /^\/stats$/, /^\/write$/];
+// POSTs that do not change what pages show
+const READ_ONLY_POSTS = [/^\/bot\//];
+
+const DB_NAME = 'diary-sw';
+const QUEUE_STORE = 'queue';
+const META_STORE = 'meta';
+
+// ------------------ IndexedDB ------------------
+function openDb() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(DB_NAME, 1);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore(QUEUE_STORE, { keyPath: 'id', autoIncrement: true });
+            request.result.createObjectStore(META_STORE);
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+async function withStore(name, mode, fn) {
+    const db = await openDb();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(name, mode);
+        const result = fn(tx.objectStore(name));
+        tx.oncomplete = () => resolve(result && 'result' in result ? result.result : result);
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+const getMeta = (key) => withStore(META_STORE, 'readonly', (store) => store.get(key));
+const setMeta = (key, value) => withStore(META_STORE, 'readwrite', (store) => store.put(value, key));
+const queuedItems = () => withStore(QUEUE_STORE, 'readonly', (store) => store.getAll());
+const removeQueued = (ids) => withStore(QUEUE_STORE, 'readwrite', (store) => ids.forEach((id) => store.delete(id)));
+
+async function enqueue(item) {
+    item.userId = await getMeta('userId');
+    item.queuedAt = new Date().toISOString();
+    if (item.kind === 'favorite') {
+        // Only the latest desired state per entry matters
+        const stale = (await queuedItems()).filter((q) => q.kind === 'favorite' && q.entryId === item.entryId);
+        await removeQueued(stale.map((q) => q.id));
+    }
+    await withStore(QUEUE_STORE, 'readwrite', (store) => store.add(item));
+    if (self.registration.sync) {
+        self.registration.sync.register('diary-queue').catch(() => {});
+    }
+    notifyClients({ type: 'queued', count: (await queuedItems()).length });
+}
+
+// ------------------ Replay ------------------
+function toChange(item) {
+    if (item.kind === 'favorite') {
+        return { op: 'patch', type: 'entry', id: item.entryId, client_id: String(item.id),
+                 data: { is_favorite: item.isFavorite } };
+    }
+    const form = item.form;
+    return {
+        op: 'upsert', type: 'entry', id: null, client_id: String(item.id),
+        data: {
+            title: form.title || null,
+            content: form.content || '',
+            category_id: form.category_id ? Number(form.category_id) : null,
+            mood: form.mood || null,
+            weather: form.weather || null,
+            location: form.location || null,
+            tags: (form.tags || '').split(',').map((t) => t.trim()).filter(Boolean),
+            is_private: form.is_private === 'on',
+            timestamp: item.queuedAt,
+        },
+    };
+}
+
+let replaying = null;
+
+function replayQueue() {
+    // One replay at a time; later triggers wait for the running one
+    replaying = replaying || doReplay().finally(() => { replaying = null; });
+    return replaying;
+}
+
+async function doReplay() {
+    const userId = await getMeta('userId');
+    const items = (await queuedItems()).filter((item) => item.userId === userId && userId != null);
+    const done = [];
+    const failed = [];
+    // /api/sync takes at most SYNC_MAX_CHANGES per request; each acknowledged chunk leaves the queue
+    for (let start = 0; start < items.length; start += SYNC_MAX_CHANGES) {
+        let response;
+        try {
+            response = await fetch('/api/sync', {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ changes: items.slice(start, start + SYNC_MAX_CHANGES).map(toChange) }),
+            });
+        } catch (error) {
+            break;  // still offline
+        }
+        // A redirect to /login or an error page means "not now"; keep the rest of the queue
+        if (!response.ok || response.redirected || !(response.headers.get('Content-Type') || '').includes('json')) {
+            break;
+        }
+        const data = await response.json();
+        const acknowledged = [];
+        for (const result of data.results || []) {
+            acknowledged.push(Number(result.client_id));
+            if (result.status === 'error') {
+                failed.push(result.error);
+            }
+        }
+        await removeQueued(acknowledged);
+        done.push(...acknowledged);
+    }
+    if (!done.length) {
+        return;
+    }
+    await caches.delete(PAGE_CACHE);
+    notifyClients({ type: 'synced', applied: done.length - failed.length, failed,
+                    count: (await queuedItems()).length });
+}
+
+async function notifyClients(message) {
+    const clients = await self.clients.matchAll({ type: 'window' });
+    clients.forEach((client) => client.postMessage(message));
+}
+
+// ------------------ Caching ------------------
+async function cachePage(cache, request, response) {
+    if (!response.ok || response.redirected || response.type !== 'basic') {
+        return;
+    }
+    if ((response.headers.get('Cache-Control') || '').includes('no-store')) {
+        return;
+    }
+    await cache.put(request, response);
+    const keys = await cache.keys();
+    for (const key of keys.slice(0, Math.max(0, keys.length - MAX_PAGES))) {
+        await cache.delete(key);
+    }
+}
+
+async function warm(urls) {
+    const cache = await caches.open(PAGE_CACHE);
+    for (const url of urls) {
+        if (await cache.match(url)) {
+            continue;
+        }
+        try {
+            const response = await fetch(url, { credentials: 'same-origin' });
+            await cachePage(cache, new Request(url), response);
+        } catch (error) {
+            return;
+        }
+    }
+}
+
+async function staleWhileRevalidate(event) {
+    const cache = await caches.open(PAGE_CACHE);
+    const cached = await cache.match(event.request);
+    const network = fetch(event.request).then(async (response) => {
+        if (response.redirected) {
+            // Signed out or session expired: nothing cached may be shown any more
+            await caches.delete(PAGE_CACHE);
+        } else {
+            await cachePage(cache, event.request, response.clone());
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    try {
+        return await network;
+    } catch (error) {
+        return (await caches.match(OFFLINE_URL)) || Response.error();
+    }
+}
+
+async function queueableWrite(event, path) {
+    const copy = event.request.clone();
+    try {
+        const response = await fetch(event.request);
+        if (!READ_ONLY_POSTS.some((re) => re.test(path))) {
+            await caches.delete(PAGE_CACHE);
+        }
+        return response;
+    } catch (error) {
+        // Offline: queue what can be replayed, fail the rest
+        if (path === '/write') {
+            const form = Object.fromEntries((await copy.formData()).entries());
+            await enqueue({ kind: 'write', form });
+            return Response.redirect('/dashboard', 303);
+        }
+        const favorite = path.match(/^\/toggle_favorite\/(\d+)$/);
+        if (favorite) {
+            const body = await copy.json().catch(() => ({}));
+            if (typeof body.is_favorite === 'boolean') {
+                await enqueue({ kind: 'favorite', entryId: Number(favorite[1]), isFavorite: body.is_favorite });
+                return new Response(JSON.stringify({
+                    success: true, queued: true, is_favorite: body.is_favorite,
+                    message: 'Saved offline; will sync when you are back online.',
+                }), { headers: { 'Content-Type': 'application/json' } });
+            }
+        }
+        if (path === '/api/batch') {
+            const body = await copy.json().catch(() => ({}));
+            const results = [];
+            for (const operation of body.operations || []) {
+                if (operation.op === 'toggle_favorite' && Number.isInteger(operation.id) &&
+                        typeof operation.is_favorite === 'boolean') {
+                    await enqueue({ kind: 'favorite', entryId: operation.id, isFavorite: operation.is_favorite });
+                    results.push({ op: operation.op, status: 200, result: {
+                        success: true, queued: true, is_favorite: operation.is_favorite,
+                        message: 'Saved offline; will sync when you are back online.',
+                    } });
+                } else {
+                    results.push({ op: operation.op, status: 503, error: 'You are offline. Please try again later.' });
+                }
+            }
+            return new Response(JSON.stringify({ results }), { headers: { 'Content-Type': 'application/json' } });
+        }
+        return event.request.mode === 'navigate' ? ((await caches.match(OFFLINE_URL)) || Response.error()) : Response.error();
+    }
+}
+
+// ------------------ Lifecycle ------------------
+self.addEventListener('install', (event) => {
+    event.waitUntil(caches.open(SHELL_CACHE).then((cache) => cache.addAll(SHELL_URLS)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        for (const name of await caches.keys()) {
+            if (name.startsWith('diary-shell-') && name !== SHELL_CACHE) {
+                await caches.delete(name);
+            }
+        }
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', (event) => {
+    const url = new URL(event.request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+    const path = url.pathname;
+
+    if (event.request.method !== 'GET') {
+        event.respondWith(queueableWrite(event, path));
+        return;
+    }
+    if (path === '/logout' || path === '/login') {
+        event.waitUntil(caches.delete(PAGE_CACHE));
+        return;
+    }
+    if (path.startsWith('/assets/')) {
+        // Fingerprinted and immutable: cache first
+        event.respondWith(caches.match(event.request).then((hit) => hit || fetch(event.request)));
+        return;
+    }
+    if (event.request.mode === 'navigate' && !url.search && CACHEABLE_PAGES.some((re) => re.test(path))) {
+        event.respondWith(staleWhileRevalidate(event));
+    }
+});
+
+self.addEventListener('message', (event) => {
+    const message = event.data || {};
+    if (message.type === 'session') {
+        event.waitUntil((async () => {
+            const previous = await getMeta('userId');
+            if (previous !== message.userId) {
+                // Another account (or none): drop its pages; its queue waits for it
+                await caches.delete(PAGE_CACHE);
+                await setMeta('userId', message.userId);
+            }
+            if (message.userId != null) {
+                await replayQueue();
+                await warm(WARM_URLS);
+            }
+            notifyClients({ type: 'queued', count: (await queuedItems()).filter((i) => i.userId === message.userId).length });
+        })());
+    } else if (message.type === 'precache' && Array.isArray(message.urls)) {
+        event.waitUntil(warm(message.urls.filter((u) => CACHEABLE_PAGES.some((re) => re.test(u)))));
+    } else if (message.type === 'replay') {
+        event.waitUntil(replayQueue());
+    }
+});
+
+self.addEventListener('sync', (event) => {
+    if (event.tag === 'diary-queue') {
+        event.waitUntil(replayQueue());
+    }
+});
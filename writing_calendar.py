@@ -0,0 +1,88 @@
+"""
+Per-day writing totals for the calendar heatmap and month view.
+
+A calendar range is read with one range scan over the covering index
+idx_user_timestamp_words (user_id, timestamp, word_count): the query only
+asks for those columns, so SQLite answers it from the index without touching
+the table rows. Timestamps are stored in UTC while days are the user's local
+days, so the UTC bounds of the local range are computed here and the rows are
+bucketed into local days in Python (a fixed SQL offset would be wrong across
+DST changes).
+
+The app caches one year of totals per user in a ReferenceDataCache keyed on
+(year, user id, (data_version, timezone)): any change to the user's entries
+bumps data_version, so a cached year never needs explicit invalidation.
+"""
+import calendar
+from datetime import date, datetime, timedelta, timezone
+
+LEVELS = 4  # heatmap shades above "no entries"
+MAX_RANGE_DAYS = 731  # longest range /api/calendar answers
+
+
+def utc_bounds(start, end, zone):
+    """Naive UTC datetimes bounding the local days start..end (inclusive) in `zone`."""
+    def to_utc(day):
+        return datetime.combine(day, datetime.min.time(), tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+    return to_utc(start), to_utc(end + timedelta(days=1))
+
+
+def day_totals(rows, zone):
+    """[(date, entries, words), ...] per local day from (timestamp, word_count) rows, oldest first."""
+    totals = {}
+    for timestamp, words in rows:
+        if timestamp is None:
+            continue
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        day = timestamp.astimezone(zone).date()
+        count, total = totals.get(day, (0, 0))
+        totals[day] = (count + 1, total + (words or 0))
+    return [(day, count, words) for day, (count, words) in sorted(totals.items())]
+
+
+def level(count, busiest):
+    """Heatmap shade 0..LEVELS of a day with `count` entries when the busiest day has `busiest`."""
+    if not count or not busiest:
+        return 0
+    return min(LEVELS, -(-count * LEVELS // busiest))
+
+
+def year_heatmap(year, totals):
+    """Weeks (Monday first) of the year as the heatmap draws them.
+
+    Returns a list of weeks, each a list of 7 cells; a cell is None outside
+    the year, else a dict with date, entries, words and level.
+    """
+    by_day = {day: (count, words) for day, count, words in totals}
+    busiest = max((count for count, _ in by_day.values()), default=0)
+    first, last = date(year, 1, 1), date(year, 12, 31)
+    weeks = []
+    day = first - timedelta(days=first.weekday())
+    while day <= last:
+        week = []
+        for _ in range(7):
+            if first <= day <= last:
+                count, words = by_day.get(day, (0, 0))
+                week.append({'date': day, 'entries': count, 'words': words, 'level': level(count, busiest)})
+            else:
+                week.append(None)
+            day += timedelta(days=1)
+        weeks.append(week)
+    return weeks
+
+
+def month_bounds(year, month):
+    """First and last day of the month."""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def month_weeks(year, month):
+    """Weeks (Monday first) of dates covering the month, padded with the neighbouring months' days."""
+    return calendar.Calendar(firstweekday=0).monthdatescalendar(year, month)
+
+
+def shift_month(year, month, months):
+    """(year, month) `months` months after (or before, if negative) the given month."""
+    index = year * 12 + month - 1 + months
+    return index // 12, index % 12 + 1
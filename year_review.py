@@ -0,0 +1,186 @@
+"""
+"Year in review": a per-user annual report, precomputed and stored as JSON.
+
+build() makes a single pass over one local year of entries (metadata
+columns only, oldest first) and produces totals, the longest streak, the
+busiest days, weekdays and hours, monthly counts, mood, category and tag
+breakdowns and the longest entries. The background job adds the year's top
+keywords from the keyword index (keywords.py) and stores the result in the
+year_review table, one row per (user, year). Pages render the stored JSON and
+never compute a report during a request.
+
+A report is regenerated only when it goes stale:
+
+    - register() bumps entries_version of a user's stored reports, in the
+      flush that writes an entry, for the years the entry's old and new
+      timestamps fall in (local years can differ from UTC years by up to 14
+      hours, so both candidates are bumped). A report is current while its
+      built_from equals entries_version; the job records the version it read
+      before building, so a write during the build leaves the report stale
+    - a report built for another timezone, or with an older REPORT_VERSION
+      of the payload format, is rebuilt too
+
+Category ids are stored rather than names so a renamed category needs no
+rebuild; pages resolve the names when rendering.
+"""
+import heapq
+import json
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, inspect
+
+import streaks
+
+# Bump when the payload layout changes; older reports are rebuilt and not rendered
+REPORT_VERSION = 1
+
+TOP_DAYS = 5
+TOP_TAGS = 10
+TOP_KEYWORDS = 10
+LONGEST_ENTRIES = 5
+
+# Largest UTC offsets in use (UTC-12 .. UTC+14)
+_LOCAL_SPREAD = (timedelta(hours=-12), timedelta(hours=14))
+
+
+def local_years(timestamp):
+    """Years `timestamp` (naive UTC) can fall in, in any timezone."""
+    if timestamp is None:
+        return set()
+    return {(timestamp + offset).year for offset in _LOCAL_SPREAD}
+
+
+def build(year, rows, zone):
+    """Report payload for `year` from its entries.
+
+    Args:
+        year: the local calendar year reported on
+        rows: (id, title, timestamp, word_count, mood, category_id, tags) of
+            the year's entries, oldest first; tags is the stored JSON string
+        zone: the user's tzinfo; days and hours are local
+
+    Returns:
+        A JSON-serializable dict. Pairs are lists (JSON object keys would turn
+        numbers into strings), ordered most frequent first.
+    """
+    entries = words = 0
+    days = Counter()
+    day_words = Counter()
+    weekdays = [0] * 7
+    hours = [0] * 24
+    months = [[0, 0] for _ in range(12)]  # [entries, words] per month
+    moods = Counter()
+    categories = Counter()
+    tags = Counter()
+    longest = []  # min-heap of (words, id, title, date)
+    streak = streaks.EMPTY
+    best_run = None
+
+    for entry_id, title, timestamp, word_count, mood, category_id, tags_json in rows:
+        if timestamp is None:
+            continue
+        word_count = word_count or 0
+        local = (timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)).astimezone(zone)
+        day = local.date()
+
+        entries += 1
+        words += word_count
+        days[day] += 1
+        day_words[day] += word_count
+        weekdays[day.weekday()] += 1
+        hours[local.hour] += 1
+        months[day.month - 1][0] += 1
+        months[day.month - 1][1] += word_count
+        if mood:
+            moods[mood] += 1
+        if category_id is not None:
+            categories[category_id] += 1
+        for tag in _tags(tags_json):
+            tags[tag] += 1
+
+        item = (word_count, entry_id, title, day.isoformat())
+        if len(longest) < LONGEST_ENTRIES:
+            heapq.heappush(longest, item)
+        elif item[:2] > longest[0][:2]:
+            heapq.heapreplace(longest, item)
+
+        # Rows are in time order, so the streak advances without recomputation
+        streak = streaks.advance(streak, day) or streak
+        if streak.current == streak.longest and streak.current:
+            best_run = (streak.start, streak.last)
+
+    busiest = sorted(days, key=lambda d: (-days[d], -day_words[d], d))[:TOP_DAYS]
+    return {
+        'version': REPORT_VERSION,
+        'year': year,
+        'timezone': getattr(zone, 'key', 'UTC'),
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'entries': entries,
+        'words': words,
+        'writing_days': len(days),
+        'avg_words': round(words / entries, 1) if entries else 0,
+        'longest_streak': {
+            'days': streak.longest,
+            'start': best_run[0].isoformat() if best_run else None,
+            'end': best_run[1].isoformat() if best_run else None,
+        },
+        'busiest_days': [[day.isoformat(), days[day], day_words[day]] for day in busiest],
+        'weekdays': weekdays,
+        'hours': hours,
+        'months': months,
+        'moods': moods.most_common(),
+        'categories': categories.most_common(),
+        'tags': tags.most_common(TOP_TAGS),
+        'longest_entries': [{'id': entry_id, 'title': title, 'date': day, 'words': count}
+                            for count, entry_id, title, day in sorted(longest, reverse=True)],
+        'keywords': [],
+    }
+
+
+def needs_build(review, timezone_name):
+    """Whether a stored report is missing, stale, in an old format or built for another timezone."""
+    return (review.payload is None or review.built_from != review.entries_version
+            or review.report_version != REPORT_VERSION or review.timezone_name != timezone_name)
+
+
+def _tags(tags_json):
+    if not tags_json:
+        return []
+    try:
+        tags = json.loads(tags_json)
+    except ValueError:
+        return []
+    return [tag for tag in tags if isinstance(tag, str)] if isinstance(tags, list) else []
+
+
+def mark_stale(connection, reviews, user_id, years):
+    """Bump entries_version of `user_id`'s stored reports for `years`."""
+    if years:
+        connection.execute(reviews.update()
+                           .where(reviews.c.user_id == user_id, reviews.c.year.in_(sorted(years)))
+                           .values(entries_version=reviews.c.entries_version + 1))
+
+
+def register(model, reviews):
+    """Mark reports stale whenever an entry of `model` (DiaryEntry) is written or deleted."""
+
+    @event.listens_for(model, 'after_insert')
+    def _after_insert(mapper, connection, target):
+        mark_stale(connection, reviews, target.user_id, local_years(target.timestamp))
+
+    @event.listens_for(model, 'after_update')
+    def _after_update(mapper, connection, target):
+        # Any change can alter some figure (title, mood, tags, words...), so
+        # only no-op flushes are skipped
+        state = inspect(target)
+        if not any(attr.history.has_changes() for attr in state.attrs):
+            return
+        years = local_years(target.timestamp)
+        for old in state.attrs.timestamp.history.deleted:
+            years |= local_years(old)
+        mark_stale(connection, reviews, target.user_id, years)
+
+    @event.listens_for(model, 'after_delete')
+    def _after_delete(mapper, connection, target):
+        mark_stale(connection, reviews, target.user_id, local_years(target.timestamp))